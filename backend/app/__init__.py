@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_cors import CORS
 
+from . import compression, json_provider
+from .ai import registry as model_registry
 from .config import Config
 from .extensions import db, migrate, ma, jwt, celery_app
 from .routes.sync import sync_bp
@@ -8,28 +10,43 @@ from .routes.auth import auth_bp
 from .routes.patients import patients_bp
 from .routes.cases import cases_bp
 from .routes.vitals import vitals_bp
+from .routes.metrics import metrics_bp
+from .services import principal
+from .services.change_feed import register_listeners
 
 def create_app(config_class: type[Config] | None = None) -> Flask:
     app = Flask(__name__)
     app.config.from_object(config_class or Config)
+    app.json = json_provider.FastJSONProvider(app)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "json_serializer": json_provider.dumps,
+        "json_deserializer": json_provider.loads,
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
 
     CORS(app)
+    compression.init_app(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
     ma.init_app(app)
 
     jwt.init_app(app)
+    register_listeners()
+    principal.register_listeners()
 
     app.register_blueprint(sync_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api")
     app.register_blueprint(patients_bp, url_prefix="/api")
     app.register_blueprint(cases_bp, url_prefix="/api")
     app.register_blueprint(vitals_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
 
     # Attach Flask context to Celery
     celery_app.conf.update(app.config)
 
+    model_registry.init_models(app.config)
+
     return app
 
 
@@ -0,0 +1,201 @@
+"""Dynamic micro-batching for single-image inference requests.
+
+Risk-scoring requests arrive one image at a time, but a batched session run
+costs little more than a single-image one. :class:`MicroBatcher` lets
+concurrent callers submit single images and get futures back; a background
+thread collects them into batches of at most ``max_batch_size`` images,
+waiting no longer than ``max_wait_ms`` after the oldest request arrived, runs
+one batched prediction and resolves each future with its own result.
+
+Under light load a request waits at most ``max_wait_ms``; under heavy load
+batches fill immediately and the wait disappears. The ``<name>.batch_size``
+and ``<name>.queue_delay_ms`` histograms in ``/api/metrics`` show where a
+deployment sits between the two, for tuning both settings.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+from .. import metrics
+from .registry import MEDSIGLIP, registry
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_DELAY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+_STOP = object()
+_batchers: dict[tuple[int, str], MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+@dataclass
+class _Request:
+    image: np.ndarray
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """Group single-image submissions into batched ``predict_batch`` calls.
+
+    ``predict_batch`` takes an ``(N, C, H, W)`` array and returns ``N`` results
+    in order. Images of different shapes submitted together run as separate
+    batches. The worker thread starts on first use in each process.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[np.ndarray], Sequence],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = MEDSIGLIP,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queue one ``(C, H, W)`` image; the future resolves to its result."""
+        if self._closed:
+            raise RuntimeError(f"{self.name} batcher is closed")
+        image = np.asarray(image, dtype=np.float32)
+        if image.ndim != 3:
+            raise ValueError(f"Expected a (C, H, W) image, got shape {image.shape}")
+        self._ensure_worker()
+        request = _Request(image)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, image: np.ndarray, timeout: float | None = None):
+        return self.submit(image).result(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Finish the queued requests and stop the worker thread."""
+        self._closed = True
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid() and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_worker(self) -> None:
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            if self._pid != os.getpid():
+                # A queue inherited through fork may hold a lock taken by a
+                # thread that does not exist in this process.
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.name}-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def _running(self) -> bool:
+        thread = self._thread
+        return thread is not None and self._pid == os.getpid() and thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._run_batch(batch)
+            if stop:
+                break
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        """Reject requests that raced ``close`` into the queue behind the stop marker."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError(f"{self.name} batcher is closed"))
+
+    def _collect(self, first: _Request) -> tuple[list[_Request], bool]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # Past the deadline, still take whatever is already queued.
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_batch(self, batch: list[_Request]) -> None:
+        started = time.perf_counter()
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        for request in batch:
+            metrics.observe(
+                f"{self.name}.queue_delay_ms",
+                (started - request.enqueued_at) * 1000,
+                QUEUE_DELAY_BUCKETS,
+            )
+        metrics.observe(f"{self.name}.batch_size", len(batch), BATCH_SIZE_BUCKETS)
+        metrics.increment(f"{self.name}.batches")
+
+        by_shape: dict[tuple, list[_Request]] = {}
+        for request in batch:
+            by_shape.setdefault(request.image.shape, []).append(request)
+        for requests in by_shape.values():
+            try:
+                results = self.predict_batch(np.stack([request.image for request in requests]))
+            except Exception as exc:
+                for request in requests:
+                    request.future.set_exception(exc)
+                continue
+            for request, result in zip(requests, results):
+                request.future.set_result(result)
+
+
+def get_batcher(config: Mapping, name: str = MEDSIGLIP) -> MicroBatcher:
+    """The process's batcher in front of registry model ``name``.
+
+    Sized by ``MEDSIGLIP_MAX_BATCH_SIZE`` and ``MEDSIGLIP_MAX_WAIT_MS``; the model
+    itself is loaded through the registry on the first batch.
+    """
+    key = (os.getpid(), name)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    lambda images: registry.get(name).predict_batch(images),
+                    max_batch_size=config.get("MEDSIGLIP_MAX_BATCH_SIZE", 16),
+                    max_wait_ms=config.get("MEDSIGLIP_MAX_WAIT_MS", 5.0),
+                    name=name,
+                )
+                _batchers[key] = batcher
+    return batcher
@@ -0,0 +1,219 @@
+"""Inference results cached by image content and model version.
+
+CHWs re-photograph the same lesion and sync retries re-upload identical
+images, so the same bytes reach the model again and again. Entries are keyed
+by the SHA-256 of the encoded image plus a version made of the loaded
+model's file hash and a fingerprint of the preprocessing settings: a new
+export or a new image size changes every key, and nothing else can make an
+entry stale, so entries never expire and are only evicted for space. The
+version comes from the model as it was loaded, not from the file on disk, so
+replacing the file before the model is reloaded cannot file old results under
+the new export's key.
+
+Lookups check a bounded in-process LRU first, then an optional directory of
+``.npz`` files (``INFERENCE_CACHE_DIR``) that survives restarts and can be
+shared by workers on one machine. :meth:`InferenceCache.score` runs inference
+only for images found in neither tier, once per distinct image in a batch.
+Hits and misses per tier are counted in ``/api/metrics``. Unreadable files
+count as misses and are removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+from .. import metrics
+from ..cache import MemoryCache
+from .medsiglip import MedSigLipResult
+from .preprocessing import Preprocessor, build_preprocessor
+from .registry import MEDSIGLIP, registry
+
+logger = logging.getLogger(__name__)
+
+_caches: dict[tuple[int, str], InferenceCache] = {}
+_caches_lock = threading.Lock()
+_local = threading.local()
+
+
+@dataclass
+class InferenceRecord:
+    result: MedSigLipResult
+    embedding: np.ndarray | None = None
+
+
+def image_digest(image: bytes) -> str:
+    return hashlib.sha256(image).hexdigest()
+
+
+class InferenceCache:
+    """Two-tier cache of :class:`InferenceRecord` by image digest for one model version."""
+
+    def __init__(
+        self,
+        version: str,
+        maxsize: int = 4096,
+        directory: str | Path | None = None,
+        name: str = MEDSIGLIP,
+    ) -> None:
+        self.version = version
+        self.name = name
+        self.memory = MemoryCache(maxsize)
+        self.directory = Path(directory) / name / version if directory else None
+
+    def get(self, digest: str) -> InferenceRecord | None:
+        record = self.memory.get(digest)
+        if record is not None:
+            metrics.increment(f"{self.name}.cache.memory_hits")
+            return record
+        record = self._read(digest)
+        if record is not None:
+            metrics.increment(f"{self.name}.cache.disk_hits")
+            self.memory.set(digest, record)
+            return record
+        metrics.increment(f"{self.name}.cache.misses")
+        return None
+
+    def put(self, digest: str, record: InferenceRecord) -> None:
+        self.memory.set(digest, record)
+        self._write(digest, record)
+
+    def score(
+        self,
+        images: Sequence[bytes],
+        infer: Callable[[list[bytes]], Sequence[MedSigLipResult | InferenceRecord]],
+    ) -> list[InferenceRecord]:
+        """Records for ``images`` in order, calling ``infer`` once with the uncached ones.
+
+        ``infer`` receives each distinct missing image once and returns a result
+        (or a record carrying an embedding) per image.
+        """
+        digests = [image_digest(image) for image in images]
+        found: dict[str, InferenceRecord] = {}
+        missing: dict[str, bytes] = {}
+        for digest, image in zip(digests, images):
+            if digest in found or digest in missing:
+                continue
+            record = self.get(digest)
+            if record is None:
+                missing[digest] = image
+            else:
+                found[digest] = record
+
+        if missing:
+            outputs = infer(list(missing.values()))
+            for digest, output in zip(missing, outputs):
+                record = output if isinstance(output, InferenceRecord) else InferenceRecord(output)
+                self.put(digest, record)
+                found[digest] = record
+        return [found[digest] for digest in digests]
+
+    def stats(self) -> dict:
+        prefix = f"{self.name}.cache."
+        hits = metrics.registry.value(prefix + "memory_hits") + metrics.registry.value(
+            prefix + "disk_hits"
+        )
+        lookups = hits + metrics.registry.value(prefix + "misses")
+        return {
+            **self.memory.stats(),
+            "version": self.version,
+            "disk": str(self.directory) if self.directory else None,
+            "hit_rate": hits / lookups if lookups else None,
+        }
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.npz"
+
+    def _read(self, digest: str) -> InferenceRecord | None:
+        if self.directory is None:
+            return None
+        path = self._path(digest)
+        try:
+            with np.load(path) as data:
+                embedding = data["embedding"] if "embedding" in data.files else None
+                return InferenceRecord(
+                    MedSigLipResult(float(data["risk_score"]), str(data["risk_level"])),
+                    embedding,
+                )
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or corrupt entries (BadZipFile, EOFError, ...) are misses.
+            logger.warning("Discarding unreadable inference cache entry %s", path, exc_info=True)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write(self, digest: str, record: InferenceRecord) -> None:
+        if self.directory is None:
+            return
+        path = self._path(digest)
+        arrays = {
+            "risk_score": np.float32(record.result.risk_score),
+            "risk_level": np.str_(record.result.risk_level),
+        }
+        if record.embedding is not None:
+            arrays["embedding"] = np.asarray(record.embedding, dtype=np.float32)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.savez(handle, **arrays)
+            os.replace(tmp, path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+
+
+def cache_version(model, preprocessor: Preprocessor) -> str:
+    """Cache version for results of ``model`` on images prepared by ``preprocessor``."""
+    return f"{model.version}-{preprocessor.fingerprint}"
+
+
+def get_inference_cache(version: str, config: Mapping, name: str = MEDSIGLIP) -> InferenceCache:
+    """The process's cache for ``name`` at ``version`` (see :func:`cache_version`).
+
+    Sized by ``INFERENCE_CACHE_SIZE`` entries in memory; ``INFERENCE_CACHE_DIR``
+    adds the on-disk tier. A new version gets a fresh cache.
+    """
+    key = (os.getpid(), name)
+    cache = _caches.get(key)
+    if cache is None or cache.version != version:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None or cache.version != version:
+                cache = InferenceCache(
+                    version,
+                    maxsize=config.get("INFERENCE_CACHE_SIZE", 4096),
+                    directory=config.get("INFERENCE_CACHE_DIR") or None,
+                    name=name,
+                )
+                _caches[key] = cache
+    return cache
+
+
+def score_images(images: Sequence[bytes], config: Mapping) -> list[MedSigLipResult]:
+    """MedSigLip results for encoded images, running the model only for unseen ones."""
+
+    model = registry.get(MEDSIGLIP)
+    preprocessor = getattr(_local, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = _local.preprocessor = build_preprocessor(config)
+
+    def infer(missing: list[bytes]) -> list[MedSigLipResult]:
+        return model.predict_batch(preprocessor.batch(missing))
+
+    cache = get_inference_cache(cache_version(model, preprocessor), config)
+    records = cache.score(images, infer)
+    return [record.result for record in records]
+
+
+def inference_cache_stats() -> dict:
+    pid = os.getpid()
+    return {name: cache.stats() for (owner, name), cache in _caches.items() if owner == pid}
@@ -1,11 +1,42 @@
+"""Local MedSigLip risk scoring on ONNX Runtime.
+
+The exported model takes a float32 ``(N, C, H, W)`` batch of preprocessed
+images and returns one risk probability per image, shaped ``(N,)`` or
+``(N, 1)``. Building an ONNX Runtime session is expensive (graph load and
+optimization, arena allocation), so each process keeps one session per model
+file and thread configuration and every :class:`MedSigLipModel` shares it.
+Sessions are keyed by process id as well, so a forked Celery worker builds its
+own instead of inheriting the parent's thread pools. Each model also records
+a short hash of the file it loaded, so caches of its results can tell one
+export from the next.
+
+Thread counts come from ``MEDSIGLIP_INTRA_OP_THREADS`` and
+``MEDSIGLIP_INTER_OP_THREADS``; ``python -m app.ai.reference_model <path>``
+writes a tiny CPU-only stand-in model for development and tests.
+"""
 from __future__ import annotations
 
+import hashlib
+import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 
+try:
+    import onnxruntime
+except ImportError:  # pragma: no cover - optional dependency
+    onnxruntime = None
+
+HIGH_RISK_THRESHOLD = 0.7
+MEDIUM_RISK_THRESHOLD = 0.4
+
+_sessions: dict[tuple, Any] = {}
+_sessions_lock = threading.Lock()
+_versions: dict[tuple[str, int, int], str] = {}
+
 
 @dataclass
 class MedSigLipResult:
@@ -13,21 +44,130 @@ class MedSigLipResult:
     risk_level: str
 
 
+def model_version(model_path: str | Path) -> str:
+    """Short content hash of a model file, recomputed only when the file changes."""
+    path = Path(model_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    version = _versions.get(key)
+    if version is None:
+        digest = hashlib.sha256()
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+        version = _versions[key] = digest.hexdigest()[:16]
+    return version
+
+
+def risk_level(score: float) -> str:
+    if score > HIGH_RISK_THRESHOLD:
+        return "high"
+    if score > MEDIUM_RISK_THRESHOLD:
+        return "medium"
+    return "low"
+
+
 class MedSigLipModel:
-    def __init__(self, model_path: str | Path) -> None:
+    """Batched MedSigLip inference on a shared, per-process ONNX Runtime session.
+
+    ``intra_op_threads`` sizes the pool that parallelizes a single operator;
+    ``0`` lets ONNX Runtime use one thread per physical core, which is right
+    for a dedicated worker but should be divided by the worker concurrency when
+    several processes share the machine. ``inter_op_threads`` only matters for
+    graphs with independent branches and defaults to a sequential executor.
+
+    ``version`` is the :func:`model_version` of the file as it was loaded and
+    does not change if the file is later replaced on disk.
+    """
+
+    def __init__(
+        self,
+        model_path: str | Path,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+        providers: tuple[str, ...] = ("CPUExecutionProvider",),
+    ) -> None:
         self.model_path = Path(model_path)
         if not self.model_path.exists():
-            # In production replace with actual model loading logic (ONNX, TF.js wrapper, etc.)
             raise FileNotFoundError(
                 f"MedSigLip model not found at {self.model_path}. Please provide the converted model."
             )
+        self.version = model_version(self.model_path)
+        self.session = get_session(self.model_path, intra_op_threads, inter_op_threads, providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = tuple(model_input.shape)
+        self.output_name = self.session.get_outputs()[0].name
 
     def predict(self, image_tensor: np.ndarray) -> MedSigLipResult:
-        # Placeholder implementation. Substitute with actual inference.
-        score = float(np.clip(np.mean(image_tensor), 0, 1))
-        level = "high" if score > 0.7 else "medium" if score > 0.4 else "low"
-        return MedSigLipResult(risk_score=score, risk_level=level)
+        """Score one ``(C, H, W)`` image (or a ``(1, C, H, W)`` batch of one)."""
+        batch = np.asarray(image_tensor)
+        if batch.ndim == 3:
+            batch = batch[np.newaxis]
+        if batch.shape[0] != 1:
+            raise ValueError("predict takes a single image; use predict_batch for batches")
+        return self.predict_batch(batch)[0]
+
+    def predict_batch(self, images: np.ndarray) -> list[MedSigLipResult]:
+        """Score an ``(N, C, H, W)`` batch with a single session run."""
+        return [
+            MedSigLipResult(risk_score=score, risk_level=risk_level(score))
+            for score in self.predict_scores(images).tolist()
+        ]
+
+    def predict_scores(self, images: np.ndarray) -> np.ndarray:
+        """Risk probabilities for an ``(N, C, H, W)`` batch, as a float32 ``(N,)`` array."""
+        batch = np.ascontiguousarray(images, dtype=np.float32)
+        if batch.ndim != 4:
+            raise ValueError(f"Expected an (N, C, H, W) batch, got shape {batch.shape}")
+        (scores,) = self.session.run([self.output_name], {self.input_name: batch})
+        return np.clip(scores.reshape(batch.shape[0], -1)[:, 0], 0.0, 1.0)
+
+
+def get_session(
+    model_path: str | Path,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 1,
+    providers: tuple[str, ...] = ("CPUExecutionProvider",),
+):
+    """The process's ONNX Runtime session for ``model_path`` and thread settings."""
+    if onnxruntime is None:
+        raise RuntimeError("onnxruntime is required for MedSigLip inference")
+    path = Path(model_path).resolve()
+    key = (
+        os.getpid(),
+        str(path),
+        model_version(path),
+        intra_op_threads,
+        inter_op_threads,
+        tuple(providers),
+    )
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = onnxruntime.InferenceSession(
+                    str(path),
+                    sess_options=_session_options(intra_op_threads, inter_op_threads),
+                    providers=list(providers),
+                )
+                _sessions[key] = session
+    return session
+
+
+def _session_options(intra_op_threads: int, inter_op_threads: int):
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (
+        onnxruntime.ExecutionMode.ORT_PARALLEL
+        if inter_op_threads > 1
+        else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    )
+    return options
 
 
-def load_model(model_path: str | Path) -> MedSigLipModel:
-    return MedSigLipModel(model_path)
+def load_model(model_path: str | Path, **options) -> MedSigLipModel:
+    return MedSigLipModel(model_path, **options)
@@ -0,0 +1,140 @@
+"""Turn uploaded images into the float32 ``(N, 3, H, W)`` batches MedSigLip expects.
+
+Each image is decoded with Pillow (JPEGs are decoded directly at a reduced
+scale when they are much larger than the target), rotated per its EXIF
+orientation, and resized so its shorter side matches ``size``. The resize and
+the centre crop happen in one resampling pass. The ``uint8`` pixels are then
+normalized (``(x / 255 - mean) / std``, SigLIP's ``0.5`` by default) by one
+vectorized multiply-add straight into a reusable batch buffer, so the only
+per-image allocation is the decoded image itself.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+from os import PathLike
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Mapping, Sequence, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+
+DEFAULT_IMAGE_SIZE = 224
+SIGLIP_MEAN = (0.5, 0.5, 0.5)
+SIGLIP_STD = (0.5, 0.5, 0.5)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+ImageSource = Union[bytes, str, PathLike, BinaryIO, Image.Image]
+
+
+class Preprocessor:
+    """Decode, resize, centre-crop and normalize images into reusable buffers.
+
+    Arrays returned by :meth:`batch` and :meth:`stream` are views of the
+    instance's buffer and are overwritten by the next call; copy them to keep
+    them. An instance is not thread-safe; give each worker thread its own.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_IMAGE_SIZE,
+        mean: Sequence[float] = SIGLIP_MEAN,
+        std: Sequence[float] = SIGLIP_STD,
+        max_batch_size: int = 32,
+        resample: Image.Resampling = Image.Resampling.BILINEAR,
+    ) -> None:
+        self.size = size
+        self.resample = resample
+        self.fingerprint = preprocessing_fingerprint(size, mean, std, resample)
+        std_array = np.asarray(std, dtype=np.float32).reshape(3, 1, 1)
+        # (x / 255 - mean) / std == x * scale + offset
+        self._scale = 1.0 / (255.0 * std_array)
+        self._offset = -np.asarray(mean, dtype=np.float32).reshape(3, 1, 1) / std_array
+        self._buffer = np.empty((max_batch_size, 3, size, size), dtype=np.float32)
+
+    def preprocess(self, source: ImageSource) -> np.ndarray:
+        """One image as a new, contiguous ``(3, size, size)`` array."""
+        out = np.empty((3, self.size, self.size), dtype=np.float32)
+        self._write(self._load(source), out)
+        return out
+
+    def batch(self, sources: Sequence[ImageSource]) -> np.ndarray:
+        """``sources`` as a contiguous ``(N, 3, size, size)`` view of the reusable buffer."""
+        count = len(sources)
+        if count > len(self._buffer):
+            self._buffer = np.empty((count, 3, self.size, self.size), dtype=np.float32)
+        out = self._buffer[:count]
+        for index, source in enumerate(sources):
+            self._write(self._load(source), out[index])
+        return out
+
+    def stream(self, sources: Iterable[ImageSource], batch_size: int) -> Iterator[np.ndarray]:
+        """Yield batches of at most ``batch_size`` images from a lazy iterable.
+
+        Only one batch of decoded images is held at a time, so folders of any
+        size stream in constant memory. Each yielded batch reuses the buffer.
+        """
+        pending: list[ImageSource] = []
+        for source in sources:
+            pending.append(source)
+            if len(pending) == batch_size:
+                yield self.batch(pending)
+                pending.clear()
+        if pending:
+            yield self.batch(pending)
+
+    def _load(self, source: ImageSource) -> Image.Image:
+        image = source if isinstance(source, Image.Image) else _open(source)
+        if image.format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still
+            # leaves at least ``size`` pixels on the shorter side.
+            image.draft("RGB", (self.size, self.size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        width, height = image.size
+        side = min(width, height)
+        left, top = (width - side) / 2, (height - side) / 2
+        return image.resize(
+            (self.size, self.size),
+            self.resample,
+            box=(left, top, left + side, top + side),
+        )
+
+    def _write(self, image: Image.Image, out: np.ndarray) -> None:
+        pixels = np.asarray(image).transpose(2, 0, 1)
+        np.multiply(pixels, self._scale, out=out)
+        out += self._offset
+
+
+def preprocessing_fingerprint(
+    size: int,
+    mean: Sequence[float] = SIGLIP_MEAN,
+    std: Sequence[float] = SIGLIP_STD,
+    resample: Image.Resampling = Image.Resampling.BILINEAR,
+) -> str:
+    """Short hash of the settings that decide the pixels a model sees."""
+    settings = (int(size), [float(v) for v in mean], [float(v) for v in std], int(resample))
+    return hashlib.sha256(repr(settings).encode()).hexdigest()[:8]
+
+
+def build_preprocessor(config: Mapping) -> Preprocessor:
+    """A preprocessor sized by ``MEDSIGLIP_IMAGE_SIZE`` and ``MEDSIGLIP_MAX_BATCH_SIZE``."""
+    return Preprocessor(
+        size=config.get("MEDSIGLIP_IMAGE_SIZE", DEFAULT_IMAGE_SIZE),
+        max_batch_size=config.get("MEDSIGLIP_MAX_BATCH_SIZE", 16),
+    )
+
+
+def iter_image_files(folder: str | PathLike) -> Iterator[Path]:
+    """Image files under ``folder``, recursively and in a stable order."""
+    for path in sorted(Path(folder).rglob("*")):
+        if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+            yield path
+
+
+def _open(source: ImageSource) -> Image.Image:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return Image.open(source)
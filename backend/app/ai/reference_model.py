@@ -0,0 +1,56 @@
+"""A tiny stand-in for the MedSigLip export, for tests, benchmarks and local development.
+
+The graph has the real model's interface (float32 ``(N, 3, H, W)`` in, one
+probability per image out) but only computes ``sigmoid(mean(image))``, so it
+runs anywhere ONNX Runtime does. Write one to the configured path with::
+
+    python -m app.ai.reference_model ./models/medsiglip_local.onnx
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+OPSET = 13
+INPUT_NAME = "pixel_values"
+OUTPUT_NAME = "risk"
+
+
+def build_reference_model(path: str | Path, channels: int = 3) -> Path:
+    """Write the reference model to ``path`` (height and width are dynamic)."""
+    import onnx
+    from onnx import TensorProto, helper
+
+    pixel_values = helper.make_tensor_value_info(
+        INPUT_NAME, TensorProto.FLOAT, ["batch", channels, "height", "width"]
+    )
+    risk = helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, ["batch"])
+    graph = helper.make_graph(
+        [
+            # Opset 13 still takes ReduceMean axes as an attribute.
+            helper.make_node("ReduceMean", [INPUT_NAME], ["mean"], axes=[1, 2, 3], keepdims=0),
+            helper.make_node("Sigmoid", ["mean"], [OUTPUT_NAME]),
+        ],
+        "medsiglip_reference",
+        [pixel_values],
+        [risk],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(path))
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    args = parser.parse_args()
+    print(build_reference_model(args.path))
+
+
+if __name__ == "__main__":
+    main()
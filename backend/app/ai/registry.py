@@ -0,0 +1,175 @@
+"""Process-wide registry of loaded inference models.
+
+Each model is loaded at most once per process, on first use or when preloaded,
+and then warmed up with a dummy batch so the first real request does not pay
+for graph optimization and memory arena growth. Loading holds a per-model lock,
+so concurrent first callers wait for one load instead of racing.
+
+Loaded models are tied to the process that loaded them: after a fork (Celery's
+prefork pool) the child starts with an empty registry and loads its own copy,
+ideally from the ``worker_process_init`` hook. Set ``AI_PRELOAD_MODELS`` (for
+example ``medsiglip``) to preload in ``create_app`` and in every worker.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping
+
+import numpy as np
+
+from .medsiglip import MedSigLipModel, load_model
+
+logger = logging.getLogger(__name__)
+
+MEDSIGLIP = "medsiglip"
+
+
+@dataclass
+class ModelSpec:
+    factory: Callable[[], Any]
+    warmup: Callable[[Any], None] | None = None
+
+
+@dataclass
+class LoadTimings:
+    load_seconds: float
+    warmup_seconds: float
+    loaded_at: float
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        self._specs: dict[str, ModelSpec] = {}
+        self._models: dict[str, Any] = {}
+        self._timings: dict[str, LoadTimings] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def register(
+        self, name: str, factory: Callable[[], Any], warmup: Callable[[Any], None] | None = None
+    ) -> None:
+        """Declare how to build ``name``; replaces any loaded instance."""
+        with self._lock:
+            self._reset_after_fork()
+            self._specs[name] = ModelSpec(factory, warmup)
+            self._models.pop(name, None)
+            self._timings.pop(name, None)
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str):
+        """The loaded model ``name``, loading and warming it up on first use."""
+        model = self._models.get(name) if self._pid == os.getpid() else None
+        if model is not None:
+            return model
+
+        with self._lock:
+            self._reset_after_fork()
+            if name not in self._specs:
+                raise KeyError(f"No model registered as {name!r}")
+            spec, lock = self._specs[name], self._locks[name]
+        with lock:
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name, spec)
+        return model
+
+    def preload(self, names: Iterable[str] | None = None) -> None:
+        for name in list(self._specs) if names is None else names:
+            self.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return self._pid == os.getpid() and name in self._models
+
+    def timings(self) -> dict[str, dict]:
+        if self._pid != os.getpid():
+            return {}
+        return {
+            name: {
+                "load_seconds": timing.load_seconds,
+                "warmup_seconds": timing.warmup_seconds,
+                "loaded_at": timing.loaded_at,
+            }
+            for name, timing in self._timings.items()
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._specs.clear()
+            self._models.clear()
+            self._timings.clear()
+            self._locks.clear()
+
+    def _load(self, name: str, spec: ModelSpec):
+        start = time.perf_counter()
+        model = spec.factory()
+        loaded = time.perf_counter()
+        if spec.warmup is not None:
+            spec.warmup(model)
+        warmed = time.perf_counter()
+
+        self._timings[name] = LoadTimings(loaded - start, warmed - loaded, time.time())
+        self._models[name] = model
+        logger.info(
+            "Loaded model %s in %.3fs (warmup %.3fs)", name, loaded - start, warmed - loaded
+        )
+        return model
+
+    def _reset_after_fork(self) -> None:
+        # Called with self._lock held. Specs survive the fork; instances do not.
+        if self._pid != os.getpid():
+            self._models.clear()
+            self._timings.clear()
+            self._locks = {name: threading.Lock() for name in self._specs}
+            self._pid = os.getpid()
+
+
+registry = ModelRegistry()
+
+
+def configure_models(config: Mapping) -> None:
+    """Register the models described by an app (or Celery) config."""
+    options = {
+        "intra_op_threads": config.get("MEDSIGLIP_INTRA_OP_THREADS", 0),
+        "inter_op_threads": config.get("MEDSIGLIP_INTER_OP_THREADS", 1),
+    }
+    path = config.get("MEDSIGLIP_MODEL_PATH")
+    registry.register(
+        MEDSIGLIP,
+        lambda: load_model(path, **options),
+        medsiglip_warmup(
+            config.get("MEDSIGLIP_WARMUP_BATCH", 1), config.get("MEDSIGLIP_IMAGE_SIZE", 224)
+        ),
+    )
+
+
+def init_models(config: Mapping) -> list[str]:
+    """Register the configured models and load those named in ``AI_PRELOAD_MODELS``."""
+    configure_models(config)
+    names = [name.strip() for name in config.get("AI_PRELOAD_MODELS", "").split(",")]
+    names = [name for name in names if name]
+    registry.preload(names)
+    return names
+
+
+def medsiglip_warmup(batch_size: int, image_size: int) -> Callable[[MedSigLipModel], None] | None:
+    if batch_size <= 0:
+        return None
+
+    def warmup(model: MedSigLipModel) -> None:
+        # Static dimensions of the export win over the configured image size.
+        _, channels, height, width = (
+            dim if isinstance(dim, int) else default
+            for dim, default in zip(model.input_shape, (batch_size, 3, image_size, image_size))
+        )
+        model.predict_scores(np.zeros((batch_size, channels, height, width), dtype=np.float32))
+
+    return warmup
+
+
+def get_model(name: str = MEDSIGLIP):
+    return registry.get(name)
@@ -1,20 +1,74 @@
 from __future__ import annotations
 
-import json
+from collections import ChainMap
+from typing import Iterable
+
 import requests
+from celery import group
+from celery.signals import worker_process_init
 from celery.utils.log import get_task_logger
+from sqlalchemy import insert, select
 
+from ..config import Config
 from ..extensions import celery_app, db
+from ..json_provider import loads
 from ..models import Case, MedGemmaQueue
+from .registry import init_models
 
 logger = get_task_logger(__name__)
 
+QUEUE_CHUNK_SIZE = 500
+
+
+@worker_process_init.connect
+def preload_worker_models(**_kwargs) -> None:
+    """Load ``AI_PRELOAD_MODELS`` in each pool process, after the fork."""
+    try:
+        init_models(ChainMap(celery_app.conf, vars(Config)))
+    except Exception:
+        # Keep the worker up; the model loads (and fails loudly) on first use.
+        logger.exception("Could not preload models in worker process")
+
+
+def enqueue_medgemma_cases(case_ids: Iterable[str]) -> list[str]:
+    """Add queue entries for cases that are not queued yet and return their ids.
+
+    Existing entries are found with one ``IN`` query per chunk and the missing ones
+    are written with a single multi-row ``INSERT``. The caller owns the commit.
+    """
+    case_ids = list(dict.fromkeys(case_ids))
+    queued = set()
+    for start in range(0, len(case_ids), QUEUE_CHUNK_SIZE):
+        chunk = case_ids[start : start + QUEUE_CHUNK_SIZE]
+        stmt = select(MedGemmaQueue.case_id).where(MedGemmaQueue.case_id.in_(chunk))
+        queued.update(db.session.execute(stmt).scalars())
+
+    new_ids = [case_id for case_id in case_ids if case_id not in queued]
+    if new_ids:
+        db.session.execute(insert(MedGemmaQueue), [{"case_id": case_id} for case_id in new_ids])
+    return new_ids
+
+
+def dispatch_medgemma_analyses(case_ids: list[str]) -> None:
+    """Send one analysis task per case as a single Celery group.
+
+    Call only after the queue entries are committed so workers can see them.
+    """
+    if not case_ids:
+        return
+    try:
+        group(run_medgemma_analysis.s(case_id) for case_id in case_ids).apply_async()
+    except Exception as exc:
+        logger.warning(
+            "Could not dispatch MedGemma analysis for %d cases: %s", len(case_ids), exc
+        )
+
 
 def create_medgemma_payload(case: Case) -> dict:
     """Create payload for MedGemma model analysis."""
     try:
-        triage_data = json.loads(case.triage_data) if case.triage_data else {}
-        image_urls = json.loads(case.image_urls) if case.image_urls else []
+        triage_data = case.triage_data or {}
+        image_urls = loads(case.image_urls) if case.image_urls else []
 
         payload = {
             "case_id": case.id,
@@ -28,11 +82,7 @@ def create_medgemma_payload(case: Case) -> dict:
 
         # Add patient demographics if available
         if case.patient and case.patient.demographics:
-            try:
-                demographics = json.loads(case.patient.demographics)
-                payload["patient_demographics"] = demographics
-            except json.JSONDecodeError:
-                payload["patient_demographics"] = case.patient.demographics
+            payload["patient_demographics"] = case.patient.demographics
 
         return payload
     except Exception as e:
@@ -102,7 +152,8 @@ def run_medgemma_analysis(self, case_id: str) -> None:
         medgemma_result = mock_response
 
         # Update case with MedGemma analysis results
-        case.ai_analysis = json.dumps(medgemma_result)
+        case.ai_analysis = medgemma_result
+        case.priority = medgemma_result.get("analysis", {}).get("severity_score")
         case.status = "PENDING_DIAGNOSIS"
 
         if queue_entry:
@@ -119,11 +170,11 @@ def run_medgemma_analysis(self, case_id: str) -> None:
 
         # Update case status to indicate analysis failure
         case.status = "ANALYSIS_FAILED"
-        case.ai_analysis = json.dumps({
+        case.ai_analysis = {
             "status": "failed",
             "error": str(e),
             "attempts": queue_entry.attempts if queue_entry else 1
-        })
+        }
 
         db.session.commit()
 
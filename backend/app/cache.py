@@ -0,0 +1,207 @@
+"""Bounded key/value caches shared across the API.
+
+``get_cache`` hands out one cache per namespace and app. With
+``CACHE_BACKEND = "redis"`` values are stored JSON-encoded in Redis so every
+worker shares them; otherwise each process keeps an in-memory LRU with TTL.
+Redis errors are logged and treated as misses so a cache outage never fails a
+request.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from flask import current_app
+
+from .json_provider import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with an optional per-entry time to live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key: str, value, ttl: float | None = None) -> bool:
+        """Store ``value`` only if ``key`` holds no live entry; return whether it did."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and (entry[0] is None or entry[0] > now):
+                return False
+            self._entries[key] = (now + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RedisCache:
+    """Namespaced JSON values in Redis; the server's own maxmemory policy bounds it."""
+
+    def __init__(self, client, namespace: str, ttl: float | None = None) -> None:
+        self.client = client
+        self.prefix = f"dermadetect:{namespace}:"
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str, default=None):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as exc:
+            self._log_error("get", exc)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return loads(raw)
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(
+                self.prefix + key,
+                dumps_bytes(value),
+                px=int(ttl * 1000) if ttl else None,
+            )
+        except Exception as exc:
+            self._log_error("set", exc)
+
+    def add(self, key: str, value, ttl: float | None = None) -> bool:
+        """``SET NX``: store ``value`` only if ``key`` is absent; return whether it did.
+
+        A Redis error counts as success so an outage never blocks a request.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            return bool(
+                self.client.set(
+                    self.prefix + key,
+                    dumps_bytes(value),
+                    nx=True,
+                    px=int(ttl * 1000) if ttl else None,
+                )
+            )
+        except Exception as exc:
+            self._log_error("add", exc)
+            return True
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as exc:
+            self._log_error("delete", exc)
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as exc:
+            self._log_error("clear", exc)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    def _log_error(self, operation: str, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Redis cache %s failed for %s: %s", operation, self.prefix, exc)
+
+
+def get_cache(namespace: str, maxsize: int = 1024, ttl: float | None = None):
+    """Return the app's cache for ``namespace``, creating it on first use."""
+    caches = current_app.extensions.setdefault("dermadetect_caches", {})
+    cache = caches.get(namespace)
+    if cache is None:
+        if current_app.config["CACHE_BACKEND"] == "redis":
+            cache = RedisCache(_redis_client(), namespace, ttl)
+        else:
+            cache = MemoryCache(maxsize, ttl)
+        caches[namespace] = cache
+    return cache
+
+
+def cache_stats() -> dict:
+    caches = current_app.extensions.get("dermadetect_caches", {})
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
+
+
+def _redis_client():
+    client = current_app.extensions.get("dermadetect_redis")
+    if client is None:
+        import redis
+
+        client = redis.Redis.from_url(
+            current_app.config["REDIS_URL"], socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        current_app.extensions["dermadetect_redis"] = client
+    return client
@@ -0,0 +1,187 @@
+"""Content-Encoding negotiation for the sync and list endpoints.
+
+Request bodies sent with ``Content-Encoding: gzip`` or ``zstd`` are inflated by a
+WSGI middleware before Flask parses them, with a hard cap on the inflated size
+(``MAX_DECOMPRESSED_BODY``).
+Responses from the endpoints in :data:`COMPRESSIBLE_ENDPOINTS` are compressed
+according to ``Accept-Encoding`` once they are larger than
+``COMPRESSION_MIN_SIZE``; streamed responses are compressed chunk by chunk.
+"""
+from __future__ import annotations
+
+import io
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Flask, Response, current_app, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+
+from .json_provider import dumps_bytes
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_ENDPOINTS = {
+    "sync.sync_endpoint",
+    "sync.finalize_sync_session",
+    "patients.get_patients",
+    "cases.get_cases",
+    "cases.get_pending_cases",
+    "vitals.get_patient_vitals",
+}
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class BodyTooLarge(ValueError):
+    pass
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this process can produce, in order of preference."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def gzip_decompress(body: bytes, limit: int) -> bytes:
+    decoder = zlib.decompressobj(GZIP_WBITS)
+    data = decoder.decompress(body, limit + 1)
+    if len(data) > limit:
+        raise BodyTooLarge
+    if not decoder.eof:
+        raise ValueError("Truncated gzip body")
+    return data
+
+
+def zstd_decompress(body: bytes, limit: int) -> bytes:
+    reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body))
+    chunks = []
+    size = 0
+    while True:
+        chunk = reader.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def compress(data: bytes, encoding: str, config) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=config["ZSTD_LEVEL"]).compress(data)
+    encoder = zlib.compressobj(config["GZIP_LEVEL"], zlib.DEFLATED, GZIP_WBITS)
+    return encoder.compress(data) + encoder.flush()
+
+
+def compress_stream(chunks: Iterable, encoding: str, config) -> Iterator[bytes]:
+    """Compress a streamed body, flushing after every chunk so clients can decode it live."""
+    if encoding == "zstd":
+        encoder = zstandard.ZstdCompressor(level=config["ZSTD_LEVEL"]).compressobj()
+        flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        for chunk in chunks:
+            yield encoder.compress(_to_bytes(chunk)) + encoder.flush(flush_block)
+        yield encoder.flush()
+        return
+
+    encoder = zlib.compressobj(config["GZIP_LEVEL"], zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        yield encoder.compress(_to_bytes(chunk)) + encoder.flush(zlib.Z_SYNC_FLUSH)
+    yield encoder.flush()
+
+
+def _to_bytes(chunk) -> bytes:
+    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+class DecompressionMiddleware:
+    """Inflate compressed request bodies before the application reads them."""
+
+    def __init__(self, wsgi_app, max_size: int) -> None:
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if encoding in ("", "identity"):
+            return self.wsgi_app(environ, start_response)
+
+        decoders = {"gzip": gzip_decompress}
+        if zstandard is not None:
+            decoders["zstd"] = zstd_decompress
+        decoder = decoders.get(encoding)
+        if decoder is None:
+            return _error(415, f"Unsupported Content-Encoding: {encoding}")(
+                environ, start_response
+            )
+
+        try:
+            body = get_input_stream(environ, max_content_length=self.max_size).read()
+            data = decoder(body, self.max_size)
+        except (BodyTooLarge, RequestEntityTooLarge):
+            return _error(413, "Decompressed body too large")(environ, start_response)
+        except Exception:
+            return _error(400, "Malformed compressed body")(environ, start_response)
+
+        environ["wsgi.input"] = io.BytesIO(data)
+        environ["CONTENT_LENGTH"] = str(len(data))
+        environ.pop("HTTP_CONTENT_ENCODING", None)
+        environ.pop("wsgi.input_terminated", None)
+        return self.wsgi_app(environ, start_response)
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(dumps_bytes({"error": message}), status=status, mimetype="application/json")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The strong ETag of ``encoding``'s representation of an entity tagged ``etag``."""
+    return f"{etag}-{encoding}"
+
+
+def etag_variants(etag: str) -> list[str]:
+    """``etag`` plus its tag under every encoding this process can produce."""
+    return [etag, *(encoded_etag(etag, encoding) for encoding in supported_encodings())]
+
+
+def negotiate_encoding() -> str | None:
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response: Response) -> Response:
+    if request.endpoint not in COMPRESSIBLE_ENDPOINTS or response.status_code != 200:
+        return response
+    if "Content-Encoding" in response.headers or response.direct_passthrough:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    config = current_app.config
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, config)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESSION_MIN_SIZE"]:
+            return response
+        response.set_data(compress(data, encoding, config))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    app.wsgi_app = DecompressionMiddleware(app.wsgi_app, app.config["MAX_DECOMPRESSED_BODY"])
+    app.after_request(compress_response)
@@ -0,0 +1,95 @@
+"""Conditional GET for the list endpoints.
+
+A list's validators come from one aggregate over the same filtered statement:
+the row count and the newest ``updated_at`` (including rows of nested
+relationships the schema embeds). The ``ETag`` hashes both, so it changes
+whenever a row is inserted, updated or removed from the result set, and a
+client that sends it back in ``If-None-Match`` gets ``304 Not Modified`` before
+any ORM object is loaded or serialized.
+
+``Last-Modified`` is only the newest ``updated_at`` and does not move when a
+row leaves the set, so it is only sent (and ``If-Modified-Since`` only
+honoured) for lists whose rows never drop out of their filter. Lists such as
+the pending queue, which cases leave once diagnosed, validate by ``ETag`` only.
+
+Compressed responses carry the tag with an ``-<encoding>`` suffix (see
+:func:`app.compression.encoded_etag`) so every representation has its own
+strong ETag; any of them validates the data on the next request.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func
+
+from .compression import etag_variants
+from .extensions import db
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: datetime | None
+
+
+def list_validators(stmt, model, depends_on=(), rows_can_leave=False) -> Validators:
+    """Validators for ``stmt`` (a filtered ``select(model)``) under the current request.
+
+    ``depends_on`` lists many-to-one relationships the response embeds, whose
+    ``updated_at`` must also invalidate the tag. ``rows_can_leave`` drops
+    ``Last-Modified`` for lists whose rows can stop matching the filter.
+    """
+    aggregate = stmt.order_by(None)
+    columns = [func.count(model.id), func.max(model.updated_at)]
+    for relationship in depends_on:
+        aggregate = aggregate.outerjoin(relationship)
+        columns.append(func.max(relationship.property.mapper.class_.updated_at))
+    count, *timestamps = db.session.execute(aggregate.with_only_columns(*columns)).one()
+
+    timestamps = [value for value in timestamps if value is not None]
+    last_modified = max(timestamps) if timestamps and not rows_can_leave else None
+    key = "|".join(
+        [
+            model.__tablename__,
+            str(get_jwt_identity()),
+            request.query_string.decode("latin-1"),
+            str(count),
+            *(value.isoformat() for value in timestamps),
+        ]
+    )
+    return Validators(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32], last_modified)
+
+
+def not_modified(validators: Validators):
+    """A ``304`` response if the request's preconditions match ``validators``, else ``None``."""
+    if request.if_none_match:
+        for tag in etag_variants(validators.etag):
+            if request.if_none_match.contains(tag):
+                return _not_modified_response(validators, tag)
+        return None
+
+    since = request.if_modified_since
+    if since is not None and validators.last_modified is not None:
+        last_modified = validators.last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        if last_modified <= since:
+            return _not_modified_response(validators, validators.etag)
+    return None
+
+
+def apply_validators(response, validators: Validators):
+    response.set_etag(validators.etag)
+    if validators.last_modified is not None:
+        response.last_modified = validators.last_modified
+    return response
+
+
+def _not_modified_response(validators: Validators, etag: str):
+    response = current_app.response_class(status=304)
+    apply_validators(response, validators)
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    return response
@@ -21,4 +21,45 @@ class Config:
         "task_always_eager": os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true",
     }
 
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory" or "redis"
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "256"))
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
+    # Lifetime of the in-flight reservation; longer than any sync request takes.
+    IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+
+    SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+    SYNC_MAX_PAGE_SIZE = 2000
+    SYNC_STREAM_BATCH_SIZE = int(os.getenv("SYNC_STREAM_BATCH_SIZE", "500"))
+    PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+    PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+    # Cap for the in-process cache, which other workers' revocations cannot reach.
+    PRINCIPAL_LOCAL_CACHE_TTL = int(os.getenv("PRINCIPAL_LOCAL_CACHE_TTL", "30"))
+    STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "30"))
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+    CASE_CLAIM_TTL = int(os.getenv("CASE_CLAIM_TTL", str(15 * 60)))
+    CASE_CLAIM_MAX_BATCH = 20
+    LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100"))
+    LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+    SYNC_MAX_CHUNK_BYTES = int(os.getenv("SYNC_MAX_CHUNK_BYTES", str(2 * 1024 * 1024)))
+
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL = 6
+    ZSTD_LEVEL = 3
+    MAX_DECOMPRESSED_BODY = int(os.getenv("MAX_DECOMPRESSED_BODY", str(32 * 1024 * 1024)))
+
     MEDSIGLIP_MODEL_PATH = os.getenv("MEDSIGLIP_MODEL_PATH", "./models/medsiglip_local.onnx")
+    # 0 uses one thread per physical core; divide by the worker concurrency when
+    # several inference processes share a machine.
+    MEDSIGLIP_INTRA_OP_THREADS = int(os.getenv("MEDSIGLIP_INTRA_OP_THREADS", "0"))
+    MEDSIGLIP_INTER_OP_THREADS = int(os.getenv("MEDSIGLIP_INTER_OP_THREADS", "1"))
+    MEDSIGLIP_IMAGE_SIZE = int(os.getenv("MEDSIGLIP_IMAGE_SIZE", "224"))
+    MEDSIGLIP_WARMUP_BATCH = int(os.getenv("MEDSIGLIP_WARMUP_BATCH", "1"))
+    MEDSIGLIP_MAX_BATCH_SIZE = int(os.getenv("MEDSIGLIP_MAX_BATCH_SIZE", "16"))
+    MEDSIGLIP_MAX_WAIT_MS = float(os.getenv("MEDSIGLIP_MAX_WAIT_MS", "5"))
+    INFERENCE_CACHE_SIZE = int(os.getenv("INFERENCE_CACHE_SIZE", "4096"))
+    # Directory for results that survive restarts; empty keeps them in memory only.
+    INFERENCE_CACHE_DIR = os.getenv("INFERENCE_CACHE_DIR", "")
+    # Comma-separated model names to load at startup, e.g. "medsiglip".
+    AI_PRELOAD_MODELS = os.getenv("AI_PRELOAD_MODELS", "")
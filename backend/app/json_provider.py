@@ -0,0 +1,71 @@
+"""One JSON implementation for responses, request bodies, caches and JSON columns.
+
+Uses orjson when it is installed and falls back to the standard library with
+matching output: datetimes, dates and times become ISO 8601 strings, UUIDs
+and anything else unknown become ``str(value)``, and non-ASCII text is
+written as UTF-8 rather than escaped.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_bytes(value, sort_keys: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=_default, option=option)
+    return _stdlib_dumps(value, sort_keys).encode("utf-8")
+
+
+def dumps(value, sort_keys: bool = False) -> str:
+    if orjson is not None:
+        return dumps_bytes(value, sort_keys).decode("utf-8")
+    return _stdlib_dumps(value, sort_keys)
+
+
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdlib_dumps(value, sort_keys: bool) -> str:
+    return json.dumps(
+        value,
+        default=_default,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=sort_keys,
+    )
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider behind ``jsonify`` and ``request.get_json``."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", False))
+
+    def loads(self, s: str | bytes, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,119 @@
+"""Keyset pagination and column projection for the list endpoints.
+
+List endpoints keep returning a plain JSON array, always paged in stable
+``(created_at, id)`` order: ``limit`` picks the page size (``LIST_PAGE_SIZE``
+when omitted, at most ``LIST_MAX_PAGE_SIZE``) and, when more rows remain, the
+``X-Next-Cursor`` header is set; the client sends it back as ``after`` (the
+app's ``src/services/api.ts`` does so until no cursor comes back).
+``fields=a,b`` selects only those columns instead of loading ORM objects.
+Responses carry an ``ETag`` (and ``Last-Modified`` unless rows can leave the
+list) and honour conditional requests (see :mod:`app.conditional`).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import RowMapping
+
+from .conditional import apply_validators, list_validators, not_modified
+from .extensions import db
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidListQuery(ValueError):
+    """Raised for a ``limit``, ``after`` or ``fields`` value the endpoint cannot serve."""
+
+
+def list_response(stmt, model, schema_class, options=(), depends_on=(), rows_can_leave=False):
+    """Run ``stmt`` (a ``select(model)``) as one page shaped by the request arguments.
+
+    ``depends_on`` names the relationships ``schema_class`` nests, for the ETag;
+    ``rows_can_leave`` marks lists rows drop out of (see :func:`list_validators`).
+    """
+    limit = _parse_limit(request.args.get("limit"))
+    fields = _parse_fields(request.args.get("fields"), model, schema_class)
+    after = request.args.get("after")
+    position = _decode_position(after) if after else None
+
+    # Validators cover the whole filtered set, not just this page: a change
+    # anywhere in it invalidates every page, which is conservative but cheap.
+    validators = list_validators(stmt, model, depends_on, rows_can_leave)
+    cached = not_modified(validators)
+    if cached is not None:
+        return cached
+
+    stmt = stmt.order_by(model.created_at, model.id)
+    if position is not None:
+        created_at, record_id = position
+        stmt = stmt.where(
+            or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > record_id),
+            )
+        )
+    stmt = stmt.limit(limit + 1)
+
+    if fields is None:
+        rows = db.session.execute(stmt.options(*options)).unique().scalars().all()
+    else:
+        columns = model.__table__.columns
+        names = dict.fromkeys(["id", "created_at", *fields])
+        stmt = stmt.with_only_columns(*(columns[name] for name in names))
+        rows = db.session.execute(stmt).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_position(rows[-1])
+
+    response = jsonify(schema_class(many=True, only=fields).dump(rows))
+    apply_validators(response, validators)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def _parse_limit(raw: str | None) -> int:
+    if raw is None:
+        return current_app.config["LIST_PAGE_SIZE"]
+    try:
+        limit = int(raw)
+    except ValueError as exc:
+        raise InvalidListQuery("limit must be an integer") from exc
+    if limit < 1:
+        raise InvalidListQuery("limit must be at least 1")
+    return min(limit, current_app.config["LIST_MAX_PAGE_SIZE"])
+
+
+def _parse_fields(raw: str | None, model, schema_class) -> tuple[str, ...] | None:
+    """Fields that are both declared on the schema and real columns of ``model``."""
+    if not raw:
+        return None
+    allowed = set(schema_class._declared_fields) & {c.key for c in model.__table__.columns}
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    if not fields:
+        raise InvalidListQuery("fields must name at least one column")
+    unknown = sorted(set(fields) - allowed)
+    if unknown:
+        raise InvalidListQuery(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _encode_position(row) -> str:
+    if isinstance(row, RowMapping):
+        created_at, record_id = row["created_at"], row["id"]
+    else:
+        created_at, record_id = row.created_at, row.id
+    return encode_cursor({"created_at": created_at.isoformat(), "id": record_id})
+
+
+def _decode_position(cursor: str) -> tuple[datetime, str]:
+    try:
+        position = decode_cursor(cursor)
+        return datetime.fromisoformat(position["created_at"]), str(position["id"])
+    except (InvalidCursor, KeyError, TypeError, ValueError) as exc:
+        raise InvalidListQuery("Invalid cursor") from exc
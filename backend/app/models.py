@@ -3,11 +3,65 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, Text
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    JSON,
+    Integer,
+    String,
+    Text,
+    TypeDecorator,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .extensions import db
+from .json_provider import loads
+
+
+def decode_json_text(value):
+    """Decode a document that arrives as JSON text (e.g. from ``JSON.stringify``).
+
+    Only text that encodes an object or array is decoded; any other string,
+    such as a plain ``"500"`` or ``"true"`` prescription, is kept as written.
+    """
+    if isinstance(value, str) and value.lstrip()[:1] in ("{", "["):
+        try:
+            decoded = loads(value)
+        except ValueError:
+            return value
+        if isinstance(decoded, (dict, list)):
+            return decoded
+    return value
+
+
+class JSONDocument(TypeDecorator):
+    """JSON column (JSONB on PostgreSQL) holding a structured document.
+
+    Older clients still send these fields as JSON-encoded strings; objects and
+    arrays are decoded once on the way in so the column stores the document
+    itself, and other strings are stored unchanged.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self) -> None:
+        super().__init__(none_as_null=True)
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(JSON(none_as_null=True))
+
+    def process_bind_param(self, value, dialect):
+        return decode_json_text(value)
 
 
 class BaseModel(db.Model):
@@ -31,6 +85,7 @@ class SyncMixin:
     last_modified_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, nullable=False
     )
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
 
 class CHWUser(BaseModel):
@@ -39,6 +94,7 @@ class CHWUser(BaseModel):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(128), nullable=False)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    principal_version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
     patients: Mapped[list[Patient]] = relationship("Patient", back_populates="chw")
     cases: Mapped[list[Case]] = relationship("Case", back_populates="chw")
@@ -51,17 +107,22 @@ class DoctorUser(BaseModel):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(128), nullable=False)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    principal_version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
     diagnoses: Mapped[list[Diagnosis]] = relationship("Diagnosis", back_populates="doctor")
 
 
 class Patient(BaseModel, SyncMixin):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_chw_sync_position", "chw_id", "last_modified_at", "id"),
+        Index("ix_patients_chw_list_position", "chw_id", "created_at", "id"),
+    )
 
     chw_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("chw_users.id"), nullable=False
     )
-    demographics: Mapped[str] = mapped_column(Text, nullable=False)
+    demographics: Mapped[dict] = mapped_column(JSONDocument, nullable=False)
 
     chw: Mapped[CHWUser] = relationship("CHWUser", back_populates="patients")
     cases: Mapped[list[Case]] = relationship("Case", back_populates="patient")
@@ -70,6 +131,12 @@ class Patient(BaseModel, SyncMixin):
 
 class Case(BaseModel, SyncMixin):
     __tablename__ = "cases"
+    __table_args__ = (
+        Index("ix_cases_chw_sync_position", "chw_id", "last_modified_at", "id"),
+        Index("ix_cases_chw_list_position", "chw_id", "created_at", "id"),
+        Index("ix_cases_pending_list_position", "risk_level", "status", "created_at", "id"),
+        Index("ix_cases_work_queue", "risk_level", "status", "priority", "created_at"),
+    )
 
     patient_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("patients.id"), nullable=False
@@ -77,11 +144,17 @@ class Case(BaseModel, SyncMixin):
     chw_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("chw_users.id"), nullable=False
     )
-    triage_data: Mapped[str] = mapped_column(Text, nullable=False)
-    ai_analysis: Mapped[str | None] = mapped_column(Text, nullable=True)
+    triage_data: Mapped[dict] = mapped_column(JSONDocument, nullable=False)
+    ai_analysis: Mapped[dict | None] = mapped_column(JSONDocument, nullable=True)
     status: Mapped[str] = mapped_column(String(32), default="TRIAGED", nullable=False)
     risk_level: Mapped[str] = mapped_column(String(16), nullable=False)
     image_urls: Mapped[str] = mapped_column(Text, nullable=True)
+    # MedGemma severity score; higher-priority cases are handed to doctors first.
+    priority: Mapped[float | None] = mapped_column(Float, nullable=True)
+    claimed_by: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("doctor_users.id"), nullable=True
+    )
+    claim_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     patient: Mapped[Patient] = relationship("Patient", back_populates="cases")
     chw: Mapped[CHWUser] = relationship("CHWUser", back_populates="cases")
@@ -93,15 +166,21 @@ class Case(BaseModel, SyncMixin):
 
 class Diagnosis(BaseModel, SyncMixin):
     __tablename__ = "diagnoses"
+    __table_args__ = (
+        Index("ix_diagnoses_sync_position", "last_modified_at", "id"),
+        Index("ix_diagnoses_doctor_created", "doctor_id", "created_at"),
+    )
 
     case_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("cases.id"), nullable=False
+        String(36), ForeignKey("cases.id"), nullable=False, index=True
     )
     doctor_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("doctor_users.id"), nullable=False
     )
     diagnosis_text: Mapped[str] = mapped_column(Text, nullable=False)
-    prescription: Mapped[str | None] = mapped_column(Text, nullable=True)
+    prescription: Mapped[dict | list | str | None] = mapped_column(
+        JSONDocument, nullable=True
+    )
 
     case: Mapped[Case] = relationship("Case", back_populates="diagnoses")
     doctor: Mapped[DoctorUser] = relationship("DoctorUser", back_populates="diagnoses")
@@ -109,6 +188,10 @@ class Diagnosis(BaseModel, SyncMixin):
 
 class Vitals(BaseModel, SyncMixin):
     __tablename__ = "vitals"
+    __table_args__ = (
+        Index("ix_vitals_chw_sync_position", "chw_id", "last_modified_at", "id"),
+        Index("ix_vitals_patient_list_position", "patient_id", "created_at", "id"),
+    )
 
     patient_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("patients.id"), nullable=False
@@ -135,3 +218,61 @@ class MedGemmaQueue(BaseModel):
     attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
     case: Mapped[Case] = relationship("Case", back_populates="queue_entries")
+
+
+class ChangeLog(db.Model):
+    """Append-only feed of writes to syncable rows, ordered by ``seq``.
+
+    Clients remember the last ``seq`` they applied and ask for everything after
+    it, so catching up costs one index range scan on ``(chw_id, seq)`` instead of
+    a ``last_modified_at`` scan that depends on device clocks.
+    """
+
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_chw_seq", "chw_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    collection: Mapped[str] = mapped_column(String(32), nullable=False)
+    record_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    chw_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    # Comma-separated columns the write touched; NULL means the whole row (inserts).
+    fields: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+
+
+class SyncSession(BaseModel):
+    """A large offline upload split into chunks that are committed one by one."""
+
+    __tablename__ = "sync_sessions"
+
+    chw_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("chw_users.id"), nullable=False, index=True
+    )
+    status: Mapped[str] = mapped_column(String(16), default="open", nullable=False)
+    total_chunks: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    finalized_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    chunks: Mapped[list[SyncSessionChunk]] = relationship(
+        "SyncSessionChunk", back_populates="session"
+    )
+
+
+class SyncSessionChunk(BaseModel):
+    __tablename__ = "sync_session_chunks"
+    __table_args__ = (UniqueConstraint("session_id", "chunk_index"),)
+
+    session_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("sync_sessions.id"), nullable=False
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    checksum: Mapped[str] = mapped_column(String(64), nullable=False)
+    results: Mapped[str] = mapped_column(Text, nullable=False)
+
+    session: Mapped[SyncSession] = relationship("SyncSession", back_populates="chunks")
@@ -0,0 +1,27 @@
+"""Opaque keyset cursors shared by paginated endpoints."""
+from __future__ import annotations
+
+import base64
+import binascii
+
+from .json_provider import dumps_bytes, loads
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor the server did not issue."""
+
+
+def encode_cursor(position: dict) -> str:
+    raw = dumps_bytes(position)
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+    if not isinstance(position, dict):
+        raise InvalidCursor("Invalid cursor")
+    return position
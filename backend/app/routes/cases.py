@@ -1,27 +1,36 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from marshmallow import ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from ..extensions import db
-from ..models import Case, Diagnosis, CHWUser, DoctorUser, Patient, MedGemmaQueue
-from ..schemas import CaseSchema, DiagnosisSchema
-from ..ai.tasks import run_medgemma_analysis
+from ..listing import InvalidListQuery, list_response
+from ..models import Case, Diagnosis, Patient
+from ..schemas import CaseClaimSchema, CaseSchema, DiagnosisSchema
+from ..services import response_cache, work_queue
+from ..services.bulk_create import BulkCreateError, bulk_create, case_status, response_status
+from ..services.principal import current_principal
+from ..ai.tasks import dispatch_medgemma_analyses, enqueue_medgemma_cases
 
 cases_bp = Blueprint("cases", __name__)
+# CaseSchema nests the patient, so load it in the same query.
+CASE_LOAD_OPTIONS = (joinedload(Case.patient),)
 case_schema = CaseSchema()
 cases_schema = CaseSchema(many=True)
+claim_schema = CaseClaimSchema()
 diagnosis_schema = DiagnosisSchema()
 
 
 @cases_bp.route("/cases", methods=["POST"])
 @jwt_required()
 def create_case():
-    chw_id = get_jwt_identity()
-    chw = db.session.get(CHWUser, chw_id)
-    if not chw:
+    principal = current_principal()
+    if not principal or not principal.is_chw:
         return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
 
     data = request.get_json(force=True)
     patient_id = data.get("patient_id")
@@ -36,109 +45,167 @@ def create_case():
     case_data = {
         "patient_id": patient_id,
         "chw_id": chw_id,
-        "triage_data": data.get("triage_data", "{}"),
+        "triage_data": data.get("triage_data", {}),
         "risk_level": risk_level,
         "image_urls": data.get("image_urls", "[]"),
         "sync_status": "new"
     }
 
     # Set status based on risk level
-    if risk_level == "high":
-        case_data["status"] = "REQUIRES_MEDGEMMA"
-    else:
-        case_data["status"] = "TRIAGED"
+    case_data["status"] = case_status(risk_level)
 
     case = Case(**case_data)
     db.session.add(case)
-    db.session.commit()
+    db.session.flush()
 
-    # For high-risk cases, create MedGemma queue entry and trigger analysis
+    # High-risk cases are queued for MedGemma in the same transaction and
+    # dispatched once the queue entry is committed.
+    queued = []
     if risk_level == "high":
-        queue_entry = MedGemmaQueue(case_id=case.id)
-        db.session.add(queue_entry)
-        db.session.commit()
-
-        # Trigger MedGemma analysis asynchronously
-        run_medgemma_analysis.delay(case.id)
+        queued = enqueue_medgemma_cases([case.id])
+    db.session.commit()
+    dispatch_medgemma_analyses(queued)
 
     return jsonify(case_schema.dump(case)), 201
 
 
+@cases_bp.route("/cases/batch", methods=["POST"])
+@jwt_required()
+def create_cases_batch():
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        results = bulk_create("cases", request.get_json(force=True), principal.id)
+    except BulkCreateError as exc:
+        return jsonify({"error": exc.message}), exc.status_code
+    return jsonify({"results": results}), response_status(results)
+
+
 @cases_bp.route("/cases/<case_id>", methods=["GET"])
 @jwt_required()
 def get_case(case_id):
     # Allow both CHW and Doctor access
-    user_id = get_jwt_identity()
-    
-    # Try to find as CHW first
-    chw = db.session.get(CHWUser, user_id)
-    if chw:
-        case = db.session.get(Case, case_id)
-        if not case or case.chw_id != user_id:
-            return jsonify({"error": "Case not found"}), 404
-    else:
-        # Try as doctor - doctors can access any case
-        doctor = db.session.get(DoctorUser, user_id)
-        if not doctor:
-            return jsonify({"error": "Unauthorized"}), 403
-        
-        case = db.session.get(Case, case_id)
-        if not case:
-            return jsonify({"error": "Case not found"}), 404
-
-    return jsonify(case_schema.dump(case)), 200
+    principal = current_principal()
+    if not principal:
+        return jsonify({"error": "Unauthorized"}), 403
+    user_id = principal.id
+
+    def build():
+        case = db.session.get(Case, case_id, options=CASE_LOAD_OPTIONS)
+        # Doctors can access any case
+        if not case or (principal.is_chw and case.chw_id != user_id):
+            response = jsonify({"error": "Case not found"})
+            response.status_code = 404
+            return response, ()
+        return jsonify(case_schema.dump(case)), [response_cache.patient_scope(case.patient_id)]
+
+    return response_cache.cached_response(
+        "case", principal, [response_cache.case_scope(case_id)], build, key=case_id
+    )
 
 
 @cases_bp.route("/cases", methods=["GET"])
 @jwt_required()
 def get_cases():
-    chw_id = get_jwt_identity()
-    chw = db.session.get(CHWUser, chw_id)
-    if not chw:
+    principal = current_principal()
+    if not principal or not principal.is_chw:
         return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
 
-    cases = chw.cases
-    return jsonify(cases_schema.dump(cases)), 200
+    try:
+        stmt = select(Case).where(Case.chw_id == chw_id)
+        return list_response(
+            stmt, Case, CaseSchema, options=CASE_LOAD_OPTIONS, depends_on=(Case.patient,)
+        )
+    except InvalidListQuery as exc:
+        return jsonify({"error": str(exc)}), 400
 
 
 @cases_bp.route("/cases/pending", methods=["GET"])
 @jwt_required()
 def get_pending_cases():
-    doctor_id = get_jwt_identity()
-    doctor = db.session.get(DoctorUser, doctor_id)
-    if not doctor:
+    principal = current_principal()
+    if not principal or not principal.is_doctor:
         return jsonify({"error": "Unauthorized"}), 403
 
     # Cases with status TRIAGED, PENDING_DIAGNOSIS, or REQUIRES_MEDGEMMA, high risk
     # Load patient relationship for each case
-    pending_cases = db.session.query(Case).options(joinedload(Case.patient)).filter(
-        Case.status.in_(["TRIAGED", "PENDING_DIAGNOSIS", "REQUIRES_MEDGEMMA"]),
-        Case.risk_level == "high"
-    ).all()
+    stmt = select(Case).where(work_queue.pending_condition())
+
+    def build():
+        response = list_response(
+            stmt,
+            Case,
+            CaseSchema,
+            options=CASE_LOAD_OPTIONS,
+            depends_on=(Case.patient,),
+            rows_can_leave=True,
+        )
+        return response, ()
+
+    try:
+        return response_cache.cached_response(
+            "pending_cases", principal, [response_cache.PENDING_SCOPE], build
+        )
+    except InvalidListQuery as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+@cases_bp.route("/cases/claim", methods=["POST"])
+@jwt_required()
+def claim_cases():
+    principal = current_principal()
+    if not principal or not principal.is_doctor:
+        return jsonify({"error": "Unauthorized"}), 403
+    doctor_id = principal.id
+
+    try:
+        data = claim_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as exc:
+        return jsonify({"error": "Invalid claim request", "details": exc.messages}), 400
+
+    limit = min(data["limit"], current_app.config["CASE_CLAIM_MAX_BATCH"])
+    cases = work_queue.claim_cases(doctor_id, limit)
+    return jsonify(cases_schema.dump(cases)), 200
+
+
+@cases_bp.route("/cases/<case_id>/release", methods=["POST"])
+@jwt_required()
+def release_case(case_id):
+    principal = current_principal()
+    if not principal or not principal.is_doctor:
+        return jsonify({"error": "Unauthorized"}), 403
+    doctor_id = principal.id
 
-    return jsonify(cases_schema.dump(pending_cases)), 200
+    if not work_queue.release_case(case_id, doctor_id):
+        return jsonify({"error": "Case is not claimed by you"}), 409
+    return "", 204
 
 
 @cases_bp.route("/cases/<case_id>/diagnosis", methods=["POST"])
 @jwt_required()
 def create_diagnosis(case_id):
-    doctor_id = get_jwt_identity()
-    doctor = db.session.get(DoctorUser, doctor_id)
-    if not doctor:
+    principal = current_principal()
+    if not principal or not principal.is_doctor:
         return jsonify({"error": "Unauthorized"}), 403
+    doctor_id = principal.id
 
     case = db.session.get(Case, case_id)
     if not case:
         return jsonify({"error": "Case not found"}), 404
 
     data = request.get_json(force=True)
+    if not work_queue.complete_case(case, doctor_id):
+        db.session.rollback()
+        return jsonify({"error": "Case is claimed by another doctor"}), 409
     data["case_id"] = case_id
     data["doctor_id"] = doctor_id
     data["sync_status"] = "new"
 
     diagnosis = Diagnosis(**data)
     db.session.add(diagnosis)
-    case.status = "DIAGNOSED"
     db.session.commit()
 
     return jsonify(diagnosis_schema.dump(diagnosis)), 201
\ No newline at end of file
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+from .. import metrics
+from ..ai.cache import inference_cache_stats
+from ..ai.registry import registry as model_registry
+from ..cache import cache_stats
+from ..services.principal import current_principal
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+@jwt_required()
+def get_metrics():
+    # Process-wide operational data; CHW devices have no use for it.
+    principal = current_principal()
+    if not principal or not principal.is_doctor:
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(
+        {
+            **metrics.registry.snapshot(),
+            "caches": cache_stats(),
+            "models": model_registry.timings(),
+            "inference_caches": inference_cache_stats(),
+        }
+    ), 200
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 from ..extensions import db
-from ..models import CHWUser, DoctorUser, Patient, Vitals, Case
+from ..listing import InvalidListQuery, list_response
+from ..models import Patient, Vitals, Case
 from ..schemas import PatientSchema, VitalsSchema, CaseSchema
+from ..services.bulk_create import BulkCreateError, bulk_create, response_status
+from ..services.principal import current_principal
 
 patients_bp = Blueprint("patients", __name__)
+# The detail view embeds the patient's vitals and cases; each case nests the
+# patient again, which resolves from the identity map without a query.
+PATIENT_DETAIL_OPTIONS = (selectinload(Patient.vitals), selectinload(Patient.cases))
 patient_schema = PatientSchema()
-patients_schema = PatientSchema(many=True)
 vitals_schema = VitalsSchema(many=True)
 case_schema = CaseSchema(many=True)
 
@@ -17,22 +24,25 @@ case_schema = CaseSchema(many=True)
 @patients_bp.route("/patients", methods=["GET"])
 @jwt_required()
 def get_patients():
-    chw_id = get_jwt_identity()
-    chw = db.session.get(CHWUser, chw_id)
-    if not chw:
+    principal = current_principal()
+    if not principal or not principal.is_chw:
         return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
 
-    patients = chw.patients
-    return jsonify(patients_schema.dump(patients)), 200
+    stmt = select(Patient).where(Patient.chw_id == chw_id)
+    try:
+        return list_response(stmt, Patient, PatientSchema)
+    except InvalidListQuery as exc:
+        return jsonify({"error": str(exc)}), 400
 
 
 @patients_bp.route("/patients", methods=["POST"])
 @jwt_required()
 def create_patient():
-    chw_id = get_jwt_identity()
-    chw = db.session.get(CHWUser, chw_id)
-    if not chw:
+    principal = current_principal()
+    if not principal or not principal.is_chw:
         return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
 
     data = request.get_json(force=True)
     data["chw_id"] = chw_id
@@ -45,24 +55,35 @@ def create_patient():
     return jsonify(patient_schema.dump(patient)), 201
 
 
+@patients_bp.route("/patients/batch", methods=["POST"])
+@jwt_required()
+def create_patients_batch():
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        results = bulk_create("patients", request.get_json(force=True), principal.id)
+    except BulkCreateError as exc:
+        return jsonify({"error": exc.message}), exc.status_code
+    return jsonify({"results": results}), response_status(results)
+
+
 @patients_bp.route("/patients/<patient_id>", methods=["GET"])
 @jwt_required()
 def get_patient(patient_id):
-    user_id = get_jwt_identity()
-    
-    # Try to find as CHW first
-    chw = db.session.get(CHWUser, user_id)
-    if chw:
-        patient = db.session.get(Patient, patient_id)
+    principal = current_principal()
+    if not principal:
+        return jsonify({"error": "Unauthorized"}), 403
+    user_id = principal.id
+
+    if principal.is_chw:
+        patient = db.session.get(Patient, patient_id, options=PATIENT_DETAIL_OPTIONS)
         if not patient or patient.chw_id != user_id:
             return jsonify({"error": "Patient not found"}), 404
     else:
-        # Try as doctor - doctors can access any patient
-        doctor = db.session.get(DoctorUser, user_id)
-        if not doctor:
-            return jsonify({"error": "Unauthorized"}), 403
-        
-        patient = db.session.get(Patient, patient_id)
+        # Doctors can access any patient
+        patient = db.session.get(Patient, patient_id, options=PATIENT_DETAIL_OPTIONS)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
 
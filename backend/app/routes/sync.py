@@ -1,22 +1,182 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from marshmallow import ValidationError
 
-from ..schemas import SyncEnvelopeSchema, SyncResponseSchema
+from ..pagination import InvalidCursor
+from ..schemas import (
+    SyncChunkSchema,
+    SyncEnvelopeSchema,
+    SyncFinalizeSchema,
+    SyncResponseSchema,
+    SyncSessionSchema,
+)
+from ..services import idempotency
+from ..services.principal import current_principal
 from ..services.sync_service import SyncService
+from ..services.sync_sessions import SyncSessionError, SyncSessionService
 
 sync_bp = Blueprint("sync", __name__)
 service = SyncService()
+session_service = SyncSessionService(service)
 envelope_schema = SyncEnvelopeSchema()
 response_schema = SyncResponseSchema()
+chunk_schema = SyncChunkSchema()
+finalize_schema = SyncFinalizeSchema()
+session_schema = SyncSessionSchema()
+
+NDJSON_MIMETYPE = "application/x-ndjson"
 
 
 @sync_bp.route("/sync", methods=["POST"])
 @jwt_required()
 def sync_endpoint():
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
+    streaming = wants_ndjson()
+
+    # Streamed responses are not stored; a retried stream re-applies its (idempotent)
+    # upsert and resumes from its last checkpoint cursor instead.
+    idempotency_key = None if streaming else request.headers.get("Idempotency-Key")
+    if not idempotency_key:
+        return _run_sync(chw_id, streaming)
+
+    if len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+        return jsonify({"error": "Idempotency-Key too long"}), 400
+    body_fingerprint = idempotency.fingerprint(request.get_data())
+    try:
+        replayed = idempotency.reserve(chw_id, idempotency_key, body_fingerprint)
+    except idempotency.IdempotencyKeyReused:
+        return jsonify({"error": "Idempotency-Key reused with a different payload"}), 422
+    except idempotency.IdempotencyKeyInFlight:
+        response = jsonify({"error": "A request with this Idempotency-Key is in progress"})
+        response.headers["Retry-After"] = str(idempotency.RETRY_AFTER_SECONDS)
+        return response, 409
+    if replayed is not None:
+        response = jsonify(replayed)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response, 200
+
+    try:
+        response, status = _run_sync(chw_id, streaming)
+    except Exception:
+        idempotency.release(chw_id, idempotency_key)
+        raise
+    if status == 200:
+        idempotency.remember(chw_id, idempotency_key, body_fingerprint, response.get_json())
+    else:
+        idempotency.release(chw_id, idempotency_key)
+    return response, status
+
+
+def _run_sync(chw_id: str, streaming: bool):
     payload = request.get_json(force=True)
-    data = envelope_schema.load(payload)
-    chw_id = get_jwt_identity()
-    result = service.process_sync_payload(data, chw_id)
+    try:
+        data = envelope_schema.load(payload)
+    except ValidationError as exc:
+        return jsonify({"error": "Invalid sync payload", "details": exc.messages}), 400
+    try:
+        if streaming:
+            lines = service.stream_sync_payload(data, chw_id)
+            return Response(stream_with_context(lines), mimetype=NDJSON_MIMETYPE), 200
+        result = service.process_sync_payload(data, chw_id)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
     return jsonify(response_schema.dump(result)), 200
+
+
+@sync_bp.route("/sync/sessions", methods=["POST"])
+@jwt_required()
+def open_sync_session():
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    session = session_service.open_session(principal.id)
+    return jsonify(_session_body(session)), 201
+
+
+@sync_bp.route("/sync/sessions/<session_id>", methods=["GET"])
+@jwt_required()
+def get_sync_session(session_id):
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    try:
+        session = session_service.get_session(session_id, principal.id)
+    except SyncSessionError as exc:
+        return _session_error(exc)
+    return jsonify(_session_body(session)), 200
+
+
+@sync_bp.route("/sync/sessions/<session_id>/chunks/<int:chunk_index>", methods=["PUT"])
+@jwt_required()
+def upload_sync_chunk(session_id, chunk_index):
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    max_bytes = current_app.config["SYNC_MAX_CHUNK_BYTES"]
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    if request.content_length > max_bytes:
+        return jsonify({"error": f"Chunk larger than {max_bytes} bytes"}), 413
+
+    try:
+        data = chunk_schema.load(request.get_json(force=True))
+    except ValidationError as exc:
+        return jsonify({"error": "Invalid sync chunk", "details": exc.messages}), 400
+    try:
+        results, duplicate = session_service.upload_chunk(
+            session_id, principal.id, chunk_index, data["changes"]
+        )
+    except SyncSessionError as exc:
+        return _session_error(exc)
+    return jsonify(
+        {"chunk_index": chunk_index, "results": results, "duplicate": duplicate}
+    ), 200
+
+
+@sync_bp.route("/sync/sessions/<session_id>/finalize", methods=["POST"])
+@jwt_required()
+def finalize_sync_session(session_id):
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
+    try:
+        data = finalize_schema.load(request.get_json(force=True))
+    except ValidationError as exc:
+        return jsonify({"error": "Invalid finalize request", "details": exc.messages}), 400
+    try:
+        session = session_service.finalize(session_id, chw_id, data["total_chunks"])
+        result = service.process_sync_payload({**data, "changes": {}}, chw_id)
+    except SyncSessionError as exc:
+        return _session_error(exc)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    body = response_schema.dump(result)
+    body["session"] = _session_body(session)
+    return jsonify(body), 200
+
+
+def _session_body(session) -> dict:
+    return session_schema.dump(
+        {
+            "id": session.id,
+            "status": session.status,
+            "total_chunks": session.total_chunks,
+            "received_chunks": session_service.received_chunks(session),
+            "created_at": session.created_at,
+        }
+    )
+
+
+def _session_error(exc: SyncSessionError):
+    return jsonify({"error": exc.message, **exc.details}), exc.status_code
+
+
+def wants_ndjson() -> bool:
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
@@ -1,34 +1,46 @@
 from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select
 
 from ..extensions import db
+from ..listing import InvalidListQuery, list_response
 from ..models import CHWUser, Patient, Vitals
 from ..schemas import VitalsSchema
+from ..services.bulk_create import BulkCreateError, bulk_create, response_status
+from ..services.principal import current_principal
 
 vitals_bp = Blueprint("vitals", __name__)
 vitals_schema = VitalsSchema()
-vitals_list_schema = VitalsSchema(many=True)
 
 
 @vitals_bp.route("/patients/<patient_id>/vitals", methods=["GET"])
 @jwt_required()
 def get_patient_vitals(patient_id):
-    chw_id = get_jwt_identity()
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
     patient = db.session.get(Patient, patient_id)
     
     if not patient or patient.chw_id != chw_id:
         return jsonify({"error": "Patient not found"}), 404
 
-    vitals = patient.vitals
-    return jsonify(vitals_list_schema.dump(vitals)), 200
+    stmt = select(Vitals).where(Vitals.patient_id == patient_id)
+    try:
+        return list_response(stmt, Vitals, VitalsSchema)
+    except InvalidListQuery as exc:
+        return jsonify({"error": str(exc)}), 400
 
 
 @vitals_bp.route("/patients/<patient_id>/vitals", methods=["POST"])
 @jwt_required()
 def create_vitals(patient_id):
-    chw_id = get_jwt_identity()
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+    chw_id = principal.id
     patient = db.session.get(Patient, patient_id)
     
     if not patient or patient.chw_id != chw_id:
@@ -43,4 +55,18 @@ def create_vitals(patient_id):
     db.session.add(vitals)
     db.session.commit()
 
-    return jsonify(vitals_schema.dump(vitals)), 201
\ No newline at end of file
+    return jsonify(vitals_schema.dump(vitals)), 201
+
+
+@vitals_bp.route("/vitals/batch", methods=["POST"])
+@jwt_required()
+def create_vitals_batch():
+    principal = current_principal()
+    if not principal or not principal.is_chw:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        results = bulk_create("vitals", request.get_json(force=True), principal.id)
+    except BulkCreateError as exc:
+        return jsonify({"error": exc.message}), exc.status_code
+    return jsonify({"results": results}), response_status(results)
@@ -1,16 +1,40 @@
 from __future__ import annotations
 
-from marshmallow import EXCLUDE, Schema, fields
+from marshmallow import EXCLUDE, Schema, fields, validate
 
 
 class SyncEnvelopeSchema(Schema):
     last_sync_timestamp = fields.DateTime(allow_none=True)
+    last_sync_seq = fields.Integer(allow_none=True, validate=validate.Range(min=0))
     changes = fields.Dict(required=True)
+    delta = fields.Boolean(load_default=False)
+    cursor = fields.String(allow_none=True)
+    page_size = fields.Integer(allow_none=True, validate=validate.Range(min=1))
 
     class Meta:
         unknown = EXCLUDE
 
 
+class SyncChunkSchema(Schema):
+    changes = fields.Dict(required=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class SyncFinalizeSchema(SyncEnvelopeSchema):
+    total_chunks = fields.Integer(required=True, validate=validate.Range(min=0))
+    changes = fields.Dict(load_default=dict)
+
+
+class SyncSessionSchema(Schema):
+    session_id = fields.String(attribute="id", required=True)
+    status = fields.String(required=True)
+    total_chunks = fields.Integer(allow_none=True)
+    received_chunks = fields.List(fields.Integer(), required=True)
+    created_at = fields.DateTime(required=True)
+
+
 class PatientSchema(Schema):
     id = fields.String(required=True)
     demographics = fields.Raw(required=True)  # Allow any type, including strings
@@ -28,18 +52,59 @@ class CaseSchema(Schema):
     status = fields.String(required=True)
     risk_level = fields.String(required=True)
     image_urls = fields.Raw(required=False)  # Allow any type, including strings
+    priority = fields.Float(allow_none=True)
+    claimed_by = fields.String(allow_none=True)
+    claim_expires_at = fields.DateTime(allow_none=True)
     sync_status = fields.String(required=True)
     last_modified_at = fields.DateTime(required=True)
     created_at = fields.DateTime(required=True)
     patient = fields.Nested(PatientSchema, allow_none=True)
 
 
+class CaseClaimSchema(Schema):
+    limit = fields.Integer(load_default=1, validate=validate.Range(min=1))
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class PatientCreateSchema(Schema):
+    id = fields.String(load_default=None)
+    demographics = fields.Raw(required=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class VitalsCreateSchema(Schema):
+    id = fields.String(load_default=None)
+    patient_id = fields.String(required=True)
+    temperature = fields.String(required=True)
+    blood_pressure = fields.String(required=True)
+    weight = fields.String(required=True)
+    notes = fields.String(load_default=None, allow_none=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class CaseCreateSchema(Schema):
+    id = fields.String(load_default=None)
+    patient_id = fields.String(required=True)
+    triage_data = fields.Raw(load_default=dict)
+    risk_level = fields.String(load_default="low")
+    image_urls = fields.Raw(load_default="[]")
+
+    class Meta:
+        unknown = EXCLUDE
+
+
 class DiagnosisSchema(Schema):
     id = fields.String(required=True)
     case_id = fields.String(required=True)
     doctor_id = fields.String(required=True)
     diagnosis_text = fields.String(required=True)
-    prescription = fields.String(allow_none=True)
+    prescription = fields.Raw(allow_none=True)
     sync_status = fields.String(required=True)
     last_modified_at = fields.DateTime(required=True)
 
@@ -68,3 +133,7 @@ class MedGemmaQueueSchema(Schema):
 class SyncResponseSchema(Schema):
     new_sync_timestamp = fields.String(required=True)
     server_updates = fields.Dict(required=True)
+    results = fields.Dict()
+    new_sync_seq = fields.Integer()
+    has_more = fields.Boolean()
+    next_cursor = fields.String(allow_none=True)
@@ -0,0 +1,136 @@
+"""Bulk creation of patients, vitals and cases from a single request.
+
+Every item is validated before anything is written: schema errors, patients
+the caller does not own and ids that already exist are reported per item and
+skipped. The remaining rows go in with one multi-row ``INSERT`` per request and
+a single commit. High-risk cases are queued for MedGemma in that transaction
+and dispatched afterwards as one Celery group.
+
+Requests carry at most ``BATCH_MAX_ITEMS`` items and are answered with the
+per-item results: ``201`` when every item was created, ``207`` otherwise.
+"""
+from __future__ import annotations
+
+import uuid
+
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..ai.tasks import dispatch_medgemma_analyses, enqueue_medgemma_cases
+from ..extensions import db
+from ..json_provider import dumps
+from ..schemas import CaseCreateSchema, PatientCreateSchema, VitalsCreateSchema
+from .repository import get_repository
+
+CREATE_SCHEMAS = {
+    "patients": PatientCreateSchema(),
+    "vitals": VitalsCreateSchema(),
+    "cases": CaseCreateSchema(),
+}
+
+
+class BulkCreateError(Exception):
+    """The request as a whole cannot be processed; nothing was written."""
+
+    status_code = 400
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class BatchTooLarge(BulkCreateError):
+    status_code = 413
+
+
+def bulk_create(collection: str, items, chw_id: str) -> list[dict]:
+    """Create the valid ``items`` for ``chw_id`` and return one result per item, in order.
+
+    Created items get ``{"index", "id", "status": 201}``; rejected ones carry the
+    HTTP-style status (400, 404 or 409) and an ``error`` (plus ``details`` for
+    schema errors).
+    """
+    if not isinstance(items, list) or not items:
+        raise BulkCreateError("Request body must be a non-empty JSON array")
+    max_items = current_app.config["BATCH_MAX_ITEMS"]
+    if len(items) > max_items:
+        raise BatchTooLarge(f"At most {max_items} items per request")
+
+    schema = CREATE_SCHEMAS[collection]
+    results: list[dict | None] = [None] * len(items)
+    rows: dict[int, dict] = {}
+    for index, item in enumerate(items):
+        try:
+            data = schema.load(item)
+        except ValidationError as exc:
+            results[index] = _failure(index, 400, "Invalid record", details=exc.messages)
+            continue
+        rows[index] = _to_row(collection, data, chw_id)
+
+    if collection != "patients":
+        _reject_foreign_patients(rows, results, chw_id)
+    _reject_existing_ids(collection, rows, results)
+
+    new_rows = list(rows.values())
+    queued: list[str] = []
+    try:
+        get_repository(collection).insert_records(new_rows)
+        if collection == "cases":
+            queued = enqueue_medgemma_cases(
+                row["id"] for row in new_rows if row["risk_level"] == "high"
+            )
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    dispatch_medgemma_analyses(queued)
+
+    for index, row in rows.items():
+        results[index] = {"index": index, "id": row["id"], "status": 201}
+    return results
+
+
+def response_status(results: list[dict]) -> int:
+    """201 when every item was created, otherwise 207 Multi-Status."""
+    return 201 if all(result["status"] == 201 for result in results) else 207
+
+
+def case_status(risk_level: str) -> str:
+    return "REQUIRES_MEDGEMMA" if risk_level == "high" else "TRIAGED"
+
+
+def _to_row(collection: str, data: dict, chw_id: str) -> dict:
+    row = {**data, "id": data["id"] or str(uuid.uuid4()), "chw_id": chw_id, "sync_status": "new"}
+    if collection == "cases":
+        row["status"] = case_status(row["risk_level"])
+        if not isinstance(row["image_urls"], str):
+            row["image_urls"] = dumps(row["image_urls"])
+    return row
+
+
+def _reject_foreign_patients(rows: dict[int, dict], results: list, chw_id: str) -> None:
+    patient_ids = {row["patient_id"] for row in rows.values()}
+    owners = {
+        record["id"]: record["chw_id"]
+        for record in get_repository("patients").fetch_by_ids(patient_ids, fields=["chw_id"])
+    }
+    for index, row in list(rows.items()):
+        if owners.get(row["patient_id"]) != chw_id:
+            results[index] = _failure(index, 404, "Patient not found")
+            del rows[index]
+
+
+def _reject_existing_ids(collection: str, rows: dict[int, dict], results: list) -> None:
+    ids = [row["id"] for row in rows.values()]
+    taken = {record["id"] for record in get_repository(collection).fetch_by_ids(ids, fields=())}
+    for index, row in list(rows.items()):
+        if row["id"] in taken:
+            results[index] = _failure(index, 409, "Record already exists", id=row["id"])
+            del rows[index]
+        else:
+            taken.add(row["id"])
+
+
+def _failure(index: int, status: int, error: str, **extra) -> dict:
+    return {"index": index, "status": status, "error": error, **extra}
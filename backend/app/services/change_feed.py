@@ -0,0 +1,216 @@
+"""Records every write to a syncable row in the ``change_log`` feed.
+
+ORM writes from the routes and Celery tasks are captured by session flush
+listeners; the bulk sync upsert bypasses the unit of work and records its rows
+explicitly through :func:`record_changes`. Each entry is written with a single
+``INSERT ... SELECT`` that resolves the owning CHW in the database, and notes
+which columns the write touched so delta syncs can send only those.
+
+Once a transaction that wrote feed rows commits, :data:`changes_committed` is
+sent with the collections it touched, the users who own those rows (the CHW,
+or the doctor for diagnoses) and the ids of the rows themselves, so derived
+data such as cached stats and responses can be invalidated.
+
+Sequence numbers must become visible in order: a reader that saw ``seq`` 6
+before a concurrent transaction committed 5 would move past 5 for good. On
+Postgres every transaction that appends to the feed first takes one
+transaction-scoped advisory lock, so feed writers allocate and commit their
+sequences one at a time. SQLite already serializes writers with its database
+lock. To keep that serialized section short, a session only queues its
+entries in ``session.info`` while the request runs; they are appended, under
+the lock, by a ``before_commit`` hook (or an earlier :func:`append_queued_changes`)
+right before the commit.
+
+:func:`append_queued_changes` also returns the sequences the transaction
+appended, so a sync request can leave its own uploads out of the updates it
+sends back.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+from blinker import Namespace
+from sqlalchemy import Connection, Text, event, func, insert, inspect, literal, select
+from sqlalchemy.orm import Session, attributes
+
+from ..models import Case, ChangeLog, Diagnosis, Patient, SyncMixin, Vitals
+
+FEED_MODELS = (Patient, Case, Diagnosis, Vitals)
+CHUNK_SIZE = 500
+# Sent with every delta record anyway, so not worth tracking per write.
+BOOKKEEPING_FIELDS = {"id", "created_at", "updated_at", "last_modified_at", "version"}
+# The user whose caseload a row belongs to, for commit notifications.
+OWNER_ATTRIBUTES = {Diagnosis: "doctor_id"}
+PENDING_CHANGES_KEY = "dermadetect_committed_changes"
+PENDING_RECORDS_KEY = "dermadetect_committed_records"
+QUEUED_FEED_KEY = "dermadetect_queued_feed"
+WRITTEN_SEQS_KEY = "dermadetect_written_seqs"
+# Arbitrary application-wide key for ``pg_advisory_xact_lock``.
+FEED_LOCK_KEY = 0x64646366
+
+signals = Namespace()
+# Sent with ``changes={collection: {owner ids}}`` and ``records={collection: {row
+# ids}}`` after the transaction commits.
+changes_committed = signals.signal("changes-committed")
+
+
+def record_changes(
+    executor: Session | Connection,
+    model,
+    ids: Iterable[str],
+    fields: Iterable[str] | None = None,
+) -> None:
+    """Add a change-log entry for each of ``ids``, which must be written by commit time.
+
+    ``fields`` names the columns the write changed; ``None`` marks a whole-row change.
+    A session queues the entries until it commits; a connection appends them now.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    if fields is not None:
+        fields = ",".join(sorted(set(fields) - BOOKKEEPING_FIELDS))
+    if isinstance(executor, Connection):
+        _append(executor, [(model, ids, fields)])
+    else:
+        executor.info.setdefault(QUEUED_FEED_KEY, []).append((model, ids, fields))
+
+
+def append_queued_changes(session: Session) -> set[int]:
+    """Flush ``session`` and append its queued feed entries; call right before commit.
+
+    Returns every sequence the transaction has appended. On Postgres this takes
+    the feed lock, which is held until the transaction ends.
+    """
+    session.flush()
+    queued = session.info.pop(QUEUED_FEED_KEY, None)
+    written = session.info.setdefault(WRITTEN_SEQS_KEY, set())
+    if queued:
+        written.update(_append(session, queued))
+    return set(written)
+
+
+def note_changes(
+    session: Session, model, owners: Iterable[str | None], ids: Iterable[str] = ()
+) -> None:
+    """Remember that this transaction wrote the ``model`` rows ``ids``, owned by ``owners``."""
+    pending = session.info.setdefault(PENDING_CHANGES_KEY, defaultdict(set))
+    pending[model.__tablename__].update(owner for owner in owners if owner)
+    records = session.info.setdefault(PENDING_RECORDS_KEY, defaultdict(set))
+    records[model.__tablename__].update(ids)
+
+
+def owner_of(model, row) -> str | None:
+    attribute = OWNER_ATTRIBUTES.get(model, "chw_id")
+    if isinstance(row, dict):
+        return row.get(attribute)
+    return getattr(row, attribute, None)
+
+
+def _append(executor: Session | Connection, entries) -> list[int]:
+    _lock_feed(executor)
+    written = []
+    for model, ids, fields in entries:
+        for start in range(0, len(ids), CHUNK_SIZE):
+            stmt = _change_log_insert(model, ids[start : start + CHUNK_SIZE], fields)
+            written.extend(executor.execute(stmt.returning(ChangeLog.seq)).scalars())
+    return written
+
+
+def _lock_feed(executor: Session | Connection) -> None:
+    """Hold the feed lock until the transaction ends, so sequences commit in order."""
+    bind = executor if isinstance(executor, Connection) else executor.get_bind()
+    if bind.dialect.name == "postgresql":
+        executor.execute(select(func.pg_advisory_xact_lock(FEED_LOCK_KEY)))
+
+
+def _change_log_insert(model, ids: list[str], fields: str | None):
+    columns = (literal(model.__tablename__), literal(fields, Text), literal(datetime.utcnow()))
+    if model is Diagnosis:
+        owner = select(Diagnosis.id, Case.chw_id, *columns).join(
+            Case, Case.id == Diagnosis.case_id
+        )
+    else:
+        owner = select(model.id, model.chw_id, *columns)
+    return insert(ChangeLog).from_select(
+        ["record_id", "chw_id", "collection", "fields", "created_at"],
+        owner.where(model.id.in_(ids)),
+    )
+
+
+def _stamp_modified_rows(session: Session, flush_context, instances) -> None:
+    """Bump ``version`` and ``last_modified_at`` for server-side edits to syncable rows."""
+    now = datetime.utcnow()
+    for instance in session.dirty:
+        if not isinstance(instance, SyncMixin):
+            continue
+        if not session.is_modified(instance, include_collections=False):
+            continue
+        if not attributes.get_history(instance, "last_modified_at").has_changes():
+            instance.last_modified_at = now
+        if not attributes.get_history(instance, "version").has_changes():
+            instance.version = (instance.version or 0) + 1
+
+
+def _record_flushed_changes(session: Session, flush_context) -> None:
+    changed = defaultdict(set)
+    for instance in session.new:
+        if isinstance(instance, FEED_MODELS):
+            changed[(type(instance), None)].add(instance.id)
+            note_changes(
+                session, type(instance), [owner_of(type(instance), instance)], [instance.id]
+            )
+    for instance in session.dirty:
+        if not isinstance(instance, FEED_MODELS):
+            continue
+        state = inspect(instance)
+        fields = tuple(
+            sorted(
+                prop.key
+                for prop in state.mapper.column_attrs
+                if state.attrs[prop.key].history.has_changes()
+            )
+        )
+        if fields:
+            changed[(type(instance), fields)].add(instance.id)
+            note_changes(
+                session, type(instance), [owner_of(type(instance), instance)], [instance.id]
+            )
+
+    for (model, fields), ids in changed.items():
+        record_changes(session, model, ids, fields)
+
+
+def _append_before_commit(session: Session) -> None:
+    append_queued_changes(session)
+
+
+def _send_committed_changes(session: Session) -> None:
+    changes = session.info.pop(PENDING_CHANGES_KEY, None)
+    records = session.info.pop(PENDING_RECORDS_KEY, None)
+    session.info.pop(QUEUED_FEED_KEY, None)
+    session.info.pop(WRITTEN_SEQS_KEY, None)
+    if changes:
+        changes_committed.send(session, changes=dict(changes), records=dict(records or {}))
+
+
+def _discard_pending_changes(session: Session) -> None:
+    session.info.pop(PENDING_CHANGES_KEY, None)
+    session.info.pop(PENDING_RECORDS_KEY, None)
+    session.info.pop(QUEUED_FEED_KEY, None)
+    session.info.pop(WRITTEN_SEQS_KEY, None)
+
+
+def register_listeners() -> None:
+    listeners = [
+        ("before_flush", _stamp_modified_rows),
+        ("after_flush", _record_flushed_changes),
+        ("before_commit", _append_before_commit),
+        ("after_commit", _send_committed_changes),
+        ("after_rollback", _discard_pending_changes),
+    ]
+    for name, listener in listeners:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
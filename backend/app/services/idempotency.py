@@ -0,0 +1,77 @@
+"""Replay cache for retried ``/api/sync`` uploads.
+
+Clients send an ``Idempotency-Key`` header with each logical sync. Before the
+request runs, the key is reserved with an in-flight marker (set-if-absent, so
+exactly one attempt wins, and short-lived so a crashed worker cannot block the
+key for long). A duplicate that arrives while the first attempt is still
+running is turned away with ``409`` and ``Retry-After``. Once the request
+commits, its response replaces the marker, and a retry with the same key and
+body is answered from the cache without touching the database. Reusing a key
+with a different body is rejected. A request that fails releases its key.
+Markers live for ``IDEMPOTENCY_LOCK_TTL`` seconds; replies are kept for
+``IDEMPOTENCY_TTL`` seconds (in Redis with ``CACHE_BACKEND=redis``).
+"""
+from __future__ import annotations
+
+import hashlib
+
+from flask import current_app
+
+from ..cache import get_cache
+
+MAX_KEY_LENGTH = 255
+# Seconds a client is asked to wait before retrying behind an in-flight attempt.
+RETRY_AFTER_SECONDS = 2
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyKeyInFlight(Exception):
+    """Another request with the same key is still being processed."""
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def _replay_cache():
+    config = current_app.config
+    return get_cache(
+        "sync-replay", config["IDEMPOTENCY_CACHE_SIZE"], config["IDEMPOTENCY_TTL"]
+    )
+
+
+def reserve(principal_id: str, key: str, body_fingerprint: str) -> dict | None:
+    """Claim ``key`` for this request, or return the stored response of a finished one.
+
+    Returns ``None`` once the caller holds the reservation and must either
+    :func:`remember` the response or :func:`release` the key.
+    """
+    cache = _replay_cache()
+    cache_key = f"{principal_id}:{key}"
+    marker = {"fingerprint": body_fingerprint, "in_flight": True}
+    for _attempt in range(3):
+        entry = cache.get(cache_key)
+        if entry is None:
+            if cache.add(cache_key, marker, current_app.config["IDEMPOTENCY_LOCK_TTL"]):
+                return None
+            continue  # another attempt reserved it first; read what it stored
+        if entry["fingerprint"] != body_fingerprint:
+            raise IdempotencyKeyReused(key)
+        if entry.get("in_flight"):
+            break
+        return entry["body"]
+    raise IdempotencyKeyInFlight(key)
+
+
+def remember(principal_id: str, key: str, body_fingerprint: str, body: dict) -> None:
+    _replay_cache().set(
+        f"{principal_id}:{key}", {"fingerprint": body_fingerprint, "body": body}
+    )
+
+
+def release(principal_id: str, key: str) -> None:
+    """Drop the reservation of a request that did not complete, so it can be retried."""
+    _replay_cache().delete(f"{principal_id}:{key}")
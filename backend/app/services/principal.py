@@ -0,0 +1,149 @@
+"""Who is calling: the authenticated user and their role, without a query per request.
+
+Tokens issued by ``/api/login`` carry the caller's ``role`` and
+``principal_version`` as claims. :func:`current_principal` resolves them through
+a bounded TTL cache keyed by role and user id, so authorization on the read
+paths costs no database round trip once the cache is warm.
+
+A user's ``principal_version`` is bumped whenever their email or password
+changes, which revokes tokens carrying the old version. Every committed update
+or delete of a user drops their cache entry. With ``CACHE_BACKEND = "redis"``
+that reaches every worker at once; the in-process cache can only drop the
+entry in the process that made the change, so other workers keep accepting
+revoked tokens until their copy expires, and entries there live at most
+``PRINCIPAL_LOCAL_CACHE_TTL`` seconds.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from flask import current_app, has_app_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes, object_session
+
+from ..cache import get_cache
+from ..extensions import db
+from ..models import CHWUser, DoctorUser
+
+ROLE_MODELS = {"chw": CHWUser, "doctor": DoctorUser}
+ROLE_CLAIM = "role"
+VERSION_CLAIM = "principal_version"
+# Changing any of these revokes the user's outstanding tokens.
+CREDENTIAL_FIELDS = ("email", "password_hash")
+INVALIDATED_KEY = "dermadetect_invalidated_principals"
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    role: str
+    name: str
+    email: str
+    version: int
+
+    @property
+    def is_chw(self) -> bool:
+        return self.role == "chw"
+
+    @property
+    def is_doctor(self) -> bool:
+        return self.role == "doctor"
+
+
+def token_claims(user) -> dict:
+    """Extra JWT claims for ``user``, passed as ``additional_claims`` at login."""
+    return {ROLE_CLAIM: role_of(user), VERSION_CLAIM: user.principal_version}
+
+
+def role_of(user) -> str:
+    return "doctor" if isinstance(user, DoctorUser) else "chw"
+
+
+def current_principal() -> Principal | None:
+    """The caller of the current request, or ``None`` if the user is gone or the token revoked."""
+    user_id = get_jwt_identity()
+    claims = get_jwt()
+    role = claims.get(ROLE_CLAIM)
+    roles = [role] if role in ROLE_MODELS else list(ROLE_MODELS)
+
+    for candidate in roles:
+        principal = _load(candidate, user_id)
+        if principal is None:
+            continue
+        version = claims.get(VERSION_CLAIM)
+        if version is not None and version != principal.version:
+            return None
+        return principal
+    return None
+
+
+def _load(role: str, user_id: str) -> Principal | None:
+    cache = _principal_cache()
+    key = f"{role}:{user_id}"
+    data = cache.get(key)
+    if data is None:
+        user = db.session.get(ROLE_MODELS[role], user_id)
+        # An empty entry remembers that the id has no user in this role, which
+        # keeps tokens without a role claim from querying both tables each time.
+        data = {}
+        if user is not None:
+            data = {
+                "id": user.id,
+                "role": role,
+                "name": user.name,
+                "email": user.email,
+                "version": user.principal_version,
+            }
+        cache.set(key, data)
+    return Principal(**data) if data else None
+
+
+def invalidate(role: str, user_id: str) -> None:
+    _principal_cache().delete(f"{role}:{user_id}")
+
+
+def _principal_cache():
+    config = current_app.config
+    ttl = config["PRINCIPAL_CACHE_TTL"]
+    if config["CACHE_BACKEND"] != "redis":
+        ttl = min(ttl, config["PRINCIPAL_LOCAL_CACHE_TTL"])
+    return get_cache("principals", config["PRINCIPAL_CACHE_SIZE"], ttl)
+
+
+def _user_changed(_mapper, _connection, user) -> None:
+    # Inserts invalidate too, replacing the empty entry cached for an unknown id.
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault(INVALIDATED_KEY, set()).add((role_of(user), user.id))
+
+
+def _bump_principal_version(mapper, connection, user) -> None:
+    if any(attributes.get_history(user, field).has_changes() for field in CREDENTIAL_FIELDS):
+        user.principal_version = (user.principal_version or 0) + 1
+    _user_changed(mapper, connection, user)
+
+
+def _invalidate_committed(session: Session) -> None:
+    changed = session.info.pop(INVALIDATED_KEY, None)
+    if changed and has_app_context():
+        for role, user_id in changed:
+            invalidate(role, user_id)
+
+
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(INVALIDATED_KEY, None)
+
+
+def register_listeners() -> None:
+    listeners = [
+        (Session, "after_commit", _invalidate_committed),
+        (Session, "after_rollback", _discard_invalidations),
+    ]
+    for model in ROLE_MODELS.values():
+        listeners.append((model, "before_update", _bump_principal_version))
+        listeners.append((model, "after_insert", _user_changed))
+        listeners.append((model, "after_delete", _user_changed))
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
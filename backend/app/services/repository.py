@@ -1,44 +1,178 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Iterable, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import and_, insert, or_, select, update
 
 from ..extensions import db
-from ..models import Case, Diagnosis, Patient
+from ..models import Case, Diagnosis, Patient, Vitals
+from .change_feed import note_changes, owner_of, record_changes
 
 SYNCABLE_MODELS = {
     "patients": Patient,
     "cases": Case,
     "diagnoses": Diagnosis,
+    "vitals": Vitals,
 }
 
+# Restricts each syncable model to the rows that belong to one CHW's caseload.
+CHW_SCOPES = {
+    Patient: lambda chw_id: Patient.chw_id == chw_id,
+    Case: lambda chw_id: Case.chw_id == chw_id,
+    Vitals: lambda chw_id: Vitals.chw_id == chw_id,
+    Diagnosis: lambda chw_id: Diagnosis.case_id.in_(
+        select(Case.id).where(Case.chw_id == chw_id)
+    ),
+}
+
+# Keeps ``IN (...)`` lists below SQLite's bound-parameter limit.
+UPSERT_CHUNK_SIZE = 500
+IMMUTABLE_FIELDS = {"created_at", "id"}
+SERVER_MANAGED_FIELDS = {"version", "priority", "claimed_by", "claim_expires_at"}
+
 
 class Repository:
     def __init__(self, model):
         self.model = model
+        self.columns = {column.key for column in model.__table__.columns}
+        self.scope = CHW_SCOPES.get(model)
+        # Columns an insert must supply; delta uploads may leave them out.
+        self.required = {
+            column.key
+            for column in model.__table__.columns
+            if not column.nullable
+            and not column.primary_key
+            and column.default is None
+            and column.server_default is None
+        }
+
+    def upsert_records(self, payloads: Sequence[dict]) -> dict[str, str]:
+        """Insert or update ``payloads`` in bulk using last-writer-wins on ``last_modified_at``.
 
-    def upsert_records(self, payloads: Sequence[dict]) -> None:
+        Existing rows are looked up with one ``IN`` query per chunk, new rows are
+        written with a single multi-row ``INSERT`` and changed rows with a single
+        executemany ``UPDATE``. Updates only touch the keys present in a payload, so
+        delta clients can send just the fields they changed; unchanged columns are
+        never loaded. A partial payload for a row the server does not have cannot be
+        inserted and is skipped. Returns a mapping of record id to its outcome:
+        ``"inserted"``, ``"updated"``, ``"stale"`` or ``"rejected"``.
+        """
+        incoming: dict[str, dict] = {}
         for data in payloads:
-            record = db.session.get(self.model, data["id"])
-            if record:
-                incoming_modified = data.get("last_modified_at")
-                if incoming_modified and incoming_modified <= record.last_modified_at:
+            row = self._to_row(data)
+            current = incoming.get(row["id"])
+            if current is None or not _is_older(
+                row.get("last_modified_at"), current.get("last_modified_at")
+            ):
+                incoming[row["id"]] = row
+
+        existing = self._load_sync_state(incoming.keys())
+        outcomes: dict[str, str] = {}
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        for record_id, row in incoming.items():
+            if record_id not in existing:
+                if not self.required <= row.keys():
+                    outcomes[record_id] = "rejected"
                     continue
-                for key, value in data.items():
-                    if hasattr(record, key) and key not in {"created_at", "id"}:
-                        setattr(record, key, value)
-            else:
-                db.session.add(self.model(**data))
-
-    def fetch_modified_since(self, timestamp: datetime | None) -> list[dict]:
-        stmt = select(self.model)
-        if timestamp:
-            stmt = stmt.where(self.model.last_modified_at > timestamp)
+                inserts.append(row)
+                outcomes[record_id] = "inserted"
+                continue
+            current_modified, current_version = existing[record_id]
+            incoming_modified = row.get("last_modified_at")
+            if incoming_modified and incoming_modified <= current_modified:
+                outcomes[record_id] = "stale"
+                continue
+            changes = {k: v for k, v in row.items() if k not in IMMUTABLE_FIELDS}
+            if changes:
+                updates.append({"id": record_id, **changes, "version": current_version + 1})
+            outcomes[record_id] = "updated"
+
+        if inserts or updates:
+            written = inserts + updates
+            owners = {owner_of(self.model, row) for row in written}
+            note_changes(db.session, self.model, owners, [row["id"] for row in written])
+        if inserts:
+            db.session.execute(insert(self.model), inserts)
+            record_changes(db.session, self.model, [row["id"] for row in inserts])
+        if updates:
+            db.session.execute(update(self.model), updates)
+            by_fields = {}
+            for row in updates:
+                by_fields.setdefault(tuple(sorted(row)), []).append(row["id"])
+            for fields, ids in by_fields.items():
+                record_changes(db.session, self.model, ids, fields)
+        return outcomes
+
+    def insert_records(self, rows: Sequence[dict]) -> None:
+        """Write new ``rows`` with a single multi-row ``INSERT`` and log them in the change feed.
+
+        Every row must carry its ``id`` and the same set of keys.
+        """
+        if not rows:
+            return
+        ids = [row["id"] for row in rows]
+        note_changes(db.session, self.model, {owner_of(self.model, row) for row in rows}, ids)
+        db.session.execute(insert(self.model), list(rows))
+        record_changes(db.session, self.model, ids)
+
+    def fetch_by_ids(self, ids: Iterable[str], fields: Iterable[str] | None = None) -> list[dict]:
+        """Load rows by primary key as plain column dicts, one ``IN`` query per chunk.
+
+        ``fields`` restricts the load to those columns (plus ``id``).
+        """
+        ids = list(ids)
+        columns = self.model.__table__.columns
+        if fields is not None:
+            columns = [columns[name] for name in {"id", *fields} if name in self.columns]
+        rows = []
+        for start in range(0, len(ids), UPSERT_CHUNK_SIZE):
+            stmt = select(*columns).where(
+                self.model.id.in_(ids[start : start + UPSERT_CHUNK_SIZE])
+            )
+            rows.extend(dict(row) for row in db.session.execute(stmt).mappings())
+        return rows
+
+    def fetch_modified_since(
+        self,
+        timestamp: datetime | None,
+        chw_id: str | None = None,
+        after: tuple[datetime, str] | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        stmt = self.modified_since_query(timestamp, chw_id, after)
+        if limit is not None:
+            stmt = stmt.limit(limit)
         results = db.session.execute(stmt).scalars().all()
         return [self.to_dict(row) for row in results]
 
+    def modified_since_query(
+        self,
+        timestamp: datetime | None,
+        chw_id: str | None = None,
+        after: tuple[datetime, str] | None = None,
+    ):
+        """Rows changed after ``timestamp`` in stable ``(last_modified_at, id)`` order.
+
+        ``after`` is the keyset position of the last row a client has already seen.
+        """
+        model = self.model
+        stmt = select(model).order_by(model.last_modified_at, model.id)
+        if timestamp:
+            stmt = stmt.where(model.last_modified_at > timestamp)
+        if chw_id is not None and self.scope is not None:
+            stmt = stmt.where(self.scope(chw_id))
+        if after is not None:
+            after_modified, after_id = after
+            stmt = stmt.where(
+                or_(
+                    model.last_modified_at > after_modified,
+                    and_(model.last_modified_at == after_modified, model.id > after_id),
+                )
+            )
+        return stmt
+
     def to_dict(self, instance) -> dict:
         data = {
             column.name: getattr(instance, column.name)
@@ -46,6 +180,41 @@ class Repository:
         }
         return data
 
+    def _to_row(self, data: dict) -> dict:
+        row = {
+            key: value
+            for key, value in data.items()
+            if key in self.columns and key not in SERVER_MANAGED_FIELDS
+        }
+        if row.get("last_modified_at") is not None:
+            row["last_modified_at"] = to_naive_utc(row["last_modified_at"])
+        return row
+
+    def _load_sync_state(self, ids: Iterable[str]) -> dict[str, tuple[datetime, int]]:
+        ids = list(ids)
+        found: dict[str, tuple[datetime, int]] = {}
+        for start in range(0, len(ids), UPSERT_CHUNK_SIZE):
+            chunk = ids[start : start + UPSERT_CHUNK_SIZE]
+            stmt = select(
+                self.model.id, self.model.last_modified_at, self.model.version
+            ).where(self.model.id.in_(chunk))
+            for record_id, modified, version in db.session.execute(stmt):
+                found[record_id] = (modified, version)
+        return found
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Columns are stored as naive UTC; convert aware client timestamps to match."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _is_older(candidate: datetime | None, current: datetime | None) -> bool:
+    if candidate is None or current is None:
+        return False
+    return candidate < current
+
 
 def get_repository(collection: str) -> Repository:
     model = SYNCABLE_MODELS.get(collection)
@@ -0,0 +1,149 @@
+"""Serialized responses for the hot doctor-facing reads.
+
+``/api/cases/pending`` and ``/api/cases/<id>`` are read far more often than
+they change, so their rendered JSON is kept in the ``responses`` cache (Redis
+with ``CACHE_BACKEND=redis``, otherwise a per-process LRU) for up to
+``RESPONSE_CACHE_TTL`` seconds. Entries are keyed by resource, principal and
+query string.
+
+Each entry remembers the generation of every scope it was built from, such as
+``pending``, ``case:<id>`` or ``patient:<id>``. Invalidating a scope deletes
+its generation; the next read finds a fresh one and every entry built on the
+old one stops matching, without the writer having to know which principals
+cached it. Generations are read before the response is built, so a write that
+commits mid-build has already retired the entry before anyone reads it.
+
+ORM and bulk writes invalidate through
+:data:`~app.services.change_feed.changes_committed`; claim updates, which
+bypass the change feed, call :func:`invalidate` directly. With the in-memory
+backend a Celery worker only invalidates its own process, so web workers see
+MedGemma results once their entries expire.
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable
+
+from flask import current_app, has_app_context, request
+
+from .. import metrics
+from ..cache import get_cache
+from ..conditional import Validators, apply_validators, not_modified
+from ..listing import NEXT_CURSOR_HEADER
+from .change_feed import changes_committed
+
+PENDING_SCOPE = "pending"
+
+
+def cached_response(
+    resource: str, principal, scopes: Iterable[str], build: Callable, key: str = ""
+):
+    """Serve ``resource`` for ``principal`` from the cache, or call ``build`` and cache it.
+
+    ``resource`` names the metric; ``key`` tells its instances apart (a case id).
+    ``build()`` returns ``(response, extra_scopes)``; ``extra_scopes`` are
+    dependencies only known once the data is loaded, like a case's patient.
+    Only ``200`` responses are cached.
+    """
+    cache = _response_cache()
+    key = ":".join(
+        [resource, key, principal.role, principal.id, request.query_string.decode("latin-1")]
+    )
+    entry = cache.get(key)
+    if entry is not None and all(
+        _generation(cache, scope) == generation
+        for scope, generation in entry["generations"].items()
+    ):
+        metrics.increment(f"response_cache.{resource}.hits")
+        return _replay(entry)
+
+    metrics.increment(f"response_cache.{resource}.misses")
+    generations = {scope: _generation(cache, scope) for scope in scopes}
+    response, extra_scopes = build()
+    if response.status_code == 200 and not response.is_streamed:
+        for scope in extra_scopes:
+            generations[scope] = _generation(cache, scope)
+        cache.set(key, _entry(response, generations))
+    return response
+
+
+def invalidate(*scopes: str) -> None:
+    if not has_app_context():
+        return
+    cache = _response_cache()
+    for scope in scopes:
+        cache.delete(f"gen:{scope}")
+    metrics.increment("response_cache.invalidations", len(scopes))
+
+
+def case_scope(case_id: str) -> str:
+    return f"case:{case_id}"
+
+
+def patient_scope(patient_id: str) -> str:
+    return f"patient:{patient_id}"
+
+
+def _generation(cache, scope: str) -> str:
+    key = f"gen:{scope}"
+    generation = cache.get(key)
+    if generation is None:
+        # A missing generation (never set, invalidated, evicted or expired) is
+        # replaced by a fresh one, so entries built on an older generation never
+        # match. Expiring them keeps one key per case and patient ever read from
+        # piling up in Redis, which is also the Celery broker; twice the entry
+        # TTL means an entry rarely outlives the generation it was built on.
+        generation = uuid.uuid4().hex
+        cache.set(key, generation, ttl=2 * current_app.config["RESPONSE_CACHE_TTL"])
+    return generation
+
+
+def _entry(response, generations: dict[str, str]) -> dict:
+    etag, _weak = response.get_etag()
+    last_modified = response.last_modified
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=None).isoformat()
+    return {
+        "body": response.get_data(as_text=True),
+        "etag": etag,
+        "last_modified": last_modified,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+        "generations": generations,
+    }
+
+
+def _replay(entry: dict):
+    validators = None
+    if entry["etag"]:
+        last_modified = entry["last_modified"]
+        validators = Validators(
+            entry["etag"], datetime.fromisoformat(last_modified) if last_modified else None
+        )
+        cached = not_modified(validators)
+        if cached is not None:
+            return cached
+
+    response = current_app.response_class(entry["body"], mimetype="application/json")
+    if entry["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = entry["next_cursor"]
+    if validators is not None:
+        apply_validators(response, validators)
+    return response
+
+
+def _response_cache():
+    config = current_app.config
+    return get_cache("responses", config["RESPONSE_CACHE_SIZE"], config["RESPONSE_CACHE_TTL"])
+
+
+@changes_committed.connect
+def _invalidate_responses(_session, records: dict[str, set[str]] | None = None, **_kwargs):
+    records = records or {}
+    scopes = []
+    if "cases" in records or "patients" in records:
+        scopes.append(PENDING_SCOPE)
+    scopes.extend(case_scope(case_id) for case_id in records.get("cases", ()))
+    scopes.extend(patient_scope(patient_id) for patient_id in records.get("patients", ()))
+    if scopes:
+        invalidate(*scopes)
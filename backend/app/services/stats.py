@@ -0,0 +1,89 @@
+"""Dashboard counters for ``/api/me``.
+
+Each user's counters come from a single aggregate statement served by the
+``(owner, created_at)`` indexes, so the cost does not grow with the caseload's
+row data. Results are cached for ``STATS_CACHE_TTL`` seconds and dropped as
+soon as a committed write touches the user's rows (see
+:data:`~app.services.change_feed.changes_committed`). ``this_week`` is a
+rolling seven-day window ending now.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+
+from ..cache import get_cache
+from ..extensions import db
+from ..models import Case, Diagnosis, Patient
+from .change_feed import changes_committed
+from .work_queue import pending_condition
+
+WEEK = timedelta(days=7)
+PENDING_KEY = "pending"
+
+
+def chw_stats(chw_id: str, now: datetime | None = None) -> dict:
+    cache = _stats_cache()
+    key = f"chw:{chw_id}"
+    stats = cache.get(key)
+    if stats is None:
+        week_ago = (now or datetime.utcnow()) - WEEK
+        stmt = select(
+            _count(Patient, Patient.chw_id == chw_id).label("patients"),
+            _count(Case, Case.chw_id == chw_id).label("cases"),
+            _count(Case, Case.chw_id == chw_id, Case.created_at >= week_ago).label("this_week"),
+        )
+        stats = dict(db.session.execute(stmt).mappings().one())
+        cache.set(key, stats)
+    return stats
+
+
+def doctor_stats(doctor_id: str, now: datetime | None = None) -> dict:
+    cache = _stats_cache()
+    key = f"doctor:{doctor_id}"
+    stats = cache.get(key)
+    if stats is None:
+        week_ago = (now or datetime.utcnow()) - WEEK
+        stmt = select(
+            _count(Diagnosis, Diagnosis.doctor_id == doctor_id).label("diagnoses"),
+            _count(
+                Diagnosis, Diagnosis.doctor_id == doctor_id, Diagnosis.created_at >= week_ago
+            ).label("this_week"),
+        )
+        stats = dict(db.session.execute(stmt).mappings().one())
+        cache.set(key, stats)
+    return {**stats, "pending_cases": pending_case_count()}
+
+
+def pending_case_count() -> int:
+    """Cases waiting for any doctor; shared by every doctor's dashboard."""
+    cache = _stats_cache()
+    count = cache.get(PENDING_KEY)
+    if count is None:
+        stmt = select(func.count()).select_from(Case).where(pending_condition())
+        count = db.session.execute(stmt).scalar_one()
+        cache.set(PENDING_KEY, count)
+    return count
+
+
+def _count(model, *conditions):
+    return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def _stats_cache():
+    return get_cache("stats", maxsize=4096, ttl=current_app.config["STATS_CACHE_TTL"])
+
+
+@changes_committed.connect
+def _invalidate_stats(_session, changes: dict[str, set[str]], **_kwargs) -> None:
+    if not has_app_context():
+        return
+    cache = _stats_cache()
+    for collection, owners in changes.items():
+        prefix = "doctor" if collection == "diagnoses" else "chw"
+        for owner in owners:
+            cache.delete(f"{prefix}:{owner}")
+        if collection in ("cases", "diagnoses"):
+            cache.delete(PENDING_KEY)
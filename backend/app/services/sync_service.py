@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import datetime, timezone
+from typing import Iterator
 
-from sqlalchemy import select
+from flask import current_app
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..ai.tasks import dispatch_medgemma_analyses, enqueue_medgemma_cases
 from ..extensions import db
-from ..models import MedGemmaQueue
-from .repository import SYNCABLE_MODELS, get_repository
+from ..json_provider import dumps
+from ..models import ChangeLog
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor
+from .change_feed import append_queued_changes
+from .repository import SYNCABLE_MODELS, get_repository, to_naive_utc
+
+# Always sent with a delta record so clients can apply it and track versions.
+DELTA_FIELDS = {"id", "version", "last_modified_at"}
 
 
 class SyncService:
@@ -17,34 +27,157 @@ class SyncService:
         }
 
     def process_sync_payload(self, data: dict, chw_id: str) -> dict:
-        changes = data.get("changes", {})
-        timestamp = data.get("last_sync_timestamp")
-        if isinstance(timestamp, str):
-            timestamp = datetime.fromisoformat(timestamp)
+        page = self._resolve_page(data, chw_id)
+        results, written = self._apply(data.get("changes", {}), chw_id)
+
+        response = {
+            "new_sync_timestamp": page["snapshot"],
+            "results": results,
+            "next_cursor": None,
+        }
+        if page["mode"] == "feed":
+            server_updates, last_seq, has_more = self._collect_feed_updates(
+                chw_id, page["after_seq"], page["limit"], page["delta"], skip=written
+            )
+            return {
+                **response,
+                "server_updates": server_updates,
+                "new_sync_seq": last_seq,
+                "has_more": has_more,
+            }
+
+        server_updates, next_position = self._collect_server_updates(
+            page["since"], chw_id, page["position"], page["limit"]
+        )
+        if next_position is not None:
+            response["next_cursor"] = self._page_cursor(page, next_position)
+        return {
+            **response,
+            "server_updates": server_updates,
+            "new_sync_seq": page["head_seq"],
+            "has_more": response["next_cursor"] is not None,
+        }
+
+    def stream_sync_payload(self, data: dict, chw_id: str) -> Iterator[str]:
+        """Apply the uploaded changes, then return a generator of NDJSON lines.
+
+        Uploads are committed before the first byte is sent so errors still surface
+        as a normal error response. The stream starts with a ``sync`` header line,
+        then one ``record`` line per changed row, with a ``checkpoint`` cursor after
+        every fetched batch that a client can resume from, and finishes with ``end``.
+        """
+        page = self._resolve_page(data, chw_id)
+        results, written = self._apply(data.get("changes", {}), chw_id)
+        return self._stream_updates(page, chw_id, results, written)
+
+    def apply_changes(self, changes: dict, chw_id: str, before_commit=None) -> dict:
+        """Upsert uploaded changes in one transaction and return per-collection results.
 
+        ``before_commit(results)`` lets callers add their own rows to the same
+        transaction.
+        """
+        return self._apply(changes, chw_id, before_commit)[0]
+
+    def _apply(self, changes: dict, chw_id: str, before_commit=None) -> tuple[dict, set[int]]:
+        """:meth:`apply_changes`, plus the change-feed sequences the upload appended."""
+        results = {}
+        case_outcomes: dict[str, str] = {}
         try:
             for collection, payloads in changes.items():
                 if collection not in self.repositories:
                     continue
                 normalized = [self._normalize_payload(p, chw_id, collection) for p in payloads]
-                self.repositories[collection].upsert_records(normalized)
+                outcomes = self.repositories[collection].upsert_records(normalized)
+                results[collection] = summarize_outcomes(outcomes)
+                if collection == "cases":
+                    case_outcomes = outcomes
 
-            self._enqueue_high_risk_cases(changes.get("cases", []))
+            queued = self._enqueue_high_risk_cases(changes.get("cases", []), case_outcomes)
+            if before_commit is not None:
+                before_commit(results)
+            written = append_queued_changes(db.session)
             db.session.commit()
         except SQLAlchemyError as exc:
             db.session.rollback()
             raise exc
+        dispatch_medgemma_analyses(queued)
+        return results, written
+
+    def _resolve_page(self, data: dict, chw_id: str) -> dict:
+        """Work out which page of server updates this request asks for.
+
+        Clients that send ``last_sync_seq`` read the change feed after that sequence
+        number, optionally as field-level ``delta`` records. Otherwise the first
+        request starts a pull at ``last_sync_timestamp`` and follow-up requests
+        carry the cursor from the previous response, which pins the original lower
+        bound, the ``new_sync_timestamp`` and the ``new_sync_seq`` the client
+        should store once ``has_more`` turns false.
+        """
+        config = current_app.config
+        limit = min(
+            data.get("page_size") or config["SYNC_PAGE_SIZE"], config["SYNC_MAX_PAGE_SIZE"]
+        )
+        snapshot = datetime.now(timezone.utc).isoformat()
+        if data.get("last_sync_seq") is not None:
+            return {
+                "mode": "feed",
+                "after_seq": data["last_sync_seq"],
+                "delta": bool(data.get("delta")),
+                "snapshot": snapshot,
+                "limit": limit,
+            }
 
-        new_sync_timestamp = datetime.now(timezone.utc)
-        server_updates = self._collect_server_updates(timestamp)
+        cursor = data.get("cursor")
+        if not cursor:
+            timestamp = data.get("last_sync_timestamp")
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            return {
+                "mode": "timestamp",
+                "since": to_naive_utc(timestamp).isoformat() if timestamp else None,
+                "snapshot": snapshot,
+                "head_seq": latest_seq(chw_id),
+                "position": None,
+                "limit": limit,
+            }
+
+        position = decode_cursor(cursor)
+        try:
+            collection = position["collection"]
+            after = position["after"]
+            if collection not in self.repositories:
+                raise InvalidCursor("Invalid cursor")
+            if after is not None:
+                after = (datetime.fromisoformat(after[0]), str(after[1]))
+            since = position["since"]
+            if since is not None:
+                datetime.fromisoformat(since)
+            snapshot = str(position["snapshot"])
+            head_seq = int(position["head_seq"])
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            raise InvalidCursor("Invalid cursor") from exc
         return {
-            "new_sync_timestamp": new_sync_timestamp.isoformat(),
-            "server_updates": server_updates,
+            "mode": "timestamp",
+            "since": since,
+            "snapshot": snapshot,
+            "head_seq": head_seq,
+            "position": {"collection": collection, "after": after},
+            "limit": limit,
         }
 
+    def _page_cursor(self, page: dict, position: dict) -> str:
+        return encode_cursor(
+            {
+                **position,
+                "since": page["since"],
+                "snapshot": page["snapshot"],
+                "head_seq": page["head_seq"],
+            }
+        )
+
     def _normalize_payload(self, payload: dict, chw_id: str, collection: str) -> dict:
         normalized = payload.copy()
-        if collection in {"patients", "cases"}:
+        if collection in {"patients", "cases", "vitals"}:
             normalized.setdefault("chw_id", chw_id)
         if "last_modified_at" in normalized and isinstance(
             normalized["last_modified_at"], str
@@ -54,51 +187,235 @@ class SyncService:
             )
         if collection == "cases" and isinstance(normalized.get("image_urls"), list):
             normalized["image_urls"] = ",".join(normalized["image_urls"])
-        if collection == "cases" and isinstance(normalized.get("triage_data"), dict):
-            normalized["triage_data"] = json_dump(normalized["triage_data"])
-        if collection == "cases" and isinstance(normalized.get("ai_analysis"), dict):
-            normalized["ai_analysis"] = json_dump(normalized["ai_analysis"])
-        if collection == "patients" and isinstance(normalized.get("demographics"), dict):
-            normalized["demographics"] = json_dump(normalized["demographics"])
-        if collection == "diagnoses" and isinstance(
-            normalized.get("prescription"), (dict, list)
-        ):
-            normalized["prescription"] = json_dump(normalized["prescription"])
         return normalized
 
-    def _collect_server_updates(self, timestamp: datetime | None) -> dict:
+    def _collect_server_updates(
+        self,
+        since: str | None,
+        chw_id: str,
+        position: dict | None,
+        limit: int,
+    ) -> tuple[dict, dict | None]:
+        """Collect up to ``limit`` of the CHW's changed records, walking collections in order.
+
+        Returns the updates and the keyset position to resume from, or ``None`` once
+        every collection has been drained.
+        """
+        timestamp = datetime.fromisoformat(since) if since else None
+        names = list(self.repositories)
+        start = names.index(position["collection"]) if position else 0
         updates = {}
-        for collection, repo in self.repositories.items():
-            records = repo.fetch_modified_since(timestamp)
-            if not records:
-                continue
-            normalized_records = []
-            for record in records:
-                record = record.copy()
-                if collection == "cases" and record.get("image_urls"):
-                    record["image_urls"] = record["image_urls"].split(",")
-                for key in ("triage_data", "ai_analysis", "demographics", "prescription"):
-                    if record.get(key):
-                        record[key] = try_json_load(record[key])
-                for key in ("created_at", "updated_at", "last_modified_at"):
-                    if record.get(key):
-                        record[key] = ensure_isoformat(record[key])
-                normalized_records.append(record)
-            updates[collection] = normalized_records
-        return updates
-
-    def _enqueue_high_risk_cases(self, cases: list[dict]) -> None:
-        for case_payload in cases:
-            if case_payload.get("risk_level", "").lower() != "high":
-                continue
-            stmt = select(MedGemmaQueue).where(
-                MedGemmaQueue.case_id == case_payload["id"]
+        remaining = limit
+        for index in range(start, len(names)):
+            collection = names[index]
+            after = None
+            if position and collection == position["collection"]:
+                after = position["after"]
+            records = self.repositories[collection].fetch_modified_since(
+                timestamp, chw_id=chw_id, after=after, limit=remaining + 1
             )
-            queue_entry = db.session.execute(stmt).scalar_one_or_none()
-            if queue_entry:
+            has_more = len(records) > remaining
+            records = records[:remaining]
+            if records:
+                updates[collection] = [
+                    self._serialize_record(collection, record) for record in records
+                ]
+            remaining -= len(records)
+
+            if has_more:
+                last = records[-1]
+                return updates, {
+                    "collection": collection,
+                    "after": [last["last_modified_at"].isoformat(), last["id"]],
+                }
+            if remaining == 0 and index + 1 < len(names):
+                return updates, {"collection": names[index + 1], "after": None}
+        return updates, None
+
+    def _collect_feed_updates(
+        self,
+        chw_id: str,
+        after_seq: int,
+        limit: int,
+        delta: bool = False,
+        skip: set[int] = frozenset(),
+    ) -> tuple[dict, int, bool]:
+        """Read up to ``limit`` change-log entries after ``after_seq`` for the CHW.
+
+        Entries in ``skip`` (the request's own uploads) are passed over but still
+        count towards the returned sequence, so the client never reads them.
+        """
+        stmt = feed_query(chw_id, after_seq).limit(limit + 1)
+        entries = db.session.execute(stmt).all()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        updates = {}
+        unseen = [entry for entry in entries if entry.seq not in skip]
+        for collection, record in self._resolve_feed_entries(unseen, delta):
+            updates.setdefault(collection, []).append(record)
+        last_seq = entries[-1].seq if entries else after_seq
+        return updates, last_seq, has_more
+
+    def _resolve_feed_entries(self, entries, delta: bool = False) -> list[tuple[str, dict]]:
+        """Load the current rows behind feed entries, once per record, in feed order.
+
+        In delta mode a record whose entries all name the columns they changed is
+        sent as a ``_partial`` record holding only those columns plus ``id``,
+        ``version`` and ``last_modified_at``, and only those columns are read.
+        """
+        latest = {}
+        changed = {}
+        for entry in entries:
+            if entry.collection not in self.repositories:
                 continue
-            new_entry = MedGemmaQueue(case_id=case_payload["id"])
-            db.session.add(new_entry)
+            key = (entry.collection, entry.record_id)
+            latest[key] = entry.seq
+            if not delta or entry.fields is None or changed.get(key, ()) is None:
+                changed[key] = None
+            else:
+                changed.setdefault(key, set()).update(filter(None, entry.fields.split(",")))
+
+        full_ids = defaultdict(list)
+        partial_ids = defaultdict(list)
+        partial_columns = defaultdict(set)
+        for (collection, record_id), fields in changed.items():
+            if fields is None:
+                full_ids[collection].append(record_id)
+            else:
+                partial_ids[collection].append(record_id)
+                partial_columns[collection].update(fields)
+
+        records = {}
+        for collection, ids in full_ids.items():
+            for row in self.repositories[collection].fetch_by_ids(ids):
+                records[(collection, row["id"])] = self._serialize_record(collection, row)
+        for collection, ids in partial_ids.items():
+            columns = partial_columns[collection] | DELTA_FIELDS
+            for row in self.repositories[collection].fetch_by_ids(ids, columns):
+                key = (collection, row["id"])
+                wanted = changed[key] | DELTA_FIELDS
+                record = {name: value for name, value in row.items() if name in wanted}
+                records[key] = {**self._serialize_record(collection, record), "_partial": True}
+
+        ordered = sorted(latest.items(), key=lambda item: item[1])
+        return [(key[0], records[key]) for key, _seq in ordered if key in records]
+
+    def _stream_updates(
+        self, page: dict, chw_id: str, results: dict, written: set[int] = frozenset()
+    ) -> Iterator[str]:
+        header = {"type": "sync", "new_sync_timestamp": page["snapshot"], "results": results}
+        if page["mode"] == "feed":
+            batches = self._iter_feed_batches(
+                chw_id, page["after_seq"], page["delta"], skip=written
+            )
+        else:
+            header["new_sync_seq"] = page["head_seq"]
+            batches = self._iter_update_batches(page, chw_id)
+        yield ndjson_line(header)
+
+        count = 0
+        for records, checkpoint in batches:
+            lines = [
+                ndjson_line({"type": "record", "collection": collection, "record": record})
+                for collection, record in records
+            ]
+            count += len(records)
+            lines.append(ndjson_line({"type": "checkpoint", **checkpoint}))
+            yield "".join(lines)
+        yield ndjson_line({"type": "end", "count": count})
+
+    def _iter_feed_batches(
+        self, chw_id: str, after_seq: int, delta: bool = False, skip: set[int] = frozenset()
+    ) -> Iterator[tuple[list, dict]]:
+        batch_size = current_app.config["SYNC_STREAM_BATCH_SIZE"]
+        stmt = feed_query(chw_id, after_seq).execution_options(yield_per=batch_size)
+        for entries in db.session.execute(stmt).partitions():
+            unseen = [entry for entry in entries if entry.seq not in skip]
+            yield self._resolve_feed_entries(unseen, delta), {"seq": entries[-1].seq}
+
+    def _iter_update_batches(self, page: dict, chw_id: str) -> Iterator[tuple[list, dict]]:
+        """Yield serialized record batches straight from a server-side cursor.
+
+        Plain column rows are fetched instead of ORM instances so nothing piles up
+        in the identity map while the response is streaming.
+        """
+        since = page["since"]
+        position = page["position"]
+        timestamp = datetime.fromisoformat(since) if since else None
+        batch_size = current_app.config["SYNC_STREAM_BATCH_SIZE"]
+        names = list(self.repositories)
+        start = names.index(position["collection"]) if position else 0
+        for collection in names[start:]:
+            repo = self.repositories[collection]
+            after = None
+            if position and collection == position["collection"]:
+                after = position["after"]
+            stmt = (
+                repo.modified_since_query(timestamp, chw_id, after)
+                .with_only_columns(*repo.model.__table__.columns)
+                .execution_options(yield_per=batch_size)
+            )
+            for rows in db.session.execute(stmt).mappings().partitions():
+                last = rows[-1]
+                cursor = self._page_cursor(
+                    page,
+                    {
+                        "collection": collection,
+                        "after": [last["last_modified_at"].isoformat(), last["id"]],
+                    },
+                )
+                records = [(collection, self._serialize_record(collection, row)) for row in rows]
+                yield records, {"cursor": cursor}
+
+    def _serialize_record(self, collection: str, record) -> dict:
+        record = dict(record)
+        if collection == "cases" and record.get("image_urls"):
+            record["image_urls"] = record["image_urls"].split(",")
+        for key in ("created_at", "updated_at", "last_modified_at"):
+            if record.get(key):
+                record[key] = ensure_isoformat(record[key])
+        return record
+
+    def _enqueue_high_risk_cases(self, cases: list[dict], outcomes: dict[str, str]) -> list[str]:
+        """Queue MedGemma for high-risk cases this upload actually wrote."""
+        return enqueue_medgemma_cases(
+            case_payload["id"]
+            for case_payload in cases
+            if (case_payload.get("risk_level") or "").lower() == "high"
+            and outcomes.get(case_payload["id"]) in ("inserted", "updated")
+        )
+
+
+def feed_query(chw_id: str, after_seq: int):
+    return (
+        select(ChangeLog.seq, ChangeLog.collection, ChangeLog.record_id, ChangeLog.fields)
+        .where(ChangeLog.chw_id == chw_id, ChangeLog.seq > after_seq)
+        .order_by(ChangeLog.seq)
+    )
+
+
+def latest_seq(chw_id: str) -> int:
+    stmt = select(func.max(ChangeLog.seq)).where(ChangeLog.chw_id == chw_id)
+    return db.session.execute(stmt).scalar() or 0
+
+
+def summarize_outcomes(outcomes: dict[str, str]) -> dict:
+    """Collapse per-record upsert outcomes into counts plus the ids the server did not apply.
+
+    ``stale`` lists records older than the server's copy; ``rejected`` lists
+    partial records for rows the server does not have, which must be re-sent whole.
+    """
+    summary = {"inserted": 0, "updated": 0, "stale": [], "rejected": []}
+    for record_id, outcome in outcomes.items():
+        if outcome in ("stale", "rejected"):
+            summary[outcome].append(record_id)
+        else:
+            summary[outcome] += 1
+    return summary
+
+
+def ndjson_line(value) -> str:
+    return dumps(value) + "\n"
 
 
 def ensure_isoformat(value) -> str:
@@ -110,17 +427,3 @@ def ensure_isoformat(value) -> str:
         return value
     return str(value)
 
-
-def json_dump(value) -> str:
-    from json import dumps
-
-    return dumps(value, default=str)
-
-
-def try_json_load(value: str):
-    from json import JSONDecodeError, loads
-
-    try:
-        return loads(value)
-    except (TypeError, JSONDecodeError):
-        return value
@@ -0,0 +1,137 @@
+"""Resumable chunked uploads for devices coming back from long offline periods.
+
+A client opens a session, uploads its backlog as numbered chunks and finalizes
+the session once every chunk is in. Each chunk is upserted and committed in its
+own transaction together with a checksum row, so a dropped connection only
+loses the chunk in flight: the client asks which chunks arrived and re-sends
+the rest. Re-sending a committed chunk is a no-op that returns its results.
+Chunks are capped at ``SYNC_MAX_CHUNK_BYTES``; finalizing returns the same
+server updates as ``/api/sync``.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..json_provider import dumps, dumps_bytes, loads
+from ..models import SyncSession, SyncSessionChunk
+from .sync_service import SyncService
+
+
+class SyncSessionError(Exception):
+    status_code = 400
+
+    def __init__(self, message: str, **details) -> None:
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+class SessionNotFound(SyncSessionError):
+    status_code = 404
+
+
+class SessionConflict(SyncSessionError):
+    status_code = 409
+
+
+def chunk_checksum(changes: dict) -> str:
+    return hashlib.sha256(dumps_bytes(changes, sort_keys=True)).hexdigest()
+
+
+class SyncSessionService:
+    def __init__(self, sync_service: SyncService) -> None:
+        self.sync_service = sync_service
+
+    def open_session(self, chw_id: str) -> SyncSession:
+        session = SyncSession(chw_id=chw_id)
+        db.session.add(session)
+        db.session.commit()
+        return session
+
+    def get_session(self, session_id: str, chw_id: str) -> SyncSession:
+        session = db.session.get(SyncSession, session_id)
+        if session is None or session.chw_id != chw_id:
+            raise SessionNotFound("Sync session not found")
+        return session
+
+    def received_chunks(self, session: SyncSession) -> list[int]:
+        stmt = (
+            select(SyncSessionChunk.chunk_index)
+            .where(SyncSessionChunk.session_id == session.id)
+            .order_by(SyncSessionChunk.chunk_index)
+        )
+        return list(db.session.execute(stmt).scalars())
+
+    def upload_chunk(
+        self, session_id: str, chw_id: str, chunk_index: int, changes: dict
+    ) -> tuple[dict, bool]:
+        """Apply one chunk in its own transaction.
+
+        Returns the chunk's upsert results and whether it had already been committed.
+        """
+        session = self.get_session(session_id, chw_id)
+        checksum = chunk_checksum(changes)
+        committed = self._committed_chunk(session.id, chunk_index, checksum)
+        if committed is not None:
+            return committed, True
+        if session.status != "open":
+            raise SessionConflict("Sync session is already finalized")
+
+        def record_chunk(results: dict) -> None:
+            db.session.add(
+                SyncSessionChunk(
+                    session_id=session.id,
+                    chunk_index=chunk_index,
+                    checksum=checksum,
+                    results=dumps(results),
+                )
+            )
+
+        try:
+            return self.sync_service.apply_changes(changes, chw_id, record_chunk), False
+        except IntegrityError:
+            # A concurrent retry of the same chunk may have committed first.
+            committed = self._committed_chunk(session.id, chunk_index, checksum)
+            if committed is None:
+                raise
+            return committed, True
+
+    def finalize(self, session_id: str, chw_id: str, total_chunks: int) -> SyncSession:
+        session = self.get_session(session_id, chw_id)
+        if session.status == "finalized":
+            if session.total_chunks != total_chunks:
+                raise SessionConflict("Sync session was finalized with a different chunk count")
+            return session
+
+        received = set(self.received_chunks(session))
+        expected = set(range(total_chunks))
+        if received != expected:
+            raise SessionConflict(
+                "Sync session is missing chunks",
+                missing_chunks=sorted(expected - received),
+                unexpected_chunks=sorted(received - expected),
+            )
+        session.status = "finalized"
+        session.total_chunks = total_chunks
+        session.finalized_at = datetime.utcnow()
+        db.session.commit()
+        return session
+
+    def _committed_chunk(self, session_id: str, chunk_index: int, checksum: str) -> dict | None:
+        stmt = select(SyncSessionChunk).where(
+            SyncSessionChunk.session_id == session_id,
+            SyncSessionChunk.chunk_index == chunk_index,
+        )
+        chunk = db.session.execute(stmt).scalar_one_or_none()
+        if chunk is None:
+            return None
+        if chunk.checksum != checksum:
+            raise SessionConflict(
+                "Chunk was already uploaded with different contents", chunk_index=chunk_index
+            )
+        return loads(chunk.results)
@@ -0,0 +1,170 @@
+"""Claimable queue of high-risk cases awaiting a doctor.
+
+Doctors claim cases instead of polling the whole pending list. A claim is a
+lease (``claimed_by`` plus ``claim_expires_at``) so cases held by a doctor who
+walked away return to the queue on their own after ``CASE_CLAIM_TTL`` seconds;
+claiming again renews the lease. Cases are handed out by MedGemma severity,
+then age. Claims are written with Core
+``UPDATE`` statements, which keeps them out of the CHW change feed; they drop
+the affected cached responses themselves.
+
+On PostgreSQL candidates are picked with ``SELECT ... FOR UPDATE SKIP LOCKED``
+so concurrent doctors never wait on or double-claim the same rows. Other
+databases use a compare-and-set ``UPDATE`` that re-checks the claimable
+condition, then read back which rows the caller actually won. Diagnosing a
+case is the same kind of compare-and-set on the claim (:func:`complete_case`).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from ..extensions import db
+from ..models import Case
+from . import response_cache
+from .change_feed import note_changes, record_changes
+
+PENDING_STATUSES = ("TRIAGED", "PENDING_DIAGNOSIS", "REQUIRES_MEDGEMMA")
+
+
+def pending_condition():
+    return and_(Case.risk_level == "high", Case.status.in_(PENDING_STATUSES))
+
+
+def claimable_condition(now: datetime):
+    return and_(
+        pending_condition(),
+        or_(Case.claimed_by.is_(None), Case.claim_expires_at <= now),
+    )
+
+
+def queue_order():
+    return (Case.priority.desc().nulls_last(), Case.created_at, Case.id)
+
+
+def claim_cases(doctor_id: str, limit: int, now: datetime | None = None) -> list[Case]:
+    """Return up to ``limit`` cases leased to ``doctor_id``, highest priority first.
+
+    Cases the doctor already holds count towards ``limit`` and have their lease
+    renewed, so polling this endpoint doubles as a heartbeat.
+    """
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config["CASE_CLAIM_TTL"])
+
+    held = _held_ids(doctor_id, now)
+    if held:
+        db.session.execute(
+            update(Case).where(Case.id.in_(held)).values(claim_expires_at=expires_at)
+        )
+    wanted = max(limit - len(held), 0)
+    if wanted:
+        if db.engine.dialect.name == "postgresql":
+            _claim_skip_locked(doctor_id, wanted, now, expires_at)
+        else:
+            _claim_compare_and_set(doctor_id, wanted, now, expires_at)
+    db.session.commit()
+
+    stmt = (
+        select(Case)
+        .where(Case.claimed_by == doctor_id, Case.claim_expires_at > now, pending_condition())
+        .order_by(*queue_order())
+        .limit(limit)
+    )
+    cases = list(db.session.execute(stmt).scalars())
+    if held or cases:
+        claimed = {*held, *(case.id for case in cases)}
+        response_cache.invalidate(
+            response_cache.PENDING_SCOPE, *map(response_cache.case_scope, claimed)
+        )
+    return cases
+
+
+def release_case(case_id: str, doctor_id: str) -> bool:
+    """Hand a claimed case back to the queue. Returns False if the caller did not hold it."""
+    result = db.session.execute(
+        update(Case)
+        .where(Case.id == case_id, Case.claimed_by == doctor_id)
+        .values(claimed_by=None, claim_expires_at=None)
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return False
+    response_cache.invalidate(response_cache.PENDING_SCOPE, response_cache.case_scope(case_id))
+    return True
+
+
+def complete_case(case: Case, doctor_id: str, now: datetime | None = None) -> bool:
+    """Mark ``case`` diagnosed and drop its claim, unless another doctor holds it.
+
+    The claim check and the status change are one conditional ``UPDATE``, so a
+    claim taken after the caller loaded the case can never be overridden.
+    Returns False, changing nothing, when the case is claimed by someone else.
+    The write is logged to the change feed; the caller owns the commit.
+    """
+    now = now or datetime.utcnow()
+    result = db.session.execute(
+        update(Case)
+        .where(
+            Case.id == case.id,
+            or_(
+                Case.claimed_by.is_(None),
+                Case.claimed_by == doctor_id,
+                Case.claim_expires_at <= now,
+            ),
+        )
+        .values(
+            status="DIAGNOSED",
+            claimed_by=None,
+            claim_expires_at=None,
+            version=Case.version + 1,
+            last_modified_at=now,
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != 1:
+        return False
+    note_changes(db.session, Case, [case.chw_id], [case.id])
+    record_changes(db.session, Case, [case.id], ["status", "claimed_by", "claim_expires_at"])
+    return True
+
+
+def _held_ids(doctor_id: str, now: datetime) -> list[str]:
+    stmt = select(Case.id).where(
+        Case.claimed_by == doctor_id, Case.claim_expires_at > now, pending_condition()
+    )
+    return list(db.session.execute(stmt).scalars())
+
+
+def _claim_skip_locked(doctor_id: str, limit: int, now: datetime, expires_at: datetime) -> None:
+    candidates = (
+        select(Case.id)
+        .where(claimable_condition(now))
+        .order_by(*queue_order())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = list(db.session.execute(candidates).scalars())
+    if ids:
+        db.session.execute(
+            update(Case)
+            .where(Case.id.in_(ids))
+            .values(claimed_by=doctor_id, claim_expires_at=expires_at)
+        )
+
+
+def _claim_compare_and_set(
+    doctor_id: str, limit: int, now: datetime, expires_at: datetime
+) -> None:
+    candidates = (
+        select(Case.id).where(claimable_condition(now)).order_by(*queue_order()).limit(limit)
+    )
+    ids = list(db.session.execute(candidates).scalars())
+    if ids:
+        # Re-checking the condition makes a row another doctor won in between a no-op.
+        db.session.execute(
+            update(Case)
+            .where(Case.id.in_(ids), claimable_condition(now))
+            .values(claimed_by=doctor_id, claim_expires_at=expires_at)
+        )
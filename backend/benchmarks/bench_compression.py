@@ -0,0 +1,74 @@
+"""Bytes on the wire and CPU cost of gzip/zstd for realistic sync payloads.
+
+Usage: ``python -m benchmarks.bench_compression [--patients 10 100 1000]``
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import time
+import uuid
+
+from app.compression import zstandard
+
+from .common import sync_changes
+
+ROUNDS = 20
+
+
+def sync_response(patients: int) -> bytes:
+    """A sync response body shaped like the one ``/api/sync`` returns."""
+    changes = sync_changes(str(uuid.uuid4()), patients)
+    for collection in changes.values():
+        for record in collection:
+            record["created_at"] = record["last_modified_at"]
+            record["updated_at"] = record["last_modified_at"]
+    body = {
+        "new_sync_timestamp": "2024-06-01T12:00:00+00:00",
+        "server_updates": changes,
+        "has_more": False,
+        "next_cursor": None,
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def codecs():
+    yield "gzip-1", lambda d: gzip.compress(d, 1), gzip.decompress
+    yield "gzip-6", lambda d: gzip.compress(d, 6), gzip.decompress
+    yield "gzip-9", lambda d: gzip.compress(d, 9), gzip.decompress
+    if zstandard is not None:
+        for level in (1, 3, 9):
+            compressor = zstandard.ZstdCompressor(level=level)
+            decompressor = zstandard.ZstdDecompressor()
+            yield f"zstd-{level}", compressor.compress, decompressor.decompress
+
+
+def measure(func, data) -> tuple[float, bytes]:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func(data)
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    header = f"{'patients':>9} {'codec':>7} {'raw bytes':>10} {'wire bytes':>11} {'ratio':>6} {'comp ms':>8} {'decomp ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for patients in args.patients:
+        data = sync_response(patients)
+        for name, compress, decompress in codecs():
+            compress_ms, compressed = measure(compress, data)
+            decompress_ms, _ = measure(decompress, compressed)
+            print(
+                f"{patients:>9} {name:>7} {len(data):>10} {len(compressed):>11}"
+                f" {len(data) / len(compressed):>6.1f} {compress_ms:>8.2f} {decompress_ms:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Encode/decode cost of the JSON providers on realistic sync payloads.
+
+Compares Flask's default provider, the fast provider backed by orjson and the
+fast provider's standard-library fallback on a sync response (patients and
+cases with datetime and UUID values) and on the matching upload body.
+
+Usage: ``python -m benchmarks.bench_json [--patients 10 100 1000]``
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import json_provider
+
+from .common import sync_changes
+
+ROUNDS = 50
+
+
+def sync_response(patients: int) -> dict:
+    """Server updates as ``SyncService`` hands them to ``jsonify``."""
+    changes = sync_changes(str(uuid.uuid4()), patients)
+    now = datetime.utcnow()
+    for collection in changes.values():
+        for record in collection:
+            record["id"] = uuid.UUID(record["id"])
+            record["created_at"] = now
+            record["updated_at"] = now
+            record["last_modified_at"] = now
+            record["version"] = 3
+    return {
+        "new_sync_timestamp": now,
+        "server_updates": changes,
+        "results": {"patients": {"inserted": patients, "updated": 0, "stale": []}},
+        "has_more": False,
+        "next_cursor": None,
+    }
+
+
+@contextmanager
+def stdlib_fallback():
+    """Run the fast provider as if orjson were not installed."""
+    orjson = json_provider.orjson
+    json_provider.orjson = None
+    try:
+        yield
+    finally:
+        json_provider.orjson = orjson
+
+
+def providers():
+    app = Flask(__name__)
+    yield "flask", DefaultJSONProvider(app), nullcontext
+    if json_provider.orjson is not None:
+        yield "orjson", json_provider.FastJSONProvider(app), nullcontext
+    yield "fallback", json_provider.FastJSONProvider(app), stdlib_fallback
+
+
+def measure(func, data) -> tuple[float, object]:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func(data)
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    header = f"{'patients':>9} {'provider':>9} {'bytes':>9} {'dumps ms':>9} {'loads ms':>9} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for patients in args.patients:
+        body = sync_response(patients)
+        baseline = None
+        for name, provider, mode in providers():
+            with mode():
+                dumps_ms, encoded = measure(provider.dumps, body)
+                loads_ms, _ = measure(provider.loads, encoded)
+            total = dumps_ms + loads_ms
+            baseline = baseline or total
+            print(
+                f"{patients:>9} {name:>9} {len(encoded):>9} {dumps_ms:>9.2f}"
+                f" {loads_ms:>9.2f} {baseline / total:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
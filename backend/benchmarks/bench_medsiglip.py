@@ -0,0 +1,60 @@
+"""MedSigLip throughput: one image per session run versus batched runs.
+
+Scores the same images with ``predict`` in a loop and with ``predict_batch``
+for each batch size and intra-op thread count. Uses the tiny reference model
+unless ``--model`` points at a real export, so it runs on any CPU.
+
+Usage: ``python -m benchmarks.bench_medsiglip [--batch-sizes 1 8 32] [--threads 1 0]``
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.ai.medsiglip import MedSigLipModel
+from app.ai.reference_model import build_reference_model
+
+ROUNDS = 20
+
+
+def measure(func, data) -> float:
+    func(data)  # warm up allocations and thread pools
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(data)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="ONNX export to benchmark instead of the reference model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 0])
+    parser.add_argument("--size", type=int, default=224, help="image height and width")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = args.model or build_reference_model(Path(workdir) / "reference.onnx")
+        rng = np.random.default_rng(0)
+
+        header = f"{'threads':>8} {'batch':>6} {'looped img/s':>13} {'batched img/s':>14} {'speedup':>8}"
+        print(header)
+        print("-" * len(header))
+        for threads in args.threads:
+            model = MedSigLipModel(model_path, intra_op_threads=threads)
+            for batch_size in args.batch_sizes:
+                images = rng.standard_normal((batch_size, 3, args.size, args.size), np.float32)
+                looped = measure(lambda batch: [model.predict(image) for image in batch], images)
+                batched = measure(model.predict_batch, images)
+                print(
+                    f"{threads or 'auto':>8} {batch_size:>6} {batch_size / looped:>13.1f}"
+                    f" {batch_size / batched:>14.1f} {looped / batched:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
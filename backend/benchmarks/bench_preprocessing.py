@@ -0,0 +1,116 @@
+"""Image preprocessing throughput and peak memory per batch size.
+
+Writes synthetic photo-sized JPEGs to a temporary folder, then preprocesses
+the whole folder with a naive per-image pipeline (full decode, two-step
+resize and crop, float conversion, ``np.stack``) and with
+``Preprocessor.stream`` for each batch size. Each pass runs in a fresh
+process; its memory column is how far the pass raised that process's peak
+resident set size (``ru_maxrss``), so Pillow's decode buffers count as well as
+NumPy arrays.
+
+Usage: ``python -m benchmarks.bench_preprocessing [--images 64] [--batch-sizes 1 8 64]``
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.ai.preprocessing import Preprocessor, iter_image_files
+
+
+def write_images(folder: Path, count: int, width: int, height: int) -> None:
+    rng = np.random.default_rng(0)
+    base = np.linspace(0, 255, width * height * 3).reshape(height, width, 3)
+    for index in range(count):
+        noise = rng.integers(0, 32, size=(height, width, 3))
+        pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+        Image.fromarray(pixels).save(folder / f"{index:04d}.jpg", quality=90)
+
+
+def naive_batches(paths: list[Path], batch_size: int, size: int):
+    mean = std = np.array([0.5, 0.5, 0.5], dtype=np.float32)
+    for start in range(0, len(paths), batch_size):
+        images = []
+        for path in paths[start:start + batch_size]:
+            image = Image.open(path).convert("RGB")
+            width, height = image.size
+            scale = size / min(width, height)
+            image = image.resize((round(width * scale), round(height * scale)), Image.BILINEAR)
+            left, top = (image.width - size) // 2, (image.height - size) // 2
+            image = image.crop((left, top, left + size, top + size))
+            pixels = np.asarray(image).astype(np.float32) / 255.0
+            images.append(((pixels - mean) / std).transpose(2, 0, 1))
+        yield np.ascontiguousarray(np.stack(images))
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run_pass(pipeline: str, paths: list[Path], batch_size: int, size: int) -> tuple[float, float]:
+    """Seconds and peak RSS growth in MiB to build and consume every batch once."""
+    if pipeline == "naive":
+        batches = naive_batches(paths, batch_size, size)
+    else:
+        batches = Preprocessor(size=size, max_batch_size=batch_size).stream(paths, batch_size)
+    before = peak_rss_mib()
+    start = time.perf_counter()
+    for _ in batches:
+        pass
+    elapsed = time.perf_counter() - start
+    return elapsed, peak_rss_mib() - before
+
+
+def in_new_process(function, *args):
+    """``function(*args)`` in a fresh interpreter.
+
+    Linux carries ``ru_maxrss`` over from the parent, so the parent itself must
+    stay small: even writing the images happens in a child.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(function, *args).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32, 64])
+    parser.add_argument("--size", type=int, default=224, help="output height and width")
+    parser.add_argument("--source", default="1280x960", help="synthetic image WIDTHxHEIGHT")
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.source.split("x"))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = Path(workdir)
+        in_new_process(write_images, folder, args.images, width, height)
+        paths = list(iter_image_files(folder))
+
+        header = (
+            f"{'batch':>6} {'naive img/s':>12} {'naive RSS MiB':>14}"
+            f" {'pipeline img/s':>15} {'pipeline RSS MiB':>17} {'speedup':>8}"
+        )
+        print(header)
+        print("-" * len(header))
+        for batch_size in args.batch_sizes:
+            naive, naive_peak = in_new_process(run_pass, "naive", paths, batch_size, args.size)
+            fast, fast_peak = in_new_process(run_pass, "pipeline", paths, batch_size, args.size)
+            print(
+                f"{batch_size:>6} {len(paths) / naive:>12.1f} {naive_peak:>14.1f}"
+                f" {len(paths) / fast:>15.1f} {fast_peak:>17.1f} {naive / fast:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
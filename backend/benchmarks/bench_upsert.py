@@ -0,0 +1,98 @@
+"""Compare the per-row and set-based sync upsert paths as the batch grows.
+
+Usage: ``python -m benchmarks.bench_upsert [--sizes 100 1000 5000]``
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import timedelta
+
+from app import db
+from app.services.repository import get_repository, to_naive_utc
+from app.services.sync_service import SyncService
+
+from .common import count_statements, create_chw, make_app, sync_changes, timer
+
+
+def legacy_upsert(model, payloads):
+    """The original one-``session.get``-per-record implementation."""
+    for data in payloads:
+        record = db.session.get(model, data["id"])
+        if record:
+            incoming_modified = data.get("last_modified_at")
+            if incoming_modified and incoming_modified <= record.last_modified_at:
+                continue
+            for key, value in data.items():
+                if hasattr(record, key) and key not in {"created_at", "id"}:
+                    setattr(record, key, value)
+        else:
+            db.session.add(model(**data))
+
+
+def bulk_upsert(model, payloads):
+    get_repository(model.__tablename__).upsert_records(payloads)
+
+
+def normalized_batches(service, changes, chw_id, shift=timedelta()):
+    batches = {}
+    for collection, payloads in changes.items():
+        rows = []
+        for payload in payloads:
+            row = service._normalize_payload(payload, chw_id, collection)
+            row["last_modified_at"] = to_naive_utc(row["last_modified_at"]) + shift
+            rows.append(row)
+        batches[collection] = rows
+    return batches
+
+
+def run_round(upsert, service, batches):
+    with count_statements(db.engine) as counter, timer() as elapsed:
+        for collection, rows in batches.items():
+            upsert(service.repositories[collection].model, rows)
+        db.session.commit()
+    db.session.expunge_all()
+    return elapsed["seconds"], counter["statements"]
+
+
+def bench(size: int, upsert) -> dict:
+    app = make_app()
+    with app.app_context():
+        service = SyncService()
+        chw_id = create_chw()
+        changes = sync_changes(chw_id, size)
+        insert_time, insert_sql = run_round(
+            upsert, service, normalized_batches(service, changes, chw_id)
+        )
+        update_time, update_sql = run_round(
+            upsert,
+            service,
+            normalized_batches(service, changes, chw_id, timedelta(minutes=5)),
+        )
+        db.drop_all()
+    return {
+        "insert_ms": insert_time * 1000,
+        "insert_sql": insert_sql,
+        "update_ms": update_time * 1000,
+        "update_sql": update_sql,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 5000])
+    args = parser.parse_args()
+
+    header = f"{'patients':>9} {'path':>7} {'insert ms':>10} {'insert sql':>11} {'update ms':>10} {'update sql':>11}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        for label, upsert in (("before", legacy_upsert), ("after", bulk_upsert)):
+            result = bench(size, upsert)
+            print(
+                f"{size:>9} {label:>7} {result['insert_ms']:>10.1f} {result['insert_sql']:>11}"
+                f" {result['update_ms']:>10.1f} {result['update_sql']:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
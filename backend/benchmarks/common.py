@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+def make_app(config_class: type[Config] = BenchConfig):
+    app = create_app(config_class)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def create_chw(name: str = "Bench Worker") -> str:
+    chw = CHWUser(
+        email=f"{uuid.uuid4().hex}@bench.local", password_hash="hash", name=name
+    )
+    db.session.add(chw)
+    db.session.commit()
+    return chw.id
+
+
+def patient_payload(chw_id: str, modified: datetime, index: int = 0) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "chw_id": chw_id,
+        "demographics": {
+            "name": f"Patient {index}",
+            "age": 20 + index % 60,
+            "gender": "female" if index % 2 else "male",
+            "village": f"Village {index % 17}",
+            "phone": f"+220 7{index:06d}",
+        },
+        "sync_status": "new",
+        "last_modified_at": modified.isoformat(),
+    }
+
+
+def case_payload(chw_id: str, patient_id: str, modified: datetime, index: int = 0) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": patient_id,
+        "chw_id": chw_id,
+        "triage_data": {
+            "symptoms": ["itching", "redness", "scaling"][: 1 + index % 3],
+            "duration_days": index % 30,
+            "body_location": "forearm",
+            "lesion_size_mm": 3 + index % 12,
+            "notes": "Lesion noted during routine outreach visit.",
+        },
+        "status": "TRIAGED",
+        "risk_level": "high" if index % 5 == 0 else "low",
+        "image_urls": [f"cases/{index}/front.jpg", f"cases/{index}/close.jpg"],
+        "sync_status": "new",
+        "last_modified_at": modified.isoformat(),
+    }
+
+
+def sync_changes(chw_id: str, patients: int, cases_per_patient: int = 1) -> dict:
+    """Build a realistic ``changes`` payload for one CHW coming back online."""
+    modified = datetime.utcnow() - timedelta(hours=1)
+    patient_rows = [patient_payload(chw_id, modified, i) for i in range(patients)]
+    case_rows = [
+        case_payload(chw_id, patient["id"], modified, i * cases_per_patient + j)
+        for i, patient in enumerate(patient_rows)
+        for j in range(cases_per_patient)
+    ]
+    return {"patients": patient_rows, "cases": case_rows}
+
+
+@contextmanager
+def count_statements(engine):
+    """Count SQL statements issued on ``engine`` by the current thread."""
+    counter = {"statements": 0}
+    thread_id = threading.get_ident()
+
+    def before_cursor_execute(*_args, **_kwargs):
+        if threading.get_ident() == thread_id:
+            counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def timer():
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def payload_bytes(payload) -> int:
+    return len(json.dumps(payload, default=str).encode("utf-8"))
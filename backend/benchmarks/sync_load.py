@@ -0,0 +1,333 @@
+"""Synthetic load against ``/api/sync`` with many CHWs syncing concurrently.
+
+Seeds ``--chws`` community health workers with ``--patients`` patients each,
+``--cases-per-patient`` cases per patient and diagnoses for a fraction of those
+cases, using the bulk repository path. Every CHW then runs ``--rounds`` sync
+rounds: it uploads ``--changes`` edited patients plus ``--new`` new ones and
+pages through the download until ``has_more`` is false. Rounds of different
+CHWs run on ``--concurrency`` threads.
+
+By default requests go through the Flask test client against a temporary
+SQLite file, which also lets the harness count SQL statements per request.
+``--database-url`` points seeding (and the in-process app) at another
+database such as a local Postgres; ``--base-url`` sends the requests to a
+running server instead, which must share that database and ``JWT_SECRET_KEY``.
+
+Usage: ``python -m benchmarks.sync_load [--chws 20] [--patients 200] [--concurrency 8]``
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.models import DoctorUser
+from app.services.repository import get_repository
+from app.services.sync_service import SyncService
+
+from .common import create_chw, patient_payload, sync_changes, timer
+
+
+def load_config(database_url: str) -> type[Config]:
+    engine_options = {}
+    if database_url.startswith("sqlite"):
+        # Concurrent writers queue on SQLite's file lock instead of failing fast.
+        engine_options = {"connect_args": {"timeout": 30, "check_same_thread": False}}
+
+    class LoadConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options
+
+    return LoadConfig
+
+
+class StatementCounter:
+    """Per-thread count of SQL statements issued on an engine."""
+
+    def __init__(self, engine) -> None:
+        self.counts: dict[int, int] = defaultdict(int)
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *_args, **_kwargs) -> None:
+        self.counts[threading.get_ident()] += 1
+
+    def current(self) -> int:
+        return self.counts[threading.get_ident()]
+
+
+def seed(app, chws: int, patients: int, cases_per_patient: int, diagnosis_ratio: float) -> list[dict]:
+    """Bulk-load the synthetic caseloads and return one client state per CHW."""
+    service = SyncService()
+    rng = random.Random(0)
+    clients = []
+    with app.app_context():
+        db.create_all()
+        doctor = DoctorUser(
+            email=f"{uuid.uuid4().hex}@bench.local", password_hash="hash", name="Bench Doctor"
+        )
+        db.session.add(doctor)
+        db.session.commit()
+        for index in range(chws):
+            chw_id = create_chw(f"Load Worker {index}")
+            changes = sync_changes(chw_id, patients, cases_per_patient)
+            for case in changes["cases"]:
+                case["risk_level"] = "low"
+            modified = datetime.utcnow() - timedelta(days=1)
+            changes["diagnoses"] = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "case_id": case["id"],
+                    "doctor_id": doctor.id,
+                    "diagnosis_text": "Tinea corporis",
+                    "prescription": {"drug": "clotrimazole", "duration_days": 14},
+                    "sync_status": "synced",
+                    "last_modified_at": modified.isoformat(),
+                }
+                for case in changes["cases"]
+                if rng.random() < diagnosis_ratio
+            ]
+            for collection, payloads in changes.items():
+                rows = [service._normalize_payload(p, chw_id, collection) for p in payloads]
+                get_repository(collection).upsert_records(rows)
+            db.session.commit()
+            clients.append(
+                {
+                    "chw_id": chw_id,
+                    "token": create_access_token(identity=chw_id),
+                    "patients": [p["id"] for p in changes["patients"]],
+                    "seq": None,
+                    "timestamp": None,
+                }
+            )
+    return clients
+
+
+class TestClientDriver:
+    def __init__(self, app, counter: StatementCounter | None) -> None:
+        self.app = app
+        self.counter = counter
+
+    def post(self, payload: dict, token: str) -> tuple[int, dict, int | None]:
+        before = self.counter.current() if self.counter else 0
+        response = self.app.test_client().post(
+            "/api/sync", json=payload, headers={"Authorization": f"Bearer {token}"}
+        )
+        statements = self.counter.current() - before if self.counter else None
+        return response.status_code, response.get_json(silent=True) or {}, statements
+
+
+class HttpDriver:
+    def __init__(self, base_url: str) -> None:
+        import requests
+
+        self.url = base_url.rstrip("/") + "/api/sync"
+        self.local = threading.local()
+        self.requests = requests
+
+    def post(self, payload: dict, token: str) -> tuple[int, dict, int | None]:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+        response = session.post(
+            self.url,
+            data=json.dumps(payload, default=str),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body, None
+
+
+def round_changes(client: dict, edits: int, new: int, rng: random.Random) -> dict:
+    now = datetime.utcnow()
+    edited = []
+    for patient_id in rng.sample(client["patients"], min(edits, len(client["patients"]))):
+        edited.append(
+            {
+                "id": patient_id,
+                "demographics": {"name": f"Edited {rng.randrange(10**6)}"},
+                "last_modified_at": now.isoformat(),
+            }
+        )
+    created = [patient_payload(client["chw_id"], now, i) for i in range(new)]
+    client["patients"].extend(p["id"] for p in created)
+    return {"patients": edited + created}
+
+
+def sync_round(driver, client: dict, args, rng: random.Random) -> list[dict]:
+    """One CHW coming online: upload local edits, then page through the download."""
+    samples = []
+    changes = round_changes(client, args.changes, args.new, rng)
+    cursor = None
+    while True:
+        if args.mode == "feed":
+            payload = {"last_sync_seq": client["seq"] or 0, "changes": changes}
+        else:
+            payload = {"last_sync_timestamp": client["timestamp"], "changes": changes}
+            if cursor:
+                payload["cursor"] = cursor
+        if args.page_size:
+            payload["page_size"] = args.page_size
+
+        with timer() as elapsed:
+            status, body, statements = driver.post(payload, client["token"])
+        records = sum(len(rows) for rows in body.get("server_updates", {}).values())
+        samples.append(
+            {
+                "seconds": elapsed["seconds"],
+                "status": status,
+                "statements": statements,
+                "uploaded": sum(len(rows) for rows in changes.values()),
+                "downloaded": records,
+            }
+        )
+        if status != 200:
+            return samples
+
+        changes = {}
+        client["seq"] = body.get("new_sync_seq", client["seq"])
+        cursor = body.get("next_cursor")
+        if not body.get("has_more"):
+            client["timestamp"] = body.get("new_sync_timestamp")
+            return samples
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: list[dict], wall_seconds: float) -> dict:
+    latencies = [s["seconds"] * 1000 for s in samples]
+    statements = [s["statements"] for s in samples if s["statements"] is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s["status"] != 200),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies, default=0.0),
+        "requests_per_s": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "records_up_per_s": sum(s["uploaded"] for s in samples) / wall_seconds if wall_seconds else 0.0,
+        "records_down_per_s": sum(s["downloaded"] for s in samples) / wall_seconds if wall_seconds else 0.0,
+        "sql_per_request": sum(statements) / len(statements) if statements else None,
+        "sql_max": max(statements, default=None),
+    }
+
+
+def run(args) -> dict:
+    workdir = None
+    database_url = args.database_url
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix="dermadetect-load-")
+        database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+
+    app = create_app(load_config(database_url))
+    with timer() as seeding:
+        clients = seed(app, args.chws, args.patients, args.cases_per_patient, args.diagnosis_ratio)
+
+    if args.base_url:
+        driver = HttpDriver(args.base_url)
+    else:
+        with app.app_context():
+            counter = StatementCounter(db.engine)
+        driver = TestClientDriver(app, counter)
+
+    samples: list[dict] = []
+    rounds: list[dict] = []
+    wall = 0.0
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for round_index in range(args.rounds):
+            rngs = [random.Random(round_index * args.chws + i) for i in range(len(clients))]
+            with timer() as elapsed:
+                batches = list(
+                    pool.map(lambda pair: sync_round(driver, pair[0], args, pair[1]), zip(clients, rngs))
+                )
+            round_samples = [sample for batch in batches for sample in batch]
+            samples.extend(round_samples)
+            wall += elapsed["seconds"]
+            rounds.append(summarize(round_samples, elapsed["seconds"]))
+
+    with app.app_context():
+        if args.database_url is None:
+            db.drop_all()
+        db.engine.dispose()
+    if workdir:
+        os.remove(os.path.join(workdir, "load.db"))
+        os.rmdir(workdir)
+
+    return {
+        "database": database_url.split("://", 1)[0],
+        "seed_seconds": seeding["seconds"],
+        "rounds": rounds,
+        "total": summarize(samples, wall),
+    }
+
+
+def print_report(args, report: dict) -> None:
+    print(
+        f"{args.chws} CHWs x {args.patients} patients x {args.cases_per_patient} cases,"
+        f" {args.changes} edits + {args.new} new per round, mode={args.mode},"
+        f" concurrency={args.concurrency}, db={report['database']}"
+        f" (seeded in {report['seed_seconds']:.1f}s)"
+    )
+    header = (
+        f"{'round':>6} {'reqs':>6} {'errs':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'req/s':>8} {'down/s':>9} {'sql/req':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    rows = [(str(i + 1), r) for i, r in enumerate(report["rounds"])] + [("all", report["total"])]
+    for label, r in rows:
+        sql = f"{r['sql_per_request']:.1f}" if r["sql_per_request"] is not None else "n/a"
+        print(
+            f"{label:>6} {r['requests']:>6} {r['errors']:>5} {r['p50_ms']:>8.1f}"
+            f" {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['requests_per_s']:>8.1f}"
+            f" {r['records_down_per_s']:>9.0f} {sql:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chws", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=200, help="patients per CHW")
+    parser.add_argument("--cases-per-patient", type=int, default=1)
+    parser.add_argument("--diagnosis-ratio", type=float, default=0.3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--changes", type=int, default=20, help="edited patients per round")
+    parser.add_argument("--new", type=int, default=5, help="new patients per round")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument("--mode", choices=("feed", "timestamp"), default="feed")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--base-url", default=None, help="drive a running server over HTTP")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(args, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Sync positions, row versions, change feed and chunked upload sessions
+
+Revision ID: 2a7d4c9e1f05
+Revises:
+Create Date: 2026-10-17 08:00:00.000000
+
+Brings a database created with ``manage.py create-db`` before the sync rework
+up to the schema the later revisions build on: keyset indexes for paged
+server updates, a ``version`` column on every syncable row, the
+``change_log`` feed and the ``sync_sessions`` / ``sync_session_chunks``
+tables. Existing rows are written to the feed once, oldest change first, so
+clients that start reading it from ``last_sync_seq = 0`` still receive them.
+Objects that already exist are left alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7d4c9e1f05'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('patients', 'cases', 'diagnoses', 'vitals')
+SYNC_INDEXES = [
+    ('ix_patients_chw_sync_position', 'patients', ['chw_id', 'last_modified_at', 'id']),
+    ('ix_cases_chw_sync_position', 'cases', ['chw_id', 'last_modified_at', 'id']),
+    ('ix_diagnoses_sync_position', 'diagnoses', ['last_modified_at', 'id']),
+    ('ix_diagnoses_case_id', 'diagnoses', ['case_id']),
+    ('ix_vitals_chw_sync_position', 'vitals', ['chw_id', 'last_modified_at', 'id']),
+]
+
+
+def _backfill_change_log():
+    for table in ('patients', 'cases', 'vitals'):
+        op.execute(
+            "INSERT INTO change_log (record_id, chw_id, collection, fields, created_at)"
+            f" SELECT id, chw_id, '{table}', NULL, last_modified_at FROM {table}"
+            " ORDER BY last_modified_at, id"
+        )
+    op.execute(
+        "INSERT INTO change_log (record_id, chw_id, collection, fields, created_at)"
+        " SELECT diagnoses.id, cases.chw_id, 'diagnoses', NULL, diagnoses.last_modified_at"
+        " FROM diagnoses JOIN cases ON cases.id = diagnoses.case_id"
+        " ORDER BY diagnoses.last_modified_at, diagnoses.id"
+    )
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table in SYNC_TABLES:
+        if 'version' not in {column['name'] for column in inspector.get_columns(table)}:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(
+                    sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+                )
+
+    existing = {
+        (table, index['name'])
+        for table in SYNC_TABLES
+        for index in inspector.get_indexes(table)
+    }
+    for name, table, columns in SYNC_INDEXES:
+        if (table, name) not in existing:
+            op.create_index(name, table, columns)
+
+    if 'change_log' not in tables:
+        op.create_table(
+            'change_log',
+            sa.Column(
+                'seq',
+                sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                primary_key=True,
+                autoincrement=True,
+            ),
+            sa.Column('collection', sa.String(length=32), nullable=False),
+            sa.Column('record_id', sa.String(length=36), nullable=False),
+            sa.Column('chw_id', sa.String(length=36), nullable=False),
+            sa.Column('fields', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sqlite_autoincrement=True,
+        )
+        op.create_index('ix_change_log_chw_seq', 'change_log', ['chw_id', 'seq'])
+        _backfill_change_log()
+
+    if 'sync_sessions' not in tables:
+        op.create_table(
+            'sync_sessions',
+            sa.Column('chw_id', sa.String(length=36), nullable=False),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('total_chunks', sa.Integer(), nullable=True),
+            sa.Column('finalized_at', sa.DateTime(), nullable=True),
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['chw_id'], ['chw_users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_sync_sessions_chw_id', 'sync_sessions', ['chw_id'])
+
+    if 'sync_session_chunks' not in tables:
+        op.create_table(
+            'sync_session_chunks',
+            sa.Column('session_id', sa.String(length=36), nullable=False),
+            sa.Column('chunk_index', sa.Integer(), nullable=False),
+            sa.Column('checksum', sa.String(length=64), nullable=False),
+            sa.Column('results', sa.Text(), nullable=False),
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['session_id'], ['sync_sessions.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('session_id', 'chunk_index'),
+        )
+
+
+def downgrade():
+    op.drop_table('sync_session_chunks')
+    op.drop_index('ix_sync_sessions_chw_id', table_name='sync_sessions')
+    op.drop_table('sync_sessions')
+    op.drop_index('ix_change_log_chw_seq', table_name='change_log')
+    op.drop_table('change_log')
+    for name, table, _ in SYNC_INDEXES:
+        op.drop_index(name, table_name=table)
+    for table in SYNC_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
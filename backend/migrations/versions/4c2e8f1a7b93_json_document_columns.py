@@ -0,0 +1,79 @@
+"""Store demographics, triage_data, ai_analysis and prescription as JSON
+
+Revision ID: 4c2e8f1a7b93
+Revises: 2a7d4c9e1f05
+Create Date: 2026-10-17 09:00:00.000000
+
+Databases created with ``manage.py create-db`` kept these documents as
+JSON-encoded text. Values that are not valid JSON (plain strings written by
+early clients) are first re-encoded as JSON strings so every row converts;
+PostgreSQL columns then become JSONB. SQLite stores JSON as text, so only the
+data rewrite applies there.
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2e8f1a7b93'
+down_revision = '2a7d4c9e1f05'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = [
+    ("patients", "demographics"),
+    ("cases", "triage_data"),
+    ("cases", "ai_analysis"),
+    ("diagnoses", "prescription"),
+]
+BATCH_SIZE = 1000
+
+
+def _encode_plain_text(bind, table_name, column_name):
+    table = sa.table(table_name, sa.column("id", sa.String), sa.column(column_name, sa.Text))
+    column = table.c[column_name]
+    rows = bind.execute(
+        sa.select(table.c.id, column).where(column.isnot(None))
+    ).all()
+    fixes = []
+    for record_id, value in rows:
+        try:
+            json.loads(value)
+        except ValueError:
+            fixes.append({"record_id": record_id, "value": json.dumps(value)})
+    for start in range(0, len(fixes), BATCH_SIZE):
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam("record_id"))
+            .values({column_name: sa.bindparam("value")}),
+            fixes[start:start + BATCH_SIZE],
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table_name, column_name in JSON_COLUMNS:
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE TEXT"
+                f" USING {column_name}::text"
+            )
+        _encode_plain_text(bind, table_name, column_name)
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE JSONB"
+                f" USING {column_name}::jsonb"
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    for table_name, column_name in JSON_COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE TEXT"
+            f" USING {column_name}::text"
+        )
@@ -0,0 +1,30 @@
+"""Principal version on users for token revocation
+
+Revision ID: 5f0c7d2e9a36
+Revises: e3a9b5d2f814
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c7d2e9a36'
+down_revision = 'e3a9b5d2f814'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('chw_users', 'doctor_users'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(
+                sa.Column('principal_version', sa.Integer(), nullable=False, server_default='1')
+            )
+
+
+def downgrade():
+    for table in ('chw_users', 'doctor_users'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('principal_version')
@@ -0,0 +1,39 @@
+"""Indexes for keyset-paginated list endpoints
+
+Revision ID: 9d5a3e71c0b8
+Revises: 4c2e8f1a7b93
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d5a3e71c0b8'
+down_revision = '4c2e8f1a7b93'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_patients_chw_list_position", "patients", ["chw_id", "created_at", "id"]),
+    ("ix_cases_chw_list_position", "cases", ["chw_id", "created_at", "id"]),
+    ("ix_cases_pending_list_position", "cases", ["risk_level", "status", "created_at", "id"]),
+    ("ix_vitals_patient_list_position", "vitals", ["patient_id", "created_at", "id"]),
+]
+
+
+def upgrade():
+    existing = {
+        (table, index["name"])
+        for table in {table for _, table, _ in INDEXES}
+        for index in sa.inspect(op.get_bind()).get_indexes(table)
+    }
+    for name, table, columns in INDEXES:
+        if (table, name) not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
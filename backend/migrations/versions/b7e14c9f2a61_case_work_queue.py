@@ -0,0 +1,38 @@
+"""Lease columns and queue index for claimable cases
+
+Revision ID: b7e14c9f2a61
+Revises: 9d5a3e71c0b8
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e14c9f2a61'
+down_revision = '9d5a3e71c0b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cases') as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_by', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('claim_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_cases_claimed_by_doctor_users', 'doctor_users', ['claimed_by'], ['id']
+        )
+        batch_op.create_index(
+            'ix_cases_work_queue', ['risk_level', 'status', 'priority', 'created_at']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('cases') as batch_op:
+        batch_op.drop_index('ix_cases_work_queue')
+        batch_op.drop_constraint('fk_cases_claimed_by_doctor_users', type_='foreignkey')
+        batch_op.drop_column('claim_expires_at')
+        batch_op.drop_column('claimed_by')
+        batch_op.drop_column('priority')
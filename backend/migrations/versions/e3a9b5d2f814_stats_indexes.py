@@ -0,0 +1,26 @@
+"""Index diagnoses by doctor for dashboard counters
+
+Revision ID: e3a9b5d2f814
+Revises: b7e14c9f2a61
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9b5d2f814'
+down_revision = 'b7e14c9f2a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes('diagnoses')}
+    if 'ix_diagnoses_doctor_created' not in existing:
+        op.create_index('ix_diagnoses_doctor_created', 'diagnoses', ['doctor_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_diagnoses_doctor_created', table_name='diagnoses')
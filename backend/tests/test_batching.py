@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import metrics
+from app.ai import batching
+from app.ai.batching import MicroBatcher
+from app.ai.medsiglip import MedSigLipResult
+from app.ai.registry import registry
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.registry.reset()
+    yield
+    registry.clear()
+
+
+class RecordingModel:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.batch_sizes = []
+        self.delay = delay
+
+    def predict_batch(self, images):
+        self.batch_sizes.append(len(images))
+        time.sleep(self.delay)
+        return [float(image.sum()) for image in images]
+
+
+def test_concurrent_submissions_are_batched():
+    model = RecordingModel(delay=0.01)
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=4, max_wait_ms=50, name="test")
+    results = {}
+
+    def submit(index):
+        results[index] = batcher.predict(np.full((1, 2, 2), index, dtype=np.float32), timeout=5)
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close(timeout=5)
+
+    assert results == {index: index * 4.0 for index in range(12)}
+    assert sum(model.batch_sizes) == 12
+    assert max(model.batch_sizes) <= 4
+    assert len(model.batch_sizes) < 12
+    histogram = metrics.registry.histogram("test.batch_size")
+    assert histogram["count"] == len(model.batch_sizes)
+    assert histogram["sum"] == 12
+    assert metrics.registry.histogram("test.queue_delay_ms")["count"] == 12
+
+
+def test_lone_request_waits_at_most_max_wait():
+    model = RecordingModel()
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=8, max_wait_ms=20, name="test")
+
+    started = time.perf_counter()
+    assert batcher.predict(np.ones((1, 2, 2)), timeout=5) == 4.0
+    elapsed = time.perf_counter() - started
+    batcher.close(timeout=5)
+
+    assert model.batch_sizes == [1]
+    assert 0.015 <= elapsed < 1.0
+
+
+def test_failures_reach_every_future_in_the_batch():
+    def explode(_images):
+        raise RuntimeError("inference failed")
+
+    batcher = MicroBatcher(explode, max_batch_size=4, max_wait_ms=20, name="test")
+    futures = [batcher.submit(np.zeros((1, 2, 2))) for _ in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="inference failed"):
+            future.result(timeout=5)
+    batcher.close(timeout=5)
+
+
+def test_mixed_shapes_run_as_separate_batches():
+    model = RecordingModel()
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=8, max_wait_ms=50, name="test")
+    small = [batcher.submit(np.ones((1, 2, 2))) for _ in range(2)]
+    large = batcher.submit(np.ones((1, 3, 3)))
+
+    assert [future.result(timeout=5) for future in small] == [4.0, 4.0]
+    assert large.result(timeout=5) == 9.0
+    batcher.close(timeout=5)
+    assert sorted(model.batch_sizes) == [1, 2]
+
+
+def test_submit_validates_input_and_closed_state():
+    batcher = MicroBatcher(RecordingModel().predict_batch, name="test")
+    with pytest.raises(ValueError):
+        batcher.submit(np.zeros((1, 1, 2, 2)))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.zeros((1, 2, 2)))
+
+
+def test_process_batcher_scores_with_the_registry_model(tmp_path, monkeypatch):
+    pytest.importorskip("onnxruntime")
+    from app.ai.reference_model import build_reference_model
+    from app.ai.registry import configure_models
+
+    path = build_reference_model(tmp_path / "medsiglip.onnx")
+    configure_models({"MEDSIGLIP_MODEL_PATH": str(path), "MEDSIGLIP_IMAGE_SIZE": 8})
+    monkeypatch.setattr(batching, "_batchers", {})
+    batcher = batching.get_batcher({"MEDSIGLIP_MAX_BATCH_SIZE": 4, "MEDSIGLIP_MAX_WAIT_MS": 10})
+
+    assert batching.get_batcher({}) is batcher
+    result = batcher.predict(np.zeros((3, 8, 8)), timeout=5)
+    batcher.close(timeout=5)
+    assert result == MedSigLipResult(risk_score=0.5, risk_level="medium")
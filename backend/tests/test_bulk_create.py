@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.config import Config
+from app.models import ChangeLog, CHWUser, Case, MedGemmaQueue, Patient, Vitals
+from app.services import bulk_create
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+    BATCH_MAX_ITEMS = 5
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        other = CHWUser(email="other@example.com", password_hash="hash", name="Other Worker")
+        db.session.add_all([chw, other])
+        db.session.commit()
+        db.session.add_all(
+            [
+                Patient(id="patient-1", chw_id=chw.id, demographics={"name": "Mine"}),
+                Patient(id="patient-2", chw_id=other.id, demographics={"name": "Theirs"}),
+            ]
+        )
+        db.session.commit()
+        app.config["TEST_CHW_ID"] = chw.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def auth_header(app):
+    with app.app_context():
+        token = create_access_token(identity=app.config["TEST_CHW_ID"])
+        return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture()
+def dispatched(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bulk_create, "dispatch_medgemma_analyses", calls.append)
+    return calls
+
+
+def test_bulk_patients_are_created_in_one_request(client, auth_header, app):
+    payload = [
+        {"id": "patient-a", "demographics": {"name": "A"}},
+        {"demographics": '{"name": "B"}'},
+    ]
+    response = client.post("/api/patients/batch", json=payload, headers=auth_header)
+
+    assert response.status_code == 201
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [201, 201]
+    assert results[0]["id"] == "patient-a"
+    with app.app_context():
+        created = db.session.get(Patient, results[1]["id"])
+        assert created.demographics == {"name": "B"}
+        assert created.chw_id == app.config["TEST_CHW_ID"]
+        logged = db.session.execute(
+            select(ChangeLog.record_id).where(ChangeLog.collection == "patients")
+        ).scalars()
+        assert {"patient-a", results[1]["id"]} <= set(logged)
+
+
+def test_bulk_vitals_report_per_item_failures(client, auth_header, app):
+    payload = [
+        {"patient_id": "patient-1", "temperature": "37C", "blood_pressure": "120/80", "weight": "70kg"},
+        {"patient_id": "patient-1", "temperature": "37C"},
+        {"patient_id": "patient-2", "temperature": "37C", "blood_pressure": "120/80", "weight": "70kg"},
+        {"patient_id": "missing", "temperature": "37C", "blood_pressure": "120/80", "weight": "70kg"},
+    ]
+    response = client.post("/api/vitals/batch", json=payload, headers=auth_header)
+
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [201, 400, 404, 404]
+    assert "blood_pressure" in results[1]["details"]
+    with app.app_context():
+        assert db.session.execute(select(func.count()).select_from(Vitals)).scalar_one() == 1
+
+
+def test_bulk_cases_queue_high_risk_cases_as_one_group(client, auth_header, app, dispatched):
+    payload = [
+        {"id": "case-high", "patient_id": "patient-1", "risk_level": "high", "image_urls": ["a.jpg"]},
+        {"id": "case-low", "patient_id": "patient-1", "triage_data": {"itch": True}},
+        {"id": "case-high-2", "patient_id": "patient-1", "risk_level": "high"},
+    ]
+    response = client.post("/api/cases/batch", json=payload, headers=auth_header)
+
+    assert response.status_code == 201
+    assert dispatched == [["case-high", "case-high-2"]]
+    with app.app_context():
+        assert db.session.get(Case, "case-high").status == "REQUIRES_MEDGEMMA"
+        assert db.session.get(Case, "case-high").image_urls == '["a.jpg"]'
+        assert db.session.get(Case, "case-low").status == "TRIAGED"
+        queued = db.session.execute(select(MedGemmaQueue.case_id)).scalars().all()
+        assert sorted(queued) == ["case-high", "case-high-2"]
+
+
+def test_bulk_create_rejects_existing_and_repeated_ids(client, auth_header, dispatched):
+    payload = [
+        {"id": "patient-1", "demographics": {}},
+        {"id": "patient-new", "demographics": {}},
+        {"id": "patient-new", "demographics": {}},
+    ]
+    response = client.post("/api/patients/batch", json=payload, headers=auth_header)
+
+    assert response.status_code == 207
+    assert [result["status"] for result in response.get_json()["results"]] == [409, 201, 409]
+
+
+def test_bulk_create_validates_the_envelope(client, auth_header):
+    response = client.post("/api/patients/batch", json={"demographics": {}}, headers=auth_header)
+    assert response.status_code == 400
+
+    too_many = [{"demographics": {}}] * 6
+    response = client.post("/api/patients/batch", json=too_many, headers=auth_header)
+    assert response.status_code == 413
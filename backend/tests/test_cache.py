@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import time
+
+from app.cache import MemoryCache
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_cache_add_only_sets_absent_or_expired_keys():
+    cache = MemoryCache(maxsize=10)
+    assert cache.add("a", 1, ttl=0.01) is True
+    assert cache.add("a", 2) is False
+    assert cache.get("a") == 1
+
+    time.sleep(0.02)
+    assert cache.add("a", 3) is True
+    assert cache.get("a") == 3
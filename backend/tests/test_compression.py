@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Patient
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+    COMPRESSION_MIN_SIZE = 256
+    MAX_DECOMPRESSED_BODY = 64 * 1024
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        db.session.add(chw)
+        db.session.commit()
+        for index in range(20):
+            db.session.add(
+                Patient(
+                    chw_id=chw.id,
+                    demographics=json.dumps({"name": f"Patient {index}", "village": "Brikama"}),
+                )
+            )
+        db.session.commit()
+        app.config["TEST_CHW_ID"] = chw.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def auth_header(app):
+    with app.app_context():
+        token = create_access_token(identity=app.config["TEST_CHW_ID"])
+        return {"Authorization": f"Bearer {token}"}
+
+
+def test_list_response_is_gzipped_when_accepted(client, auth_header):
+    plain = client.get("/api/patients", headers=auth_header)
+    compressed = client.get(
+        "/api/patients", headers={**auth_header, "Accept-Encoding": "gzip"}
+    )
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+
+def test_zstd_preferred_when_available(client, auth_header):
+    zstandard = pytest.importorskip("zstandard")
+    response = client.get(
+        "/api/patients", headers={**auth_header, "Accept-Encoding": "gzip, zstd"}
+    )
+    assert response.headers["Content-Encoding"] == "zstd"
+    body = zstandard.ZstdDecompressor().decompress(response.data)
+    assert len(json.loads(body)) == 20
+
+
+def test_small_responses_are_not_compressed(client, auth_header, app):
+    app.config["COMPRESSION_MIN_SIZE"] = 1024 * 1024
+    response = client.get(
+        "/api/patients", headers={**auth_header, "Accept-Encoding": "gzip"}
+    )
+    assert "Content-Encoding" not in response.headers
+
+
+def test_gzipped_sync_request_is_accepted(client, auth_header):
+    payload = {"last_sync_timestamp": None, "changes": {"patients": []}}
+    response = client.post(
+        "/api/sync",
+        data=gzip.compress(json.dumps(payload).encode()),
+        headers={
+            **auth_header,
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        },
+    )
+    assert response.status_code == 200
+    assert "server_updates" in response.get_json()
+
+
+def test_finalized_sync_session_is_gzipped_when_accepted(client, auth_header):
+    session_id = client.post("/api/sync/sessions", headers=auth_header).get_json()["session_id"]
+    response = client.post(
+        f"/api/sync/sessions/{session_id}/finalize",
+        json={"total_chunks": 0, "last_sync_timestamp": None},
+        headers={**auth_header, "Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = json.loads(gzip.decompress(response.data))
+    assert len(body["server_updates"]["patients"]) == 20
+
+
+def test_oversized_decompressed_body_is_rejected(client, auth_header):
+    payload = {"changes": {"padding": "x" * (128 * 1024)}}
+    response = client.post(
+        "/api/sync",
+        data=gzip.compress(json.dumps(payload).encode()),
+        headers={
+            **auth_header,
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        },
+    )
+    assert response.status_code == 413
+
+
+def test_unknown_content_encoding_is_rejected(client, auth_header):
+    response = client.post(
+        "/api/sync",
+        data=b"{}",
+        headers={**auth_header, "Content-Type": "application/json", "Content-Encoding": "br"},
+    )
+    assert response.status_code == 415
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Case, Patient, Vitals
+from app.services.principal import token_claims
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+    COMPRESSION_MIN_SIZE = 0
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        db.session.add(chw)
+        db.session.commit()
+        for index in range(3):
+            patient = Patient(
+                id=f"patient-{index}", chw_id=chw.id, demographics={"name": f"Patient {index}"}
+            )
+            case = Case(
+                id=f"case-{index}",
+                patient=patient,
+                chw_id=chw.id,
+                triage_data={},
+                risk_level="high",
+                status="TRIAGED",
+            )
+            db.session.add_all([patient, case])
+        db.session.commit()
+        app.config["TEST_TOKEN"] = create_access_token(
+            identity=chw.id, additional_claims=token_claims(chw)
+        )
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def headers(app):
+    return {"Authorization": f"Bearer {app.config['TEST_TOKEN']}", "Accept-Encoding": "identity"}
+
+
+def test_matching_etag_returns_304_without_loading_rows(client, app, headers):
+    response = client.get("/api/patients", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def listener(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        cached = client.get("/api/patients", headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+    assert len(statements) == 1
+    assert "count" in statements[0].lower()
+
+
+def test_etag_changes_with_updates_inserts_and_deletes(client, app, headers):
+    def etag():
+        return client.get("/api/patients", headers=headers).headers["ETag"]
+
+    first = etag()
+    with app.app_context():
+        patient = db.session.get(Patient, "patient-0")
+        patient.demographics = {"name": "Renamed"}
+        chw_id = patient.chw_id
+        db.session.commit()
+    second = etag()
+    assert second != first
+
+    with app.app_context():
+        vitals = Vitals(
+            patient_id="patient-0",
+            chw_id=chw_id,
+            temperature="37C",
+            blood_pressure="120/80",
+            weight="70kg",
+        )
+        db.session.add(vitals)
+        db.session.commit()
+    assert etag() == second
+
+    with app.app_context():
+        db.session.delete(db.session.get(Case, "case-2"))
+        db.session.delete(db.session.get(Patient, "patient-2"))
+        db.session.commit()
+    assert etag() != second
+
+
+def test_nested_patient_change_invalidates_case_list(client, app, headers):
+    etag = client.get("/api/cases", headers=headers).headers["ETag"]
+    with app.app_context():
+        db.session.get(Patient, "patient-1").demographics = {"name": "Changed"}
+        db.session.commit()
+
+    response = client.get("/api/cases", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_varies_with_query_and_encoding(client, headers):
+    plain = client.get("/api/patients", headers=headers)
+    paged = client.get("/api/patients?limit=1", headers=headers)
+    assert plain.headers["ETag"] != paged.headers["ETag"]
+
+    gzipped = client.get("/api/patients", headers={**headers, "Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    cached = client.get(
+        "/api/patients",
+        headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == gzipped.headers["ETag"]
+    assert "Accept-Encoding" in cached.headers["Vary"]
+
+
+def test_if_modified_since(client, headers):
+    response = client.get("/api/patients/patient-0/vitals", headers=headers)
+    assert "Last-Modified" not in response.headers
+
+    last_modified = client.get("/api/patients", headers=headers).headers["Last-Modified"]
+    cached = client.get("/api/patients", headers={**headers, "If-Modified-Since": last_modified})
+    assert cached.status_code == 304
+
+    earlier = (datetime.utcnow() - timedelta(days=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    response = client.get("/api/patients", headers={**headers, "If-Modified-Since": earlier})
+    assert response.status_code == 200
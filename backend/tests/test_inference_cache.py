@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("onnxruntime")
+
+from app import metrics
+from app.ai import cache as inference_cache
+from app.ai.cache import InferenceCache, InferenceRecord, score_images
+from app.ai.medsiglip import MedSigLipResult, model_version
+from app.ai.preprocessing import Preprocessor, build_preprocessor
+from app.ai.reference_model import build_reference_model
+from app.ai.registry import configure_models, registry
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    metrics.registry.reset()
+    inference_cache._caches.clear()
+    inference_cache._local.__dict__.clear()
+    yield
+    inference_cache._caches.clear()
+    registry.clear()
+
+
+def png(value: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (value, value, value)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class CountingModel:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, images):
+        self.calls.append(len(images))
+        return [MedSigLipResult(risk_score=len(image) / 1000, risk_level="low") for image in images]
+
+
+def test_duplicates_skip_inference():
+    cache = InferenceCache("v1")
+    infer = CountingModel()
+    images = [png(0), png(255), png(0)]
+
+    first = cache.score(images, infer)
+    second = cache.score([png(255)], infer)
+
+    assert infer.calls == [2]
+    assert first[0] is first[2]
+    assert second[0].result == first[1].result
+    assert metrics.registry.value("medsiglip.cache.memory_hits") == 1
+    assert metrics.registry.value("medsiglip.cache.misses") == 2
+    assert cache.stats()["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    embedding = np.arange(4, dtype=np.float32)
+    InferenceCache("v1", directory=tmp_path).score(
+        [png(10)], lambda images: [InferenceRecord(MedSigLipResult(0.9, "high"), embedding)]
+    )
+
+    infer = CountingModel()
+    restarted = InferenceCache("v1", directory=tmp_path)
+    (record,) = restarted.score([png(10)], infer)
+
+    assert infer.calls == []
+    assert record.result.risk_score == pytest.approx(0.9)
+    assert record.result.risk_level == "high"
+    np.testing.assert_array_equal(record.embedding, embedding)
+    assert metrics.registry.value("medsiglip.cache.disk_hits") == 1
+
+    restarted.score([png(10)], infer)
+    assert metrics.registry.value("medsiglip.cache.memory_hits") == 1
+
+
+def test_new_model_version_misses(tmp_path):
+    InferenceCache("v1", directory=tmp_path).score([png(10)], CountingModel())
+    infer = CountingModel()
+
+    InferenceCache("v2", directory=tmp_path).score([png(10)], infer)
+
+    assert infer.calls == [1]
+
+
+def test_memory_tier_is_bounded():
+    cache = InferenceCache("v1", maxsize=2)
+    infer = CountingModel()
+
+    cache.score([png(1), png(2), png(3)], infer)
+    cache.score([png(1)], infer)
+
+    assert len(cache.memory) == 2
+    assert infer.calls == [3, 1]
+
+
+@pytest.mark.parametrize("contents", [b"", b"not a zip archive"])
+def test_unreadable_disk_entries_are_misses_and_removed(tmp_path, contents):
+    cache = InferenceCache("v1", directory=tmp_path)
+    digest = inference_cache.image_digest(png(10))
+    path = cache._path(digest)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(contents)
+
+    assert cache.get(digest) is None
+    assert not path.exists()
+    assert metrics.registry.value("medsiglip.cache.misses") == 1
+
+
+def test_model_version_tracks_file_contents(tmp_path):
+    path = build_reference_model(tmp_path / "model.onnx")
+    version = model_version(path)
+
+    assert model_version(path) == version
+    path.write_bytes(path.read_bytes() + b"\0")
+    assert model_version(path) != version
+
+
+def test_score_images_runs_the_registered_model_once_per_image(tmp_path):
+    config = {
+        "MEDSIGLIP_MODEL_PATH": str(build_reference_model(tmp_path / "medsiglip.onnx")),
+        "MEDSIGLIP_IMAGE_SIZE": 8,
+        "MEDSIGLIP_WARMUP_BATCH": 0,
+    }
+    configure_models(config)
+    model = registry.get("medsiglip")
+    batches = []
+    predict_batch = model.predict_batch
+    model.predict_batch = lambda images: batches.append(len(images)) or predict_batch(images)
+
+    results = score_images([png(255), png(0), png(255)], config)
+    again = score_images([png(0)], config)
+
+    assert batches == [2]
+    assert results[0] == results[2]
+    assert results[0].risk_score == pytest.approx(1 / (1 + np.exp(-1.0)), abs=1e-5)
+    assert again[0] == results[1]
+    assert inference_cache.inference_cache_stats()["medsiglip"]["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_cache_version_is_fixed_when_the_model_loads(tmp_path):
+    path = build_reference_model(tmp_path / "medsiglip.onnx")
+    config = {"MEDSIGLIP_MODEL_PATH": str(path), "MEDSIGLIP_IMAGE_SIZE": 8}
+    configure_models(config)
+    score_images([png(0)], config)
+    (before,) = inference_cache._caches.values()
+
+    path.write_bytes(path.read_bytes() + b"\0")
+    score_images([png(0)], config)
+
+    (after,) = inference_cache._caches.values()
+    assert after is before
+    assert before.version.startswith(registry.get("medsiglip").version)
+
+
+def test_preprocessing_settings_are_part_of_the_version(tmp_path):
+    config = {
+        "MEDSIGLIP_MODEL_PATH": str(build_reference_model(tmp_path / "medsiglip.onnx")),
+        "MEDSIGLIP_IMAGE_SIZE": 8,
+    }
+    configure_models(config)
+    model = registry.get("medsiglip")
+
+    small = inference_cache.cache_version(model, build_preprocessor(config))
+    large = inference_cache.cache_version(model, build_preprocessor({"MEDSIGLIP_IMAGE_SIZE": 16}))
+    resampled = inference_cache.cache_version(
+        model, Preprocessor(size=8, resample=Image.Resampling.BICUBIC)
+    )
+
+    assert len({small, large, resampled}) == 3
+    assert small == inference_cache.cache_version(model, Preprocessor(size=8))
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from flask import jsonify, request
+
+from app import create_app, json_provider
+from app.config import Config
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_handles_datetimes_and_uuids(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    record_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    value = {
+        "id": record_id,
+        "seen": datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc),
+        "name": "Fatou Njie",
+    }
+
+    assert json_provider.loads(json_provider.dumps(value)) == {
+        "id": str(record_id),
+        "seen": "2024-05-01T08:30:00+00:00",
+        "name": "Fatou Njie",
+    }
+    assert json_provider.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+
+def test_app_uses_fast_provider_for_requests_and_responses():
+    app = create_app(TestConfig)
+    assert isinstance(app.json, json_provider.FastJSONProvider)
+
+    with app.test_request_context(json={"changes": {"patients": []}}):
+        assert request.get_json() == {"changes": {"patients": []}}
+        response = jsonify({"at": datetime(2024, 1, 1)})
+        assert response.mimetype == "application/json"
+        assert response.get_json() == {"at": "2024-01-01T00:00:00"}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Case, DoctorUser, Patient
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add_all([chw, doctor])
+        db.session.commit()
+        start = datetime(2024, 1, 1)
+        for index in range(7):
+            # Pairs of rows share a created_at so the id tie-breaker is exercised.
+            created = start + timedelta(minutes=index // 2)
+            patient = Patient(
+                id=f"patient-{index}",
+                chw_id=chw.id,
+                demographics={"name": f"Patient {index}"},
+                created_at=created,
+            )
+            case = Case(
+                id=f"case-{index}",
+                patient=patient,
+                chw_id=chw.id,
+                triage_data={},
+                risk_level="high",
+                status="TRIAGED",
+                created_at=created,
+            )
+            db.session.add_all([patient, case])
+        db.session.commit()
+        app.config["TEST_CHW_ID"] = chw.id
+        app.config["TEST_DOCTOR_ID"] = doctor.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _auth(app, identity_key):
+    with app.app_context():
+        token = create_access_token(identity=app.config[identity_key])
+        return {"Authorization": f"Bearer {token}"}
+
+
+def test_list_pages_with_cursor_header(client, app):
+    headers = _auth(app, "TEST_CHW_ID")
+    assert len(client.get("/api/patients", headers=headers).get_json()) == 7
+
+    seen = []
+    url = "/api/patients?limit=3"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 3
+        seen.extend(record["id"] for record in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/api/patients?limit=3&after={cursor}" if cursor else None
+
+    assert seen == [f"patient-{index}" for index in range(7)]
+
+
+def test_list_without_limit_uses_the_default_page_size(client, app):
+    app.config["LIST_PAGE_SIZE"] = 4
+    headers = _auth(app, "TEST_CHW_ID")
+
+    first = client.get("/api/patients", headers=headers)
+    assert [record["id"] for record in first.get_json()] == [f"patient-{i}" for i in range(4)]
+    cursor = first.headers["X-Next-Cursor"]
+
+    rest = client.get(f"/api/patients?after={cursor}", headers=headers)
+    assert [record["id"] for record in rest.get_json()] == [f"patient-{i}" for i in range(4, 7)]
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_list_projects_requested_fields(client, app):
+    headers = _auth(app, "TEST_DOCTOR_ID")
+    response = client.get("/api/cases/pending?limit=2&fields=id,status", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {"id": "case-0", "status": "TRIAGED"},
+        {"id": "case-1", "status": "TRIAGED"},
+    ]
+
+    full = client.get("/api/cases/pending?limit=1", headers=headers).get_json()
+    assert full[0]["patient"]["id"] == "patient-0"
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["limit=0", "limit=abc", "fields=id,password_hash", "fields=patient", "after=not-a-cursor"],
+)
+def test_list_rejects_bad_arguments(client, app, query):
+    response = client.get(f"/api/cases?{query}", headers=_auth(app, "TEST_CHW_ID"))
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from app.ai import medsiglip
+from app.ai.medsiglip import MedSigLipModel, MedSigLipResult, load_model
+from app.ai.reference_model import build_reference_model
+
+
+@pytest.fixture()
+def model_path(tmp_path):
+    return build_reference_model(tmp_path / "medsiglip.onnx")
+
+
+def _expected(images: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-images.reshape(len(images), -1).mean(axis=1)))
+
+
+def test_predict_batch_scores_every_image(model_path):
+    model = load_model(model_path, intra_op_threads=1)
+    images = np.stack(
+        [np.full((3, 8, 8), value, dtype=np.float32) for value in (-3.0, 0.0, 0.5, 3.0)]
+    )
+
+    results = model.predict_batch(images)
+
+    assert all(isinstance(result, MedSigLipResult) for result in results)
+    np.testing.assert_allclose(
+        [result.risk_score for result in results], _expected(images), rtol=1e-5
+    )
+    assert [result.risk_level for result in results] == ["low", "medium", "medium", "high"]
+
+
+def test_predict_accepts_single_images(model_path):
+    model = MedSigLipModel(model_path)
+    image = np.random.default_rng(0).standard_normal((3, 16, 16))
+
+    result = model.predict(image)
+
+    assert result.risk_score == pytest.approx(float(_expected(image[np.newaxis])[0]), rel=1e-5)
+    assert model.predict(image[np.newaxis]) == result
+    with pytest.raises(ValueError):
+        model.predict(np.zeros((2, 3, 8, 8)))
+    with pytest.raises(ValueError):
+        model.predict_batch(np.zeros((3, 8, 8)))
+
+
+def test_models_share_one_session_per_configuration(model_path):
+    first = MedSigLipModel(model_path, intra_op_threads=1)
+    second = MedSigLipModel(model_path, intra_op_threads=1)
+    other = MedSigLipModel(model_path, intra_op_threads=2)
+
+    assert first.session is second.session
+    assert other.session is not first.session
+    assert first.input_name == "pixel_values"
+
+
+def test_missing_model_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MedSigLipModel(tmp_path / "missing.onnx")
+
+
+def test_sessions_are_not_shared_across_processes(model_path, monkeypatch):
+    session = MedSigLipModel(model_path).session
+    monkeypatch.setattr(medsiglip.os, "getpid", lambda: -1)
+    assert MedSigLipModel(model_path).session is not session
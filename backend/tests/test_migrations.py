@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, upgrade
+
+from app import create_app, db
+from app.config import Config
+from app.models import ChangeLog, Patient
+
+BACKEND = Path(__file__).resolve().parent.parent
+BASELINE_DB = BACKEND / "instance" / "dermadetect.db"
+MIGRATIONS = str(BACKEND / "migrations")
+
+
+@pytest.fixture()
+def app(tmp_path):
+    if not BASELINE_DB.exists():
+        pytest.skip("baseline database not available")
+    path = tmp_path / "dermadetect.db"
+    shutil.copy(BASELINE_DB, path)
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        TESTING = True
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_brings_the_baseline_database_to_the_model_schema(app):
+    patients = db.session.execute(db.select(db.func.count()).select_from(Patient)).scalar()
+    db.session.remove()
+
+    upgrade(directory=MIGRATIONS)
+
+    with db.engine.connect() as connection:
+        differences = compare_metadata(MigrationContext.configure(connection), db.metadata)
+    # SQLite keeps documents in TEXT columns; only the data is rewritten there.
+    assert [diff for diff in differences if not isinstance(diff, list)] == []
+    assert {change[0][0] for change in differences if isinstance(change, list)} <= {"modify_type"}
+
+    feed_entries = db.select(db.func.count()).select_from(ChangeLog)
+    assert db.session.execute(feed_entries).scalar() >= patients
+    patient = db.session.execute(db.select(Patient).limit(1)).scalar_one()
+    patient.sync_status = "synced"
+    db.session.commit()
+    assert patient.version == 2
+
+
+def test_downgrade_to_base_reverts_every_revision(app):
+    db.session.remove()
+    upgrade(directory=MIGRATIONS)
+    downgrade(directory=MIGRATIONS, revision="base")
+
+    tables = set(db.inspect(db.engine).get_table_names())
+    assert "change_log" not in tables
+    assert "sync_sessions" not in tables
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+pytest.importorskip("onnxruntime")
+
+from app import create_app, db
+from app.ai import registry as registry_module
+from app.ai import tasks
+from app.ai.registry import ModelRegistry, registry
+from app.ai.reference_model import build_reference_model
+from app.config import Config
+from app.models import DoctorUser
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    yield
+    registry.clear()
+
+
+@pytest.fixture()
+def model_path(tmp_path):
+    return str(build_reference_model(tmp_path / "medsiglip.onnx"))
+
+
+def test_models_load_once_under_concurrent_first_use():
+    models = ModelRegistry()
+    loads = []
+
+    def factory():
+        loads.append(object())
+        time.sleep(0.05)
+        return loads[-1]
+
+    warmed = []
+    models.register("model", factory, warmed.append)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(models.get("model"))) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert warmed == loads
+    assert all(result is loads[0] for result in results)
+    timings = models.timings()["model"]
+    assert timings["load_seconds"] >= 0.05
+    assert timings["warmup_seconds"] >= 0
+
+
+def test_failed_loads_are_retried():
+    models = ModelRegistry()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("not yet")
+        return "model"
+
+    models.register("model", factory)
+    with pytest.raises(FileNotFoundError):
+        models.get("model")
+    assert not models.is_loaded("model")
+    assert models.get("model") == "model"
+    with pytest.raises(KeyError):
+        models.get("unknown")
+
+
+def test_forked_process_loads_its_own_copy(monkeypatch):
+    models = ModelRegistry()
+    models.register("model", object)
+    parent = models.get("model")
+
+    monkeypatch.setattr(registry_module.os, "getpid", lambda: -1)
+    assert not models.is_loaded("model")
+    assert models.get("model") is not parent
+
+
+class PreloadConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    AI_PRELOAD_MODELS = "medsiglip"
+    MEDSIGLIP_IMAGE_SIZE = 32
+    MEDSIGLIP_INTRA_OP_THREADS = 1
+
+
+def test_create_app_preloads_and_warms_configured_models(model_path):
+    config = type("Config", (PreloadConfig,), {"MEDSIGLIP_MODEL_PATH": model_path})
+    app = create_app(config)
+
+    assert registry.is_loaded("medsiglip")
+    assert registry_module.get_model().input_name == "pixel_values"
+    with app.app_context():
+        db.create_all()
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add(doctor)
+        db.session.commit()
+        token = create_access_token(identity=doctor.id)
+    body = app.test_client().get(
+        "/api/metrics", headers={"Authorization": f"Bearer {token}"}
+    ).get_json()
+    assert set(body["models"]["medsiglip"]) == {"load_seconds", "warmup_seconds", "loaded_at"}
+
+
+def test_models_load_lazily_without_preload(model_path):
+    config = type(
+        "Config", (PreloadConfig,), {"MEDSIGLIP_MODEL_PATH": model_path, "AI_PRELOAD_MODELS": ""}
+    )
+    create_app(config)
+
+    assert not registry.is_loaded("medsiglip")
+    assert registry_module.get_model() is registry_module.get_model()
+    assert registry.is_loaded("medsiglip")
+
+
+def test_worker_process_hook_preloads_models(model_path):
+    config = type("Config", (PreloadConfig,), {"MEDSIGLIP_MODEL_PATH": model_path})
+    create_app(config)
+    registry.clear()
+
+    tasks.preload_worker_models()
+
+    assert registry.is_loaded("medsiglip")
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.ai.medsiglip import MedSigLipModel
+from app.ai.preprocessing import Preprocessor, build_preprocessor, iter_image_files
+from app.ai.reference_model import build_reference_model
+
+
+def encode(image: Image.Image, fmt: str = "PNG", **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def test_output_is_normalized_contiguous_float32():
+    preprocessor = Preprocessor(size=16)
+    white = preprocessor.preprocess(encode(Image.new("RGB", (40, 30), (255, 255, 255))))
+    black = preprocessor.preprocess(Image.new("L", (30, 40), 0))
+
+    assert white.shape == (3, 16, 16)
+    assert white.dtype == np.float32 and white.flags.c_contiguous
+    np.testing.assert_allclose(white, 1.0, atol=1e-6)
+    np.testing.assert_allclose(black, -1.0, atol=1e-6)
+
+
+def test_custom_mean_and_std_apply_per_channel():
+    preprocessor = Preprocessor(size=4, mean=(0.0, 0.5, 1.0), std=(1.0, 0.5, 0.25))
+    out = preprocessor.preprocess(Image.new("RGB", (8, 8), (255, 255, 255)))
+
+    np.testing.assert_allclose(out[:, 0, 0], [1.0, 1.0, 0.0], atol=1e-6)
+
+
+def test_wide_images_are_centre_cropped():
+    image = Image.new("RGB", (300, 100), (0, 0, 0))
+    image.paste((255, 255, 255), (100, 0, 200, 100))
+
+    out = Preprocessor(size=20).preprocess(encode(image))
+
+    # Only the white middle third survives the crop; bilinear edges blend a little.
+    assert out[:, :, 2:-2].min() > 0.99
+    assert out.min() > 0.5
+
+
+def test_large_jpegs_decode_at_reduced_scale(tmp_path):
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (2000, 1600), (255, 0, 0)).save(path, quality=95)
+
+    out = Preprocessor(size=64).preprocess(path)
+
+    assert out.shape == (3, 64, 64)
+    np.testing.assert_allclose(out[:, 32, 32], [1.0, -1.0, -1.0], atol=0.02)
+
+
+def test_exif_orientation_is_applied():
+    image = Image.new("RGB", (40, 20), (0, 0, 0))
+    image.paste((255, 255, 255), (0, 0, 40, 10))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise for display
+
+    out = Preprocessor(size=10).preprocess(encode(image, "JPEG", exif=exif, quality=95))
+
+    # The white top half ends up on the right once rotated.
+    assert out[:, :, -2:].mean() > 0.9
+    assert out[:, :, :2].mean() < -0.9
+
+
+def test_batches_reuse_one_buffer():
+    preprocessor = Preprocessor(size=8, max_batch_size=4)
+    images = [Image.new("RGB", (10, 10), (value, value, value)) for value in (0, 255, 0)]
+
+    first = preprocessor.batch(images)
+    second = preprocessor.batch(images[:2])
+
+    assert first.shape == (3, 3, 8, 8)
+    assert second.shape == (2, 3, 8, 8) and second.flags.c_contiguous
+    assert np.shares_memory(first, second)
+    np.testing.assert_allclose(second[1], 1.0, atol=1e-6)
+
+
+def test_batch_larger_than_buffer_grows_it():
+    preprocessor = Preprocessor(size=4, max_batch_size=1)
+    out = preprocessor.batch([Image.new("RGB", (4, 4))] * 3)
+
+    assert out.shape == (3, 3, 4, 4)
+
+
+def test_stream_walks_a_folder_in_batches(tmp_path):
+    (tmp_path / "nested").mkdir()
+    for index in range(5):
+        folder = tmp_path / "nested" if index % 2 else tmp_path
+        Image.new("RGB", (12, 12), (index * 50,) * 3).save(folder / f"{index}.png")
+    (tmp_path / "notes.txt").write_text("not an image")
+
+    paths = list(iter_image_files(tmp_path))
+    sizes = [len(batch) for batch in Preprocessor(size=4).stream(paths, batch_size=2)]
+
+    assert len(paths) == 5
+    assert sizes == [2, 2, 1]
+
+
+def test_batches_feed_the_model(tmp_path):
+    model = MedSigLipModel(build_reference_model(tmp_path / "reference.onnx"))
+    preprocessor = build_preprocessor({"MEDSIGLIP_IMAGE_SIZE": 32, "MEDSIGLIP_MAX_BATCH_SIZE": 2})
+
+    batch = preprocessor.batch([Image.new("RGB", (48, 64), (255, 255, 255))] * 2)
+    results = model.predict_batch(batch)
+
+    assert len(results) == 2
+    assert results[0].risk_score == pytest.approx(1 / (1 + np.exp(-1.0)), abs=1e-5)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import pytest
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(
+            email="chw@example.com",
+            password_hash=generate_password_hash("secret"),
+            name="Community Worker",
+        )
+        db.session.add(chw)
+        db.session.commit()
+        app.config["TEST_CHW_ID"] = chw.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _login(client):
+    response = client.post(
+        "/api/login", json={"email": "chw@example.com", "password": "secret", "role": "chw"}
+    )
+    assert response.status_code == 200
+    return response.get_json()["access_token"]
+
+
+def test_login_token_carries_role_and_version(client, app):
+    token = _login(client)
+    with app.app_context():
+        claims = decode_token(token)
+    assert claims["role"] == "chw"
+    assert claims["principal_version"] == 1
+
+
+def test_warm_principal_cache_needs_no_user_query(client, app):
+    headers = {"Authorization": f"Bearer {_login(client)}"}
+    assert client.get("/api/patients", headers=headers).status_code == 200
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def listener(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/api/patients", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # The list's ETag aggregate plus the page itself.
+    assert len(statements) == 2
+    assert not any("chw_users" in statement for statement in statements)
+
+
+def test_password_change_revokes_tokens(client, app):
+    headers = {"Authorization": f"Bearer {_login(client)}"}
+    assert client.get("/api/me", headers=headers).status_code == 200
+
+    with app.app_context():
+        chw = db.session.get(CHWUser, app.config["TEST_CHW_ID"])
+        chw.password_hash = generate_password_hash("changed")
+        db.session.commit()
+
+    assert client.get("/api/patients", headers=headers).status_code == 403
+    assert client.get("/api/me", headers=headers).status_code == 404
+
+
+def test_revoked_token_loses_sync_and_vitals_access(client, app):
+    headers = {"Authorization": f"Bearer {_login(client)}"}
+    sync = {"last_sync_timestamp": None, "changes": {}}
+    assert client.post("/api/sync", json=sync, headers=headers).status_code == 200
+
+    with app.app_context():
+        chw = db.session.get(CHWUser, app.config["TEST_CHW_ID"])
+        chw.email = "moved@example.com"
+        db.session.commit()
+
+    assert client.post("/api/sync", json=sync, headers=headers).status_code == 403
+    assert client.post("/api/sync/sessions", headers=headers).status_code == 403
+    assert client.get("/api/sync/sessions/any", headers=headers).status_code == 403
+    assert client.get("/api/patients/any/vitals", headers=headers).status_code == 403
+    assert client.post("/api/patients/any/vitals", json={}, headers=headers).status_code == 403
+
+
+def test_in_process_principal_cache_is_short_lived(app):
+    from app.services.principal import _principal_cache
+
+    app.config["PRINCIPAL_CACHE_TTL"] = 300
+    with app.app_context():
+        assert _principal_cache().ttl == app.config["PRINCIPAL_LOCAL_CACHE_TTL"]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Case, DoctorUser, Patient, Vitals
+from app.services.principal import token_claims
+
+HISTORY = 8
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add_all([chw, doctor])
+        db.session.commit()
+        for p in range(HISTORY):
+            patient = Patient(id=f"patient-{p}", chw_id=chw.id, demographics={})
+            db.session.add(patient)
+            for c in range(HISTORY):
+                db.session.add(
+                    Case(
+                        id=f"case-{p}-{c}",
+                        patient=patient,
+                        chw_id=chw.id,
+                        triage_data={},
+                        risk_level="high",
+                        status="TRIAGED",
+                    )
+                )
+                db.session.add(
+                    Vitals(
+                        patient=patient,
+                        chw_id=chw.id,
+                        temperature="37",
+                        blood_pressure="120/80",
+                        weight="60",
+                    )
+                )
+        db.session.commit()
+        app.config["TEST_TOKENS"] = {
+            role: create_access_token(identity=user.id, additional_claims=token_claims(user))
+            for role, user in (("chw", chw), ("doctor", doctor))
+        }
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@contextmanager
+def count_statements(app):
+    counter = {"statements": 0}
+
+    def before_cursor_execute(*_args, **_kwargs):
+        counter["statements"] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.parametrize(
+    "role, url, max_statements",
+    [
+        ("chw", "/api/patients", 3),
+        ("chw", "/api/patients/patient-0", 4),
+        ("doctor", "/api/patients/patient-0", 5),
+        ("chw", "/api/patients/patient-0/vitals", 4),
+        ("chw", "/api/cases", 3),
+        ("chw", "/api/cases/case-0-0", 2),
+        ("doctor", "/api/cases/case-0-0", 3),
+        ("doctor", "/api/cases/pending", 3),
+    ],
+)
+def test_read_endpoints_run_a_bounded_number_of_queries(app, role, url, max_statements):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {app.config['TEST_TOKENS'][role]}"}
+    with count_statements(app) as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert counter["statements"] <= max_statements
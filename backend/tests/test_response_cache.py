@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from werkzeug.http import http_date
+
+from app import create_app, db, metrics
+from app.config import Config
+from app.models import CHWUser, Case, DoctorUser, Patient
+from app.services.principal import token_claims
+from app.services.repository import get_repository
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    metrics.registry.reset()
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add_all([chw, doctor])
+        db.session.commit()
+        patient = Patient(id="patient-1", chw_id=chw.id, demographics={"name": "Patient"})
+        for index in range(2):
+            db.session.add(
+                Case(
+                    id=f"case-{index}",
+                    patient=patient,
+                    chw_id=chw.id,
+                    triage_data={},
+                    risk_level="high",
+                    status="TRIAGED",
+                )
+            )
+        db.session.commit()
+        app.config["TEST_TOKENS"] = {
+            "chw": create_access_token(identity=chw.id, additional_claims=token_claims(chw)),
+            "doctor": create_access_token(
+                identity=doctor.id, additional_claims=token_claims(doctor)
+            ),
+        }
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _headers(app, role):
+    return {"Authorization": f"Bearer {app.config['TEST_TOKENS'][role]}"}
+
+
+@contextmanager
+def count_statements(app):
+    statements = []
+
+    def listener(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_repeated_pending_reads_are_served_from_cache(client, app):
+    headers = _headers(app, "doctor")
+    first = client.get("/api/cases/pending", headers=headers)
+    assert first.status_code == 200
+
+    with count_statements(app) as statements:
+        second = client.get("/api/cases/pending", headers=headers)
+        cached = client.get(
+            "/api/cases/pending", headers={**headers, "If-None-Match": first.headers["ETag"]}
+        )
+
+    assert statements == []
+    assert second.get_json() == first.get_json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert cached.status_code == 304
+    assert metrics.registry.value("response_cache.pending_cases.hits") == 2
+    assert metrics.registry.value("response_cache.pending_cases.misses") == 1
+
+
+def test_diagnosis_and_claims_invalidate_pending_list(client, app):
+    headers = _headers(app, "doctor")
+    assert len(client.get("/api/cases/pending", headers=headers).get_json()) == 2
+
+    claimed = client.post("/api/cases/claim", json={"limit": 1}, headers=headers).get_json()
+    pending = client.get("/api/cases/pending", headers=headers).get_json()
+    held = [case for case in pending if case["claimed_by"]]
+    assert [case["id"] for case in held] == [claimed[0]["id"]]
+
+    response = client.post(
+        f"/api/cases/{claimed[0]['id']}/diagnosis",
+        json={"diagnosis_text": "Eczema"},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    pending = client.get("/api/cases/pending", headers=headers).get_json()
+    assert [case["id"] for case in pending] != [case["id"] for case in held]
+    assert len(pending) == 1
+
+
+def test_pending_list_validates_by_etag_only(client, app):
+    headers = _headers(app, "doctor")
+    first = client.get("/api/cases/pending", headers=headers)
+    assert "Last-Modified" not in first.headers
+
+    response = client.post(
+        "/api/cases/case-0/diagnosis", json={"diagnosis_text": "Eczema"}, headers=headers
+    )
+    assert response.status_code == 201
+
+    # The newest updated_at among the remaining rows has not moved.
+    since = {"If-Modified-Since": http_date(datetime.now(timezone.utc) + timedelta(days=1))}
+    response = client.get("/api/cases/pending", headers={**headers, **since})
+    assert response.status_code == 200
+    assert [case["id"] for case in response.get_json()] == ["case-1"]
+
+
+def test_case_detail_follows_case_and_patient_writes(client, app):
+    headers = _headers(app, "doctor")
+    assert client.get("/api/cases/case-0", headers=headers).get_json()["status"] == "TRIAGED"
+
+    with app.app_context():
+        # The bulk sync path bypasses the unit of work.
+        get_repository("cases").upsert_records([{"id": "case-0", "status": "PENDING_DIAGNOSIS"}])
+        db.session.commit()
+    case = client.get("/api/cases/case-0", headers=headers).get_json()
+    assert case["status"] == "PENDING_DIAGNOSIS"
+
+    with app.app_context():
+        db.session.get(Patient, "patient-1").demographics = {"name": "Renamed"}
+        db.session.commit()
+    case = client.get("/api/cases/case-0", headers=headers).get_json()
+    assert case["patient"]["demographics"] == {"name": "Renamed"}
+
+
+def test_generations_expire(client, app):
+    from app.services import response_cache
+
+    client.get("/api/cases/case-0", headers=_headers(app, "doctor"))
+
+    with app.app_context():
+        cache = response_cache._response_cache()
+        expires_at, _generation = cache._entries["gen:case:case-0"]
+        ttl = app.config["RESPONSE_CACHE_TTL"]
+    assert expires_at is not None
+    assert expires_at - time.monotonic() == pytest.approx(2 * ttl, abs=5)
+
+
+def test_cache_entries_are_per_principal(client, app):
+    assert client.get("/api/cases/case-0", headers=_headers(app, "chw")).status_code == 200
+    assert client.get("/api/cases/case-0", headers=_headers(app, "doctor")).status_code == 200
+    assert metrics.registry.value("response_cache.case.misses") == 2
+    other = client.get("/api/cases/case-1", headers=_headers(app, "doctor")).get_json()
+    assert other["id"] == "case-1"
+
+    missing = client.get("/api/cases/unknown", headers=_headers(app, "doctor"))
+    assert missing.status_code == 404
+    assert client.get("/api/cases/unknown", headers=_headers(app, "doctor")).status_code == 404
+    assert metrics.registry.value("response_cache.case.hits") == 0
+    assert metrics.registry.value("response_cache.case.misses") == 5
+
+
+def test_metrics_endpoint_reports_cache_counters(client, app):
+    headers = _headers(app, "doctor")
+    client.get("/api/cases/pending", headers=headers)
+    client.get("/api/cases/pending", headers=headers)
+
+    body = client.get("/api/metrics", headers=headers).get_json()
+    assert body["counters"]["response_cache.pending_cases.hits"] == 1
+    assert body["caches"]["responses"]["backend"] == "memory"
+
+    chw_response = client.get("/api/metrics", headers=_headers(app, "chw"))
+    assert chw_response.status_code == 403
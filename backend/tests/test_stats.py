@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Case, Diagnosis, DoctorUser, Patient
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add_all([chw, doctor])
+        db.session.commit()
+        patient = Patient(id="patient-1", chw_id=chw.id, demographics={})
+        now = datetime.utcnow()
+        for index, age in enumerate([timedelta(days=1), timedelta(days=6), timedelta(days=30)]):
+            db.session.add(
+                Case(
+                    id=f"case-{index}",
+                    patient=patient,
+                    chw_id=chw.id,
+                    triage_data={},
+                    risk_level="high",
+                    status="PENDING_DIAGNOSIS",
+                    created_at=now - age,
+                )
+            )
+        db.session.add(
+            Diagnosis(
+                case_id="case-2",
+                doctor_id=doctor.id,
+                diagnosis_text="Eczema",
+                created_at=now - timedelta(days=20),
+            )
+        )
+        db.session.commit()
+        app.config["TEST_CHW_ID"] = chw.id
+        app.config["TEST_DOCTOR_ID"] = doctor.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _auth(app, identity_key):
+    with app.app_context():
+        token = create_access_token(identity=app.config[identity_key])
+        return {"Authorization": f"Bearer {token}"}
+
+
+def test_chw_stats_use_rolling_week_and_refresh_after_writes(client, app):
+    headers = _auth(app, "TEST_CHW_ID")
+    stats = client.get("/api/me", headers=headers).get_json()["stats"]
+    assert stats == {"patients": 1, "cases": 3, "this_week": 2}
+
+    response = client.post(
+        "/api/patients", json={"id": "patient-2", "demographics": {}}, headers=headers
+    )
+    assert response.status_code == 201
+    assert client.get("/api/me", headers=headers).get_json()["stats"]["patients"] == 2
+
+
+def test_doctor_stats_are_cached_until_a_diagnosis_commits(client, app):
+    headers = _auth(app, "TEST_DOCTOR_ID")
+    stats = client.get("/api/me", headers=headers).get_json()["stats"]
+    assert stats == {"diagnoses": 1, "this_week": 0, "pending_cases": 3}
+
+    with app.app_context():
+        # A write that bypasses the ORM is only picked up once the entry expires.
+        db.session.execute(db.update(Case).where(Case.id == "case-0").values(status="CLOSED"))
+        db.session.commit()
+    assert client.get("/api/me", headers=headers).get_json()["stats"]["pending_cases"] == 3
+
+    client.post("/api/cases/case-1/diagnosis", json={"diagnosis_text": "Tinea"}, headers=headers)
+    stats = client.get("/api/me", headers=headers).get_json()["stats"]
+    assert stats == {"diagnoses": 2, "this_week": 1, "pending_cases": 1}
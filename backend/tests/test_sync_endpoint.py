@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import pytest
 from flask_jwt_extended import create_access_token
 
 from app import create_app, db
 from app.config import Config
-from app.models import CHWUser
+from app.models import CHWUser, Case, MedGemmaQueue, Patient
 
 
 class TestConfig(Config):
@@ -72,3 +72,634 @@ def test_sync_endpoint_accepts_payload(client, auth_header):
     data = response.get_json()
     assert "new_sync_timestamp" in data
     assert "server_updates" in data
+
+
+def _post_sync(client, auth_header, changes):
+    payload = {"last_sync_timestamp": None, "changes": changes}
+    return client.post(
+        "/api/sync",
+        data=json.dumps(payload),
+        headers={**auth_header, "Content-Type": "application/json"},
+    )
+
+
+def test_sync_upsert_applies_last_writer_wins(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+    def patient(record_id, name, modified):
+        return {
+            "id": record_id,
+            "demographics": {"name": name},
+            "chw_id": chw_id,
+            "sync_status": "new",
+            "last_modified_at": modified.isoformat(),
+        }
+
+    response = _post_sync(
+        client,
+        auth_header,
+        {"patients": [patient("p-1", "First", base), patient("p-2", "Second", base)]},
+    )
+    assert response.get_json()["results"]["patients"] == {
+        "inserted": 2,
+        "updated": 0,
+        "stale": [],
+        "rejected": [],
+    }
+
+    response = _post_sync(
+        client,
+        auth_header,
+        {
+            "patients": [
+                patient("p-1", "Older", base - timedelta(days=1)),
+                patient("p-2", "Newer", base + timedelta(days=1)),
+            ]
+        },
+    )
+    assert response.get_json()["results"]["patients"] == {
+        "inserted": 0,
+        "updated": 1,
+        "stale": ["p-1"],
+        "rejected": [],
+    }
+
+    with app.app_context():
+        assert db.session.get(Patient, "p-1").demographics["name"] == "First"
+        assert db.session.get(Patient, "p-2").demographics["name"] == "Newer"
+
+
+def test_sync_pages_server_updates_for_calling_chw(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    with app.app_context():
+        other = CHWUser(email="other@example.com", password_hash="hash", name="Other")
+        db.session.add(other)
+        db.session.flush()
+        modified = datetime(2024, 6, 1)
+        for index in range(5):
+            db.session.add(
+                Patient(
+                    id=f"mine-{index}",
+                    chw_id=chw_id,
+                    demographics="{}",
+                    last_modified_at=modified,
+                )
+            )
+            db.session.add(
+                Patient(
+                    id=f"theirs-{index}",
+                    chw_id=other.id,
+                    demographics="{}",
+                    last_modified_at=modified,
+                )
+            )
+        db.session.commit()
+
+    received = []
+    snapshots = set()
+    cursor = None
+    while True:
+        payload = {"last_sync_timestamp": None, "changes": {}, "page_size": 2}
+        if cursor:
+            payload["cursor"] = cursor
+        response = client.post("/api/sync", json=payload, headers=auth_header)
+        assert response.status_code == 200
+        data = response.get_json()
+        page = data["server_updates"].get("patients", [])
+        assert len(page) <= 2
+        received.extend(record["id"] for record in page)
+        snapshots.add(data["new_sync_timestamp"])
+        if not data["has_more"]:
+            assert data["next_cursor"] is None
+            break
+        cursor = data["next_cursor"]
+
+    assert received == [f"mine-{index}" for index in range(5)]
+    assert len(snapshots) == 1
+
+
+def test_sync_rejects_tampered_cursor(client, auth_header):
+    response = client.post(
+        "/api/sync",
+        json={"changes": {}, "cursor": "not-a-cursor"},
+        headers=auth_header,
+    )
+    assert response.status_code == 400
+
+
+def test_sync_streams_ndjson_when_requested(client, auth_header, app):
+    app.config["SYNC_STREAM_BATCH_SIZE"] = 2
+    chw_id = app.config["TEST_CHW_ID"]
+    with app.app_context():
+        for index in range(3):
+            db.session.add(
+                Patient(id=f"stream-{index}", chw_id=chw_id, demographics='{"age": 4}')
+            )
+        db.session.commit()
+
+    response = client.post(
+        "/api/sync",
+        json={"last_sync_timestamp": None, "changes": {}},
+        headers={**auth_header, "Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]["type"] == "sync"
+    assert lines[-1] == {"type": "end", "count": 3}
+    records = [line for line in lines if line["type"] == "record"]
+    assert [line["record"]["id"] for line in records] == [f"stream-{i}" for i in range(3)]
+    assert records[0]["record"]["demographics"] == {"age": 4}
+    checkpoints = [line for line in lines if line["type"] == "checkpoint"]
+    assert len(checkpoints) == 2
+
+    resumed = client.post(
+        "/api/sync",
+        json={"changes": {}, "cursor": checkpoints[0]["cursor"]},
+        headers={**auth_header, "Accept": "application/x-ndjson"},
+    )
+    resumed_lines = resumed.get_data(as_text=True).splitlines()
+    assert json.loads(resumed_lines[-1]) == {"type": "end", "count": 1}
+
+
+def test_sync_reads_change_feed_after_sequence(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    with app.app_context():
+        other = CHWUser(email="other@example.com", password_hash="hash", name="Other")
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(Patient(id="feed-mine", chw_id=chw_id, demographics="{}"))
+        db.session.add(Patient(id="feed-theirs", chw_id=other.id, demographics="{}"))
+        db.session.commit()
+
+    first = client.post(
+        "/api/sync", json={"last_sync_seq": 0, "changes": {}}, headers=auth_header
+    ).get_json()
+    assert [r["id"] for r in first["server_updates"]["patients"]] == ["feed-mine"]
+    assert first["has_more"] is False
+
+    uploaded = _post_sync(
+        client,
+        auth_header,
+        {"patients": [{"id": "feed-upload", "demographics": {}, "sync_status": "new"}]},
+    )
+    assert uploaded.status_code == 200
+
+    with app.app_context():
+        patient = db.session.get(Patient, "feed-mine")
+        patient.sync_status = "synced"
+        db.session.commit()
+
+    second = client.post(
+        "/api/sync",
+        json={"last_sync_seq": first["new_sync_seq"], "changes": {}},
+        headers=auth_header,
+    ).get_json()
+    assert [r["id"] for r in second["server_updates"]["patients"]] == [
+        "feed-upload",
+        "feed-mine",
+    ]
+    assert second["server_updates"]["patients"][1]["sync_status"] == "synced"
+    assert second["new_sync_seq"] > first["new_sync_seq"]
+
+
+def test_feed_sync_does_not_echo_the_requests_own_uploads(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    with app.app_context():
+        db.session.add(Patient(id="feed-server", chw_id=chw_id, demographics={}))
+        db.session.commit()
+
+    response = client.post(
+        "/api/sync",
+        json={
+            "last_sync_seq": 0,
+            "changes": {
+                "patients": [{"id": "feed-own", "demographics": {}, "sync_status": "new"}]
+            },
+        },
+        headers=auth_header,
+    ).get_json()
+
+    assert [r["id"] for r in response["server_updates"]["patients"]] == ["feed-server"]
+    follow_up = client.post(
+        "/api/sync",
+        json={"last_sync_seq": response["new_sync_seq"], "changes": {}},
+        headers=auth_header,
+    ).get_json()
+    assert follow_up["server_updates"] == {}
+
+
+def test_feed_appends_take_the_advisory_lock_on_postgres():
+    from types import SimpleNamespace
+
+    from sqlalchemy import Connection
+
+    from app.services.change_feed import record_changes
+
+    class RecordingConnection(Connection):
+        def __init__(self):
+            self.dialect = SimpleNamespace(name="postgresql")
+            self.statements = []
+
+        def execute(self, statement, *args, **kwargs):
+            self.statements.append(str(statement))
+            return SimpleNamespace(scalars=lambda: [len(self.statements)])
+
+    connection = RecordingConnection()
+    record_changes(connection, Patient, ["a", "b"])
+
+    assert "pg_advisory_xact_lock" in connection.statements[0]
+    assert "INSERT INTO change_log" in connection.statements[1]
+
+
+def test_feed_is_appended_after_the_uploads_right_before_commit(client, auth_header, app):
+    from sqlalchemy import event
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def listener(_conn, _cursor, statement, *_args):
+        if statement.startswith(("INSERT", "UPDATE")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = _post_sync(
+            client,
+            auth_header,
+            {
+                "patients": [{"id": "late-feed", "demographics": {}, "sync_status": "new"}],
+                "cases": [
+                    {
+                        "id": "late-case",
+                        "patient_id": "late-feed",
+                        "triage_data": {},
+                        "risk_level": "low",
+                        "sync_status": "new",
+                    }
+                ],
+            },
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    feed = [i for i, sql in enumerate(statements) if "change_log" in sql]
+    others = [i for i, sql in enumerate(statements) if "change_log" not in sql]
+    assert feed and others
+    assert max(others) < min(feed)
+
+
+def test_sync_queues_and_dispatches_new_high_risk_cases(client, auth_header, app, monkeypatch):
+    from app.services import sync_service
+
+    dispatched = []
+    monkeypatch.setattr(sync_service, "dispatch_medgemma_analyses", dispatched.extend)
+    chw_id = app.config["TEST_CHW_ID"]
+
+    def case(record_id, risk_level):
+        return {
+            "id": record_id,
+            "patient_id": "queue-patient",
+            "triage_data": {"symptoms": "itching"},
+            "risk_level": risk_level,
+            "status": "TRIAGED",
+            "sync_status": "new",
+        }
+
+    with app.app_context():
+        db.session.add(Patient(id="queue-patient", chw_id=chw_id, demographics="{}"))
+        db.session.add(
+            Case(
+                id="already-queued",
+                patient_id="queue-patient",
+                chw_id=chw_id,
+                triage_data="{}",
+                risk_level="high",
+            )
+        )
+        db.session.add(MedGemmaQueue(case_id="already-queued"))
+        db.session.commit()
+
+    response = _post_sync(
+        client,
+        auth_header,
+        {
+            "cases": [
+                case("already-queued", "high"),
+                case("new-high-1", "high"),
+                case("new-high-2", "HIGH"),
+                case("new-low", "low"),
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert dispatched == ["new-high-1", "new-high-2"]
+    with app.app_context():
+        queued = {entry.case_id for entry in MedGemmaQueue.query.all()}
+        assert queued == {"already-queued", "new-high-1", "new-high-2"}
+
+
+def test_delta_sync_sends_only_changed_fields(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    triage = {"symptoms": ["itching"] * 50, "notes": "Lesion history. " * 40}
+    with app.app_context():
+        db.session.add(Patient(id="delta-patient", chw_id=chw_id, demographics="{}"))
+        db.session.add(
+            Case(
+                id="delta-case",
+                patient_id="delta-patient",
+                chw_id=chw_id,
+                triage_data=json.dumps(triage),
+                risk_level="high",
+            )
+        )
+        db.session.commit()
+
+    baseline = client.post(
+        "/api/sync", json={"last_sync_seq": 0, "changes": {}}, headers=auth_header
+    ).get_json()
+
+    with app.app_context():
+        case = db.session.get(Case, "delta-case")
+        case.status = "DIAGNOSED"
+        db.session.commit()
+
+    request = {"last_sync_seq": baseline["new_sync_seq"], "changes": {}}
+    full = client.post("/api/sync", json=request, headers=auth_header)
+    delta = client.post("/api/sync", json={**request, "delta": True}, headers=auth_header)
+
+    [full_record] = full.get_json()["server_updates"]["cases"]
+    [record] = delta.get_json()["server_updates"]["cases"]
+    assert record["_partial"] is True
+    assert set(record) == {"id", "version", "last_modified_at", "status", "_partial"}
+    assert record["status"] == "DIAGNOSED"
+    assert record["version"] == 2
+    assert len(json.dumps(record)) * 10 < len(json.dumps(full_record))
+
+
+def test_partial_upload_merges_without_touching_other_fields(client, auth_header, app):
+    chw_id = app.config["TEST_CHW_ID"]
+    with app.app_context():
+        db.session.add(Patient(id="merge-patient", chw_id=chw_id, demographics="{}"))
+        db.session.add(
+            Case(
+                id="merge-case",
+                patient_id="merge-patient",
+                chw_id=chw_id,
+                triage_data='{"symptoms": "rash"}',
+                risk_level="low",
+                last_modified_at=datetime(2024, 1, 1),
+            )
+        )
+        db.session.commit()
+
+    response = _post_sync(
+        client,
+        auth_header,
+        {
+            "cases": [
+                {
+                    "id": "merge-case",
+                    "status": "REFERRED",
+                    "last_modified_at": datetime(2024, 2, 1, tzinfo=timezone.utc).isoformat(),
+                }
+            ]
+        },
+    )
+    assert response.get_json()["results"]["cases"]["updated"] == 1
+    with app.app_context():
+        case = db.session.get(Case, "merge-case")
+        assert case.status == "REFERRED"
+        assert case.triage_data == {"symptoms": "rash"}
+        assert case.version == 2
+
+
+def test_partial_upload_for_unknown_row_is_rejected_alone(client, auth_header, app):
+    now = datetime.now(timezone.utc).isoformat()
+    response = _post_sync(
+        client,
+        auth_header,
+        {
+            "patients": [
+                {"id": "brand-new", "sync_status": "new", "last_modified_at": now},
+                {
+                    "id": "complete",
+                    "demographics": {},
+                    "sync_status": "new",
+                    "last_modified_at": now,
+                },
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["results"]["patients"] == {
+        "inserted": 1,
+        "updated": 0,
+        "stale": [],
+        "rejected": ["brand-new"],
+    }
+    with app.app_context():
+        assert db.session.get(Patient, "brand-new") is None
+        assert db.session.get(Patient, "complete") is not None
+
+
+def test_rejected_high_risk_case_is_not_queued(client, auth_header, app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+            assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+    ghost = {
+        "id": "ghost",
+        "risk_level": "high",
+        "last_modified_at": datetime.now(timezone.utc).isoformat(),
+    }
+    response = _post_sync(client, auth_header, {"cases": [ghost]})
+
+    assert response.status_code == 200
+    assert response.get_json()["results"]["cases"]["rejected"] == ["ghost"]
+    with app.app_context():
+        assert db.session.query(MedGemmaQueue).count() == 0
+
+
+def test_retried_sync_is_replayed_from_cache(client, auth_header, app, monkeypatch):
+    from app.routes import sync as sync_routes
+
+    payload = {
+        "last_sync_timestamp": None,
+        "changes": {"patients": [{"id": "retry-1", "demographics": {}, "sync_status": "new"}]},
+    }
+    headers = {**auth_header, "Idempotency-Key": "sync-attempt-1"}
+    first = client.post("/api/sync", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("replayed request must not reach the sync service")
+
+    monkeypatch.setattr(sync_routes.service, "process_sync_payload", fail)
+    retry = client.post("/api/sync", json=payload, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+
+    reused = client.post(
+        "/api/sync", json={**payload, "changes": {}}, headers=headers
+    )
+    assert reused.status_code == 422
+
+
+def test_sync_retry_while_first_attempt_runs_is_turned_away(client, auth_header, monkeypatch):
+    from app.routes import sync as sync_routes
+    from app.services import idempotency
+
+    payload = {
+        "last_sync_timestamp": None,
+        "changes": {
+            "patients": [{"id": "inflight-1", "demographics": {}, "sync_status": "new"}]
+        },
+    }
+    headers = {**auth_header, "Idempotency-Key": "sync-attempt-2"}
+    concurrent = []
+    process = sync_routes.service.process_sync_payload
+
+    def process_with_concurrent_retry(*args, **kwargs):
+        concurrent.append(client.post("/api/sync", json=payload, headers=headers))
+        return process(*args, **kwargs)
+
+    monkeypatch.setattr(
+        sync_routes.service, "process_sync_payload", process_with_concurrent_retry
+    )
+    first = client.post("/api/sync", json=payload, headers=headers)
+
+    assert first.status_code == 200
+    assert concurrent[0].status_code == 409
+    assert concurrent[0].headers["Retry-After"] == str(idempotency.RETRY_AFTER_SECONDS)
+    assert len(concurrent) == 1
+
+
+def test_failed_sync_releases_its_idempotency_key(client, auth_header):
+    headers = {**auth_header, "Idempotency-Key": "sync-attempt-3"}
+    invalid = client.post("/api/sync", json={"changes": "not a dict"}, headers=headers)
+    assert invalid.status_code == 400
+
+    valid = {"last_sync_timestamp": None, "changes": {}}
+    assert client.post("/api/sync", json=valid, headers=headers).status_code == 200
+
+
+def test_chunked_sync_session_resumes_and_finalizes(client, auth_header, app):
+    opened = client.post("/api/sync/sessions", headers=auth_header)
+    assert opened.status_code == 201
+    session_id = opened.get_json()["session_id"]
+    chunk_url = f"/api/sync/sessions/{session_id}/chunks"
+
+    def chunk(patient_id):
+        return {"changes": {"patients": [{"id": patient_id, "demographics": {}, "sync_status": "new"}]}}
+
+    first = client.put(f"{chunk_url}/0", json=chunk("chunk-0"), headers=auth_header)
+    assert first.status_code == 200
+    assert first.get_json()["results"]["patients"]["inserted"] == 1
+
+    # The client lost the connection after chunk 0; finalizing now reports the gap.
+    early = client.post(
+        f"/api/sync/sessions/{session_id}/finalize",
+        json={"total_chunks": 2, "last_sync_timestamp": None},
+        headers=auth_header,
+    )
+    assert early.status_code == 409
+    assert early.get_json()["missing_chunks"] == [1]
+
+    status = client.get(f"/api/sync/sessions/{session_id}", headers=auth_header)
+    assert status.get_json()["received_chunks"] == [0]
+
+    retried = client.put(f"{chunk_url}/0", json=chunk("chunk-0"), headers=auth_header)
+    assert retried.get_json()["duplicate"] is True
+    conflicting = client.put(f"{chunk_url}/0", json=chunk("other"), headers=auth_header)
+    assert conflicting.status_code == 409
+
+    assert client.put(f"{chunk_url}/1", json=chunk("chunk-1"), headers=auth_header).status_code == 200
+    finalized = client.post(
+        f"/api/sync/sessions/{session_id}/finalize",
+        json={"total_chunks": 2, "last_sync_timestamp": None},
+        headers=auth_header,
+    )
+    assert finalized.status_code == 200
+    body = finalized.get_json()
+    assert body["session"]["status"] == "finalized"
+    assert {record["id"] for record in body["server_updates"]["patients"]} == {"chunk-0", "chunk-1"}
+
+    late = client.put(f"{chunk_url}/2", json=chunk("chunk-2"), headers=auth_header)
+    assert late.status_code == 409
+    with app.app_context():
+        assert db.session.get(Patient, "other") is None
+        assert db.session.get(Patient, "chunk-2") is None
+
+
+def test_chunk_upload_enforces_size_limit(client, auth_header, app):
+    app.config["SYNC_MAX_CHUNK_BYTES"] = 64
+    session_id = client.post("/api/sync/sessions", headers=auth_header).get_json()["session_id"]
+    response = client.put(
+        f"/api/sync/sessions/{session_id}/chunks/0",
+        json={"changes": {"patients": [{"id": "x" * 100, "demographics": {}}]}},
+        headers=auth_header,
+    )
+    assert response.status_code == 413
+
+
+def test_json_documents_are_stored_structured(client, auth_header, app):
+    response = _post_sync(
+        client,
+        auth_header,
+        {
+            "patients": [
+                # Older clients send documents as JSON-encoded strings.
+                {"id": "doc-legacy", "demographics": json.dumps({"name": "Awa"})},
+                {"id": "doc-native", "demographics": {"name": "Lamin"}},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Patient, "doc-legacy").demographics == {"name": "Awa"}
+        stmt = db.select(Patient.id).where(Patient.demographics["name"].as_string() == "Lamin")
+        assert db.session.execute(stmt).scalars().all() == ["doc-native"]
+
+
+def test_plain_strings_in_document_columns_are_kept(app):
+    from app.models import Diagnosis, DoctorUser
+
+    with app.app_context():
+        doctor = DoctorUser(email="doc@example.com", password_hash="hash", name="Doctor")
+        db.session.add(doctor)
+        db.session.add(Patient(id="rx-patient", chw_id=app.config["TEST_CHW_ID"], demographics={}))
+        db.session.add(
+            Case(
+                id="rx-case",
+                patient_id="rx-patient",
+                chw_id=app.config["TEST_CHW_ID"],
+                triage_data={},
+                risk_level="low",
+            )
+        )
+        db.session.flush()
+        prescriptions = ["500", "true", "null", "Take twice daily", '["amoxicillin"]']
+        for index, prescription in enumerate(prescriptions):
+            db.session.add(
+                Diagnosis(
+                    id=f"rx-{index}",
+                    case_id="rx-case",
+                    doctor_id=doctor.id,
+                    diagnosis_text="Eczema",
+                    prescription=prescription,
+                )
+            )
+        db.session.commit()
+        db.session.expire_all()
+
+        stored = [db.session.get(Diagnosis, f"rx-{index}").prescription for index in range(5)]
+        assert stored == ["500", "true", "null", "Take twice daily", ["amoxicillin"]]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.config import Config
+from app.models import CHWUser, Case, DoctorUser, Patient
+from app.services import work_queue
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    CELERY = Config.CELERY | {"task_always_eager": True}
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        chw = CHWUser(email="chw@example.com", password_hash="hash", name="Community Worker")
+        doctors = [
+            DoctorUser(email=f"doc{index}@example.com", password_hash="hash", name=f"Doctor {index}")
+            for index in range(2)
+        ]
+        db.session.add_all([chw, *doctors])
+        db.session.commit()
+        patient = Patient(chw_id=chw.id, demographics={})
+        db.session.add(patient)
+        start = datetime(2024, 1, 1)
+        for index, priority in enumerate([2.0, None, 9.5, 5.0, 1.0]):
+            db.session.add(
+                Case(
+                    id=f"case-{index}",
+                    patient=patient,
+                    chw_id=chw.id,
+                    triage_data={},
+                    risk_level="high",
+                    status="PENDING_DIAGNOSIS",
+                    priority=priority,
+                    created_at=start + timedelta(minutes=index),
+                )
+            )
+        db.session.commit()
+        app.config["TEST_DOCTOR_IDS"] = [doctor.id for doctor in doctors]
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def doctor_headers(app):
+    with app.app_context():
+        return [
+            {"Authorization": f"Bearer {create_access_token(identity=doctor_id)}"}
+            for doctor_id in app.config["TEST_DOCTOR_IDS"]
+        ]
+
+
+def _claim(client, headers, limit):
+    response = client.post("/api/cases/claim", json={"limit": limit}, headers=headers)
+    assert response.status_code == 200
+    return [case["id"] for case in response.get_json()]
+
+
+def test_doctors_claim_disjoint_cases_by_priority(client, doctor_headers):
+    first, second = doctor_headers
+    assert _claim(client, first, 2) == ["case-2", "case-3"]
+    assert _claim(client, second, 2) == ["case-0", "case-4"]
+    # Claiming again renews the lease and returns the same cases.
+    assert _claim(client, first, 2) == ["case-2", "case-3"]
+    assert _claim(client, second, 5) == ["case-0", "case-4", "case-1"]
+
+
+def test_expired_claims_return_to_queue(app):
+    first, second = app.config["TEST_DOCTOR_IDS"]
+    with app.app_context():
+        claimed = work_queue.claim_cases(first, 1)
+        assert [case.id for case in claimed] == ["case-2"]
+        later = datetime.utcnow() + timedelta(seconds=app.config["CASE_CLAIM_TTL"] + 1)
+        assert [case.id for case in work_queue.claim_cases(second, 1, now=later)] == ["case-2"]
+
+
+def test_diagnosis_respects_claims(client, doctor_headers, app):
+    first, second = doctor_headers
+    _claim(client, first, 1)
+
+    blocked = client.post(
+        "/api/cases/case-2/diagnosis", json={"diagnosis_text": "Eczema"}, headers=second
+    )
+    assert blocked.status_code == 409
+    assert client.post("/api/cases/case-2/release", headers=second).status_code == 409
+
+    done = client.post(
+        "/api/cases/case-2/diagnosis", json={"diagnosis_text": "Eczema"}, headers=first
+    )
+    assert done.status_code == 201
+    with app.app_context():
+        case = db.session.get(Case, "case-2")
+        assert case.status == "DIAGNOSED"
+        assert case.claimed_by is None
+    assert "case-2" not in _claim(client, second, 5)
+
+
+def test_completing_a_case_rechecks_the_claim_in_the_update(app):
+    from sqlalchemy import update
+
+    from app.models import ChangeLog
+
+    first, second = app.config["TEST_DOCTOR_IDS"]
+    with app.app_context():
+        case = db.session.get(Case, "case-2")
+        # Another doctor claims the case after this request loaded it.
+        db.session.execute(
+            update(Case)
+            .where(Case.id == "case-2")
+            .values(claimed_by=second, claim_expires_at=datetime.utcnow() + timedelta(minutes=5))
+            .execution_options(synchronize_session=False)
+        )
+        assert case.claimed_by is None
+
+        assert work_queue.complete_case(case, first) is False
+        assert work_queue.complete_case(case, second) is True
+        db.session.commit()
+
+        case = db.session.get(Case, "case-2")
+        assert (case.status, case.claimed_by, case.version) == ("DIAGNOSED", None, 2)
+        logged = db.session.execute(
+            db.select(ChangeLog.fields).where(ChangeLog.record_id == "case-2")
+        ).scalars().all()
+        assert logged[-1] == "claim_expires_at,claimed_by,status"
@@ -21,7 +21,7 @@ class ApiService {
     await AsyncStorage.removeItem('auth_token');
   }
 
-  private async request(endpoint: string, options: RequestInit = {}): Promise<any> {
+  private async send(endpoint: string, options: RequestInit = {}): Promise<Response> {
     const token = await this.getToken();
     const headers: Record<string, string> = {
       'Content-Type': 'application/json',
@@ -41,9 +41,30 @@ class ApiService {
       throw new Error(`API Error: ${response.status} - ${error}`);
     }
 
+    return response;
+  }
+
+  private async request(endpoint: string, options: RequestInit = {}): Promise<any> {
+    const response = await this.send(endpoint, options);
     return response.json();
   }
 
+  // List endpoints return one page at a time; follow X-Next-Cursor to the end.
+  private async requestAll(endpoint: string): Promise<any[]> {
+    const items: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const separator = endpoint.includes('?') ? '&' : '?';
+      const url: string = cursor
+        ? `${endpoint}${separator}after=${encodeURIComponent(cursor)}`
+        : endpoint;
+      const response = await this.send(url);
+      items.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return items;
+  }
+
   // Auth
   async login(email: string, password: string, role: 'chw' | 'doctor') {
     const response = await this.request('/login', {
@@ -56,7 +77,7 @@ class ApiService {
 
   // Patients
   async getPatients() {
-    return this.request('/patients');
+    return this.requestAll('/patients');
   }
 
   async createPatient(patientData: any) {
@@ -72,7 +93,7 @@ class ApiService {
 
   // Vitals
   async getPatientVitals(patientId: string) {
-    return this.request(`/patients/${patientId}/vitals`);
+    return this.requestAll(`/patients/${patientId}/vitals`);
   }
 
   async createVitals(patientId: string, vitalsData: any) {
@@ -89,7 +110,7 @@ class ApiService {
 
   // Cases
   async getPendingCases() {
-    return this.request('/cases/pending');
+    return this.requestAll('/cases/pending');
   }
 
   async createCase(caseData: any) {
@@ -104,7 +125,7 @@ class ApiService {
   }
 
   async getCases() {
-    return this.request('/cases');
+    return this.requestAll('/cases');
   }
 
   async createDiagnosis(caseId: string, diagnosisData: any) {